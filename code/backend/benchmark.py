@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+DELM Benchmark Suite
+Latency percentiles and throughput per endpoint at several concurrency
+levels, either against a live server or against the app run in-process
+with stub LLM, embedding and diffusion backends. Results are saved as
+JSON so runs can be compared between commits.
+
+    python benchmark.py --inprocess
+    python benchmark.py --url http://127.0.0.1:3005 --endpoints search,icon
+    python benchmark.py --inprocess --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import yaml
+
+from load_test import SCENARIOS, run_load, vary_seed
+from src.metrics import time_stage
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+DEFAULT_ENDPOINTS = ("search", "generate", "mockup", "icon", "ai-image")
+
+STUB_COMPONENT = """import React from 'react';
+
+export const Button: React.FC<{ label: string }> = ({ label }) => (
+  <button className="px-4 py-2 rounded-lg bg-primary-600 text-white">{label}</button>
+);
+"""
+
+
+class StubEmbeddings:
+    """Hashed bag-of-words vectors: deterministic and model-free, yet texts
+    sharing words still land close together, so search results stay meaningful"""
+
+    def __init__(self, dimension: int = 384, latency_ms: float = 0.0):
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+
+    def embed(self, text: str) -> np.ndarray:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._vector(text)
+
+    def embed_batch(self, texts):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+
+    def similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
+        return float(np.dot(embedding1, embedding2))
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimension] += 1.0 if (digest >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class StubLLM:
+    """Sleeps for a simulated prefill plus per-token decode and returns a fixed component"""
+
+    def __init__(self, prefill_ms: float = 50.0, token_ms: float = 2.0, tokens: int = 100):
+        self.prefill_ms = prefill_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+
+    def generate(self, prompt: str, max_tokens=None, system_prompt=None) -> str:
+        with time_stage("llm_prefill", stub=True):
+            time.sleep(self.prefill_ms / 1000)
+        with time_stage("llm_decode", stub=True, tokens_out=min(self.tokens, max_tokens or self.tokens)):
+            time.sleep(self.token_ms * min(self.tokens, max_tokens or self.tokens) / 1000)
+        return STUB_COMPONENT
+
+    def generate_ui_component(self, description: str, context: str, component_type: str = "react") -> str:
+        return self.generate(description, system_prompt=context)
+
+    def generate_styles(self, description: str, context: str) -> str:
+        return self.generate(description, system_prompt=context)
+
+    def generate_layout(self, description: str, context: str) -> str:
+        return self.generate(description, system_prompt=context)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_inprocess_server(args):
+    """Serve the app from this process in a scratch directory with stub models
+
+    The scratch config.yaml keeps the real settings but selects the fake
+    diffusion backend and disables sidecars, so nothing touches ./data or
+    loads model weights. Returns (base_url, server, workdir).
+    """
+    with open(os.path.join(BACKEND_DIR, "config.yaml"), "r") as f:
+        config = yaml.safe_load(f)
+    config["diffusion_queue"] = dict(config.get("diffusion_queue", {}), backend="fake", fake_step_seconds=args.diffusion_step_ms / 1000)
+    config["stable_diffusion"] = dict(config.get("stable_diffusion", {}), warm_on_startup=False)
+    config["sidecars"] = dict(config.get("sidecars", {}), enabled=False)
+    config["tracing"] = dict(config.get("tracing", {}), enabled=True, exporter="none")
+
+    # Every component reads ./config.yaml and relative ./data paths
+    workdir = tempfile.mkdtemp(prefix="delm-bench-")
+    with open(os.path.join(workdir, "config.yaml"), "w") as f:
+        yaml.safe_dump(config, f)
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import uvicorn
+    from src import api
+    from src.svg_generator import get_svg_generator
+    from data.seed_patterns import seed_database
+
+    api._preloaded_embeddings = StubEmbeddings(config["embeddings"]["dimension"], args.embed_ms)
+    api._preloaded_llm = StubLLM(args.llm_prefill_ms, args.llm_token_ms, args.llm_tokens)
+    # Startup skips this when embeddings were preloaded
+    get_svg_generator().prebuild_assets()
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="benchmark-server", daemon=True).start()
+    deadline = time.time() + 120
+    while not server.started:
+        if time.time() > deadline:
+            sys.exit("In-process server did not start")
+        time.sleep(0.05)
+
+    seed_database(api.rag_pipeline)
+    return f"http://127.0.0.1:{port}", server, workdir
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results):
+    columns = ["endpoint", "conc", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"]
+    print("  ".join(f"{c:>10}" for c in columns))
+    for endpoint, levels in results.items():
+        for concurrency, row in levels.items():
+            values = {"endpoint": endpoint, "conc": concurrency, **row}
+            print("  ".join(f"{str(values.get(c, '')):>10}" for c in columns))
+
+
+def compare_results(previous, current, threshold):
+    """Print p95 and throughput changes; returns the number of regressions"""
+    print(f"\nCompared with {previous['meta'].get('label')} ({previous['meta'].get('commit')}):\n")
+    columns = ["endpoint", "conc", "p95_ms", "was", "change", "rps", "was", "change", ""]
+    print("  ".join(f"{c:>10}" for c in columns))
+
+    regressions = 0
+    for endpoint, levels in current["results"].items():
+        for concurrency, row in levels.items():
+            before = previous["results"].get(endpoint, {}).get(concurrency)
+            if not before:
+                continue
+            p95_change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+            rps_change = (row["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0
+            regressed = p95_change > threshold or rps_change < -threshold
+            regressions += regressed
+            cells = [
+                endpoint, concurrency,
+                row["p95_ms"], before["p95_ms"], f"{p95_change:+.1f}%",
+                row["rps"], before["rps"], f"{rps_change:+.1f}%",
+                "REGRESSION" if regressed else ""
+            ]
+            print("  ".join(f"{str(c):>10}" for c in cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DELM API endpoints")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:3005", help="live server to benchmark")
+    target.add_argument("--inprocess", action="store_true", help="run the app in this process with stub models")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help=f"comma-separated scenarios from: {', '.join(sorted(SCENARIOS))}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--label", help="name stored with the results (default: commit)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file; exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent p95 increase or throughput drop counted as a regression")
+
+    stubs = parser.add_argument_group("in-process stubs")
+    stubs.add_argument("--embed-ms", type=float, default=2.0)
+    stubs.add_argument("--llm-prefill-ms", type=float, default=50.0)
+    stubs.add_argument("--llm-token-ms", type=float, default=2.0)
+    stubs.add_argument("--llm-tokens", type=int, default=100)
+    stubs.add_argument("--diffusion-step-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown endpoints: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    # Resolve paths before the in-process server changes directory
+    output = os.path.abspath(args.output) if args.output else None
+    previous = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            previous = json.load(f)
+
+    server, workdir = None, None
+    base_url = args.url
+    if args.inprocess:
+        print("Starting in-process server with stub models...")
+        base_url, server, workdir = start_inprocess_server(args)
+
+    commit = git_commit()
+    results = {}
+    try:
+        for name in endpoints:
+            method, endpoint, payload = SCENARIOS[name]
+            if name == "ai-image":
+                payload = vary_seed(payload)
+            results[name] = {}
+            run_load(base_url, method, endpoint, payload, args.warmup, min(args.warmup, max(levels)) or 1)
+            for concurrency in levels:
+                print(f"{method} {endpoint} x{args.requests} @ {concurrency}")
+                results[name][str(concurrency)] = run_load(base_url, method, endpoint, payload, args.requests, concurrency)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            time.sleep(0.5)
+            os.chdir(BACKEND_DIR)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "label": args.label or commit,
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "mode": "inprocess" if args.inprocess else "live",
+            "url": None if args.inprocess else base_url,
+            "requests": args.requests,
+            "concurrency": levels,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stubs": {
+                "embed_ms": args.embed_ms,
+                "llm_prefill_ms": args.llm_prefill_ms,
+                "llm_token_ms": args.llm_token_ms,
+                "llm_tokens": args.llm_tokens,
+                "diffusion_step_ms": args.diffusion_step_ms,
+            } if args.inprocess else None,
+        },
+        "results": results,
+    }
+
+    print()
+    print_results(results)
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if previous is not None:
+        if previous["meta"].get("mode") != report["meta"]["mode"]:
+            print(f"Warning: comparing {report['meta']['mode']} results with {previous['meta'].get('mode')} results")
+        regressions = compare_results(previous, report, args.threshold)
+        if regressions:
+            print(f"\n{regressions} regression(s) beyond {args.threshold:g}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Labeled retrieval evaluation set: queries and the seed patterns they should find
+"""
+from data.seed_patterns import SEED_PATTERNS
+
+# Phrased the way users ask, mostly without the pattern's own name
+EVAL_QUERIES = [
+    {"query": "primary button with hover and disabled states", "expected": ["comp-001"]},
+    {"query": "clickable call to action with size variants", "expected": ["comp-001"]},
+    {"query": "outline and ghost button styles", "expected": ["comp-001"]},
+    {"query": "submit control for a form", "expected": ["comp-001", "comp-003"]},
+    {"query": "card with image, title and footer actions", "expected": ["comp-002"]},
+    {"query": "content container with shadow and rounded corners", "expected": ["comp-002"]},
+    {"query": "product tile for a listing page", "expected": ["comp-002", "layout-002"]},
+    {"query": "text field with label and validation error", "expected": ["comp-003"]},
+    {"query": "email input with helper text", "expected": ["comp-003"]},
+    {"query": "form field showing an error message", "expected": ["comp-003"]},
+    {"query": "dashboard with collapsible side navigation", "expected": ["layout-001"]},
+    {"query": "admin shell with a left menu and main content area", "expected": ["layout-001"]},
+    {"query": "app layout with navigation drawer", "expected": ["layout-001"]},
+    {"query": "responsive grid of items with breakpoints", "expected": ["layout-002"]},
+    {"query": "three column layout that stacks on mobile", "expected": ["layout-002"]},
+    {"query": "gallery of cards in columns", "expected": ["layout-002", "comp-002"]},
+    {"query": "color palette and spacing scale", "expected": ["style-001"]},
+    {"query": "theme variables for typography and radii", "expected": ["style-001"]},
+    {"query": "tailwind config with brand colors", "expected": ["style-001"]},
+    {"query": "fade in and slide up transitions", "expected": ["style-002"]},
+    {"query": "keyframe animations for loading spinners", "expected": ["style-002"]},
+    {"query": "motion utilities for entrance effects", "expected": ["style-002"]},
+    {"query": "dialog that traps focus and closes on escape", "expected": ["a11y-001"]},
+    {"query": "accessible popup with aria attributes", "expected": ["a11y-001"]},
+    {"query": "overlay window for screen reader users", "expected": ["a11y-001"]},
+]
+
+# Expansions generated from each pattern's name and tags
+SYNTHETIC_TEMPLATES = [
+    "{name}",
+    "{name_lower} in react",
+    "how do I build a {tag} {category_singular}",
+    "{tag} example with tailwind",
+    "reusable {tag} {category_singular} in typescript",
+]
+
+
+def _category_singular(category: str) -> str:
+    return {"components": "component", "layouts": "layout", "styles": "style", "accessibility": "pattern"}.get(category, category)
+
+
+def synthetic_queries():
+    """Template queries for every seed pattern, labeled with that pattern"""
+    queries = []
+    for pattern in SEED_PATTERNS:
+        values = {
+            "name": pattern["name"],
+            "name_lower": pattern["name"].lower(),
+            "category_singular": _category_singular(pattern["category"]),
+        }
+        for template in SYNTHETIC_TEMPLATES:
+            tags = pattern.get("tags", []) if "{tag}" in template else [None]
+            for tag in tags:
+                queries.append({
+                    "query": template.format(tag=tag, **values),
+                    "expected": [pattern["pattern_id"]],
+                    "synthetic": True,
+                })
+    return queries
+
+
+def build_eval_set(include_synthetic: bool = True):
+    """Hand-labeled queries, optionally followed by the synthetic expansions"""
+    queries = [dict(query, synthetic=False) for query in EVAL_QUERIES]
+    if include_synthetic:
+        queries.extend(synthetic_queries())
+    return queries
@@ -497,19 +497,22 @@ export const Modal: React.FC<ModalProps> = ({
 
 
 def seed_database(rag_pipeline):
-    """Seed the database with initial design patterns"""
+    """Seed the database with initial design patterns
+
+    Patterns are upserted by ID, so seeding again updates them in place
+    instead of adding copies, and only re-embeds patterns whose content changed.
+    """
     print(f"Seeding database with {len(SEED_PATTERNS)} patterns...")
 
-    for pattern in SEED_PATTERNS:
-        rag_pipeline.add_pattern(
-            pattern_id=pattern['pattern_id'],
-            content=pattern['content'],
-            category=pattern['category'],
-            name=pattern['name'],
-            tags=pattern.get('tags', [])
-        )
+    result = rag_pipeline.add_patterns(SEED_PATTERNS)
 
-    print(f"Database seeded successfully! Total patterns: {rag_pipeline.vector_store.count()}")
+    print(
+        f"Database seeded successfully! Added {result['inserted']}, updated {result['updated']}, "
+        f"embedded {result['embedded']}, reused {result['skipped']} stored embeddings. "
+        f"Total patterns: {rag_pipeline.vector_store.count()}"
+    )
+    if 'chunks_embedded' in result:
+        print(f"Chunks: embedded {result['chunks_embedded']}, reused {result['chunks_skipped']}, removed {result['chunks_deleted']}")
 
 
 if __name__ == "__main__":
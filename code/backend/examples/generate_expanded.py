@@ -4,15 +4,13 @@ Example: Generate icons, logos, symbols, and illustrations using DELM API
 """
 
 import requests
-import base64
 from pathlib import Path
 
 BASE_URL = "http://127.0.0.1:3005"
 
-def save_image(data: dict, filename: str, key: str = "image"):
-    """Save base64 image to file"""
-    image_bytes = base64.b64decode(data[key])
-    Path(filename).write_bytes(image_bytes)
+def save_image(response: requests.Response, filename: str):
+    """Save a binary image response to file"""
+    Path(filename).write_bytes(response.content)
     print(f"  Saved to {filename}")
 
 def save_svg(content: str, filename: str):
@@ -57,6 +55,19 @@ def generate_icons():
         else:
             print(f"Error generating {icon['name']}: {response.text}")
 
+    # Fetch the same icons as a single sprite (one round trip)
+    names = ",".join(icon["name"] for icon in icons_to_generate)
+    response = requests.get(
+        f"{BASE_URL}/icons/sprite",
+        params={"names": names, "color": "currentColor", "stroke_width": 2}
+    )
+
+    if response.status_code == 200:
+        print(f"Generated sprite with {len(icons_to_generate)} icons")
+        save_svg(response.text, "output/icons_sprite.svg")
+    else:
+        print(f"Error generating sprite: {response.text}")
+
 def generate_symbols():
     """Generate decorative symbols"""
     print("\n--- Symbols ---")
@@ -101,14 +112,13 @@ def generate_ai_images():
             "width": 512,
             "height": 512,
             "num_steps": 4,
-            "format": "base64"
+            "format": "binary"
         }
     )
 
     if response.status_code == 200:
-        data = response.json()
-        print(f"Generated AI image ({data['width']}x{data['height']})")
-        save_image(data, "output/ai_abstract.png")
+        print("Generated AI image (512x512)")
+        save_image(response, "output/ai_abstract.png")
     else:
         print(f"Error: {response.text}")
 
@@ -132,14 +142,13 @@ def generate_logos():
                 "style": logo["style"],
                 "width": 512,
                 "height": 512,
-                "format": "base64"
+                "format": "binary"
             }
         )
 
         if response.status_code == 200:
-            data = response.json()
             filename = f"output/logo_{logo['description'].replace(' ', '_')}.png"
-            save_image(data, filename)
+            save_image(response, filename)
         else:
             print(f"Error: {response.text}")
 
@@ -163,14 +172,13 @@ def generate_illustrations():
                 "style": illust["style"],
                 "width": 768,
                 "height": 512,
-                "format": "base64"
+                "format": "binary"
             }
         )
 
         if response.status_code == 200:
-            data = response.json()
             filename = f"output/illust_{illust['description'].split()[0]}.png"
-            save_image(data, filename)
+            save_image(response, filename)
         else:
             print(f"Error: {response.text}")
 
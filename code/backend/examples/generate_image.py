@@ -4,7 +4,6 @@ Example: Generate UI component images using the DELM API
 """
 
 import requests
-import base64
 from pathlib import Path
 
 BASE_URL = "http://127.0.0.1:3005"
@@ -19,22 +18,18 @@ def generate_mockup(component_type: str, props: dict, filename: str, width: int
             "props": props,
             "width": width,
             "height": height,
-            "format": "base64"
+            "format": "binary"
         }
     )
 
     if response.status_code == 200:
-        data = response.json()
-
-        # Decode base64 and save to file
-        image_bytes = base64.b64decode(data["image"])
-        Path(filename).write_bytes(image_bytes)
+        # Binary responses carry the PNG as-is, no base64 decoding needed
+        Path(filename).write_bytes(response.content)
 
         print(f"✓ Saved {component_type} to {filename}")
-        print(f"  Size: {data['width']}x{data['height']}")
+        print(f"  Size: {width}x{height}, {len(response.content)} bytes")
 
-        # Return data_url for use in HTML
-        return data["data_url"]
+        return filename
     else:
         print(f"✗ Error: {response.status_code} - {response.text}")
         return None
@@ -49,16 +44,14 @@ def generate_from_html(html_code: str, filename: str, width: int = 800, height:
             "code": html_code,
             "width": width,
             "height": height,
-            "format": "base64"
+            "format": "binary"
         }
     )
 
     if response.status_code == 200:
-        data = response.json()
-        image_bytes = base64.b64decode(data["image"])
-        Path(filename).write_bytes(image_bytes)
+        Path(filename).write_bytes(response.content)
         print(f"✓ Saved HTML render to {filename}")
-        return data["data_url"]
+        return filename
     else:
         print(f"✗ Error: {response.status_code} - {response.text}")
         return None
@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for multi-worker deployments (see serve.sh)
+
+Values come from the server section of config.yaml; DELM_WORKERS
+overrides the worker count.
+"""
+import os
+import yaml
+
+with open("config.yaml", 'r') as f:
+    _server = yaml.safe_load(f).get('server', {})
+
+bind = f"{_server.get('host', '127.0.0.1')}:{_server.get('port', 3005)}"
+workers = int(os.environ.get("DELM_WORKERS", _server.get('workers', 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = _server.get('timeout', 300)
+graceful_timeout = 30
+
+# Import the app in the master so the preloaded components are forked into every worker
+preload_app = _server.get('preload', True)
+
+# Forked HuggingFace tokenizers warn and may deadlock if their thread pool was used
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def on_starting(server):
+    if preload_app:
+        from src.api import preload_components
+        preload_components()
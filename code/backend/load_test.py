@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+DELM Load Test
+Measures throughput and latency of one endpoint, optionally comparing
+server worker counts (e.g. --compare-workers 1,4)
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = "http://127.0.0.1:3005"
+
+# Cheap-to-render endpoints by default; override with --endpoint/--payload
+SCENARIOS = {
+    "search": ("POST", "/search", {"query": "primary button with hover state", "top_k": 5}),
+    "icon": ("POST", "/generate/icon", {"name": "settings", "size": 48, "format": "svg"}),
+    "mockup": ("POST", "/generate/mockup", {"component_type": "button", "props": {"text": "Go"}}),
+    "generate": ("POST", "/generate", {"prompt": "primary button with loading state", "type": "component"}),
+    # Seeds vary per request (see vary_seed) so the diffusion cache does not answer every call
+    "ai-image": ("POST", "/generate/ai-image", {"prompt": "mountain landscape at dawn", "width": 256, "height": 256, "num_steps": 2}),
+    "health": ("GET", "/health", None),
+}
+
+
+def vary_seed(payload):
+    """Per-request payloads with a seed not used before
+
+    Seeds count up from a random base and carry on across run_load calls
+    (warm-up, concurrency levels, worker counts), so no request is answered
+    by the diffusion cache from an earlier request or an earlier run.
+    """
+    seeds = itertools.count(random.randrange(1, 2**30))
+    return lambda i: dict(payload, seed=next(seeds))
+
+
+def parse_server_timing(header):
+    """{"embed": 11.8, ...} from a Server-Timing header"""
+    stages = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(base_url, method, endpoint, payload, total, concurrency):
+    """Fire `total` requests with `concurrency` in flight; returns summary stats
+
+    `payload` may be a callable taking the request index. Server-Timing
+    headers, when present, are averaged per stage into `stages_ms`.
+    """
+    session = requests.Session()
+    url = f"{base_url}{endpoint}"
+
+    def one(i):
+        body = payload(i) if callable(payload) else payload
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, json=body, timeout=300)
+            ok = response.status_code < 400
+            stages = parse_server_timing(response.headers.get("Server-Timing", ""))
+        except requests.RequestException:
+            ok, stages = False, {}
+        return ok, time.perf_counter() - start, stages
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for ok, latency, _ in results if ok]
+    stage_totals = {}
+    for ok, _, stages in results:
+        if ok:
+            for name, duration in stages.items():
+                stage_totals.setdefault(name, []).append(duration)
+    return {
+        "requests": total,
+        "errors": sum(1 for ok, _, _ in results if not ok),
+        "seconds": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else 0,
+        "stages_ms": {name: round(statistics.mean(values), 2) for name, values in stage_totals.items()},
+    }
+
+
+def wait_for_health(base_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+def start_server(workers):
+    """Launch gunicorn with the given worker count (same settings as serve.sh)"""
+    gunicorn = os.path.join("venv", "bin", "gunicorn")
+    if not os.path.exists(gunicorn):
+        gunicorn = shutil.which("gunicorn")
+    if not gunicorn:
+        sys.exit("gunicorn is required for --compare-workers (pip install gunicorn)")
+
+    env = dict(os.environ, DELM_WORKERS=str(workers))
+    return subprocess.Popen(
+        [gunicorn, "src.api:app", "-c", "gunicorn.conf.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+
+
+def print_table(rows):
+    columns = ["label", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "mean_ms"]
+    print("  ".join(f"{c:>10}" for c in columns))
+    for row in rows:
+        print("  ".join(f"{str(row.get(c, '')):>10}" for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the DELM API")
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="search")
+    parser.add_argument("--endpoint", help="override the scenario endpoint")
+    parser.add_argument("--method", default=None)
+    parser.add_argument("--payload", help="JSON request body")
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests before measuring")
+    parser.add_argument("--compare-workers", help="comma-separated worker counts, e.g. 1,4")
+    parser.add_argument("--startup-timeout", type=int, default=600)
+    args = parser.parse_args()
+
+    method, endpoint, payload = SCENARIOS[args.scenario]
+    endpoint = args.endpoint or endpoint
+    method = args.method or method
+    if args.payload:
+        payload = json.loads(args.payload)
+    elif args.scenario == "ai-image":
+        payload = vary_seed(payload)
+
+    print(f"{method} {endpoint}: {args.requests} requests, concurrency {args.concurrency}\n")
+
+    if not args.compare_workers:
+        run_load(args.url, method, endpoint, payload, args.warmup, min(args.warmup, args.concurrency) or 1)
+        result = run_load(args.url, method, endpoint, payload, args.requests, args.concurrency)
+        print_table([{"label": "server", **result}])
+        return
+
+    rows = []
+    for workers in [int(w) for w in args.compare_workers.split(",")]:
+        print(f"Starting server with {workers} worker(s)...")
+        server = start_server(workers)
+        try:
+            if not wait_for_health(args.url, args.startup_timeout):
+                sys.exit("Server did not become healthy")
+            # Each worker loads lazily; warm them all before measuring
+            run_load(args.url, method, endpoint, payload, args.warmup * workers, args.concurrency)
+            rows.append({"label": f"{workers} worker(s)", **run_load(
+                args.url, method, endpoint, payload, args.requests, args.concurrency
+            )})
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=60)
+        time.sleep(2)
+
+    print()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
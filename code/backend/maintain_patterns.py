@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+DELM Pattern Store Maintenance
+Ingests, reports on, deduplicates and compacts the LanceDB pattern table.
+
+    python maintain_patterns.py ingest library.jsonl
+    python maintain_patterns.py ingest --seed
+    python maintain_patterns.py rechunk
+    python maintain_patterns.py stats
+    python maintain_patterns.py dedupe
+    python maintain_patterns.py compact --older-than-hours 24
+    python maintain_patterns.py delete comp-custom-001 comp-custom-002
+
+Every write leaves a small fragment and a new table version behind;
+`compact` merges the fragments, drops deleted rows from disk and removes
+versions older than --older-than-hours. Run it while the API is idle or
+keep the window above the longest request.
+
+`ingest` reads a JSON list or JSON lines of patterns shaped like
+data/seed_patterns.py and embeds only patterns whose content changed.
+`rechunk` brings the chunk table in line with the stored patterns after
+rag.chunking is enabled or its max_chars changes. With chunking enabled,
+stats, dedupe and compact cover the chunk table too.
+"""
+
+import argparse
+import json
+import time
+from datetime import timedelta
+
+import yaml
+
+from src.ingest import ingest_patterns, open_chunk_store
+from src.chunking import DEFAULT_MAX_CHARS
+from src.vector_store import VectorStore
+
+
+def load_patterns(path: str):
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the DELM pattern store")
+    parser.add_argument("--config", default="config.yaml")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="upsert patterns, embedding only new or changed content")
+    ingest.add_argument("path", nargs="?", help="JSON list or JSON lines of patterns")
+    ingest.add_argument("--seed", action="store_true", help="ingest the built-in seed patterns")
+    commands.add_parser("rechunk", help="re-chunk every stored pattern, embedding only new chunks")
+    commands.add_parser("stats", help="rows, duplicate rows, fragments, versions and size on disk")
+    commands.add_parser("dedupe", help="keep only the newest row for each pattern id")
+    compact = commands.add_parser("compact", help="merge fragments and remove old versions")
+    compact.add_argument("--older-than-hours", type=float, default=24, help="keep versions newer than this")
+    compact.add_argument("--dedupe", action="store_true", help="deduplicate before compacting")
+    delete = commands.add_parser("delete", help="delete patterns by id")
+    delete.add_argument("ids", nargs="+")
+    args = parser.parse_args()
+    if args.command == "ingest" and not (args.path or args.seed):
+        parser.error("ingest needs a path or --seed")
+
+    with open(args.config) as f:
+        max_chars = (yaml.safe_load(f)['rag'].get('chunking') or {}).get('max_chars', DEFAULT_MAX_CHARS)
+    store = VectorStore(args.config)
+    chunk_store = open_chunk_store(args.config)
+    stores = {"patterns": store, "chunks": chunk_store} if chunk_store is not None else {"patterns": store}
+
+    if args.command in ("ingest", "rechunk"):
+        from src.embeddings import EmbeddingService
+        if args.command == "rechunk":
+            if chunk_store is None:
+                parser.error("rag.chunking is not enabled")
+            patterns = [
+                {"pattern_id": row["id"], "content": row["content"], "category": row["category"],
+                 "name": row["name"], "tags": row["tags"].split(",") if row["tags"] else []}
+                for batch in store.scan(["id", "content", "category", "name", "tags"])
+                for row in batch.to_pylist()
+            ]
+        elif args.seed:
+            from data.seed_patterns import SEED_PATTERNS
+            patterns = SEED_PATTERNS
+        else:
+            patterns = load_patterns(args.path)
+        embeddings = EmbeddingService(args.config)
+        started = time.perf_counter()
+        result = ingest_patterns(store, embeddings, patterns, chunk_store=chunk_store, max_chars=max_chars)
+        result["seconds"] = round(time.perf_counter() - started, 2)
+    elif args.command == "stats":
+        result = {name: target.storage_stats() for name, target in stores.items()}
+    elif args.command == "dedupe":
+        result = {name: {"removed": target.dedupe(), "stats": target.storage_stats()} for name, target in stores.items()}
+    elif args.command == "compact":
+        result = {}
+        for name, target in stores.items():
+            removed = target.dedupe() if args.dedupe else 0
+            result[name] = target.compact(cleanup_older_than=timedelta(hours=args.older_than_hours))
+            if args.dedupe:
+                result[name]["duplicates_removed"] = removed
+    else:
+        result = {"removed": store.delete(args.ids)}
+        if chunk_store is not None:
+            result["chunks_removed"] = chunk_store.delete(args.ids, column="parent_id")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+DELM Retrieval Benchmark
+Measures retrieval quality (recall@k, MRR) and cost (embed latency, search
+latency, memory) on the labeled evaluation set in data/retrieval_eval.py.
+It compares embedding models, and vector backends across store sizes
+padded with synthetic vectors.
+
+    python retrieval_benchmark.py --models all-MiniLM-L6-v2,BAAI/bge-small-en-v1.5
+    python retrieval_benchmark.py --sizes 1000,100000,1000000 --backends numpy,lancedb,lancedb-ivfpq
+    python retrieval_benchmark.py --backends lancedb,lancedb-int8,lancedb-binary --rerank-candidates 100
+    python retrieval_benchmark.py --models stub     # no model download
+    python retrieval_benchmark.py --sizes "" --cross-encoder cross-encoder/ms-marco-MiniLM-L-6-v2
+    python retrieval_benchmark.py --sizes "" --chunk-chars 400
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import yaml
+
+from benchmark import BACKEND_DIR, RESULTS_DIR, StubEmbeddings, git_commit
+from data.retrieval_eval import build_eval_set
+from data.seed_patterns import SEED_PATTERNS
+from load_test import percentile
+from src.chunking import split_pattern, DEFAULT_MAX_CHARS
+from src.lexical_index import BM25Index, reciprocal_rank_fusion
+
+BACKENDS = ("numpy", "lancedb", "lancedb-int8", "lancedb-binary", "lancedb-ivfpq")
+K_VALUES = (1, 3, 5)
+# Patterns whose context size is compared, like rag.rerank.top_n
+CONTEXT_PATTERNS = 3
+INSERT_CHUNK = 100_000
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current on macOS; deltas are still indicative
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def directory_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def ranking_metrics(ranked_ids, eval_set):
+    """recall@k and MRR for ranked result ids per query"""
+    hits = {k: 0 for k in K_VALUES}
+    reciprocal_ranks = []
+    for ids, query in zip(ranked_ids, eval_set):
+        expected = set(query["expected"])
+        rank = next((position for position, pattern_id in enumerate(ids, 1) if pattern_id in expected), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        for k in K_VALUES:
+            hits[k] += bool(rank and rank <= k)
+    metrics = {f"recall@{k}": round(hits[k] / len(eval_set), 3) for k in K_VALUES}
+    metrics["mrr"] = round(statistics.mean(reciprocal_ranks), 3)
+    return metrics
+
+
+def load_embedder(model: str, scratch_dir: str):
+    """EmbeddingService for a model through a scratch config, or the stub embedder"""
+    if model == "stub":
+        return StubEmbeddings()
+
+    from src.embeddings import EmbeddingService
+
+    with open(os.path.join(BACKEND_DIR, "config.yaml"), "r") as f:
+        config = yaml.safe_load(f)
+    config["embeddings"] = dict(config["embeddings"], model=model)
+    config_path = os.path.join(scratch_dir, "embeddings.yaml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump(config, f)
+    service = EmbeddingService(config_path)
+    service.dimension = service.model.get_sentence_embedding_dimension()
+    return service
+
+
+def evaluate_model(
+    model: str,
+    eval_set,
+    scratch_dir: str,
+    reranker=None,
+    rerank_candidates: int = 20,
+    chunk_chars: int = DEFAULT_MAX_CHARS,
+    chunks_per_pattern: int = 2
+):
+    """Quality and embedding cost for one model; returns (row, pattern vectors, query vectors)"""
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    embedder = load_embedder(model, scratch_dir)
+    load_seconds = time.perf_counter() - started
+
+    pattern_vectors = normalize(embedder.embed_batch([p["content"] for p in SEED_PATTERNS]))
+
+    # Single-query latency is what a request pays
+    embedder.embed("warm up")
+    latencies = []
+    query_vectors = []
+    for query in eval_set:
+        start = time.perf_counter()
+        query_vectors.append(embedder.embed(query["query"]))
+        latencies.append(time.perf_counter() - start)
+    query_vectors = normalize(np.stack(query_vectors))
+
+    start = time.perf_counter()
+    embedder.embed_batch([query["query"] for query in eval_set])
+    batch_seconds = time.perf_counter() - start
+
+    pattern_ids = [p["pattern_id"] for p in SEED_PATTERNS]
+    patterns = {p["pattern_id"]: p for p in SEED_PATTERNS}
+    scores = query_vectors @ pattern_vectors.T
+    ranked = [[pattern_ids[i] for i in np.argsort(-row)] for row in scores]
+    hand = [i for i, query in enumerate(eval_set) if not query["synthetic"]]
+    hybrid = hybrid_rankings(ranked, eval_set)
+    chunked, chunked_context = chunked_rankings(embedder, query_vectors, chunk_chars, chunks_per_pattern)
+
+    row = {
+        "model": model,
+        "dimension": int(pattern_vectors.shape[1]),
+        **ranking_metrics(ranked, eval_set),
+        "mrr_hand": ranking_metrics([ranked[i] for i in hand], [eval_set[i] for i in hand])["mrr"],
+        "mrr_hybrid": ranking_metrics(hybrid, eval_set)["mrr"],
+        "mrr_hybrid_hand": ranking_metrics([hybrid[i] for i in hand], [eval_set[i] for i in hand])["mrr"],
+        "mrr_chunked": ranking_metrics(chunked, eval_set)["mrr"],
+        "recall@3_chunked": ranking_metrics(chunked, eval_set)["recall@3"],
+        # Context characters for the top patterns, whole versus matched chunks only
+        "context_chars": round(statistics.mean(
+            sum(len(patterns[i]["content"]) for i in ranking[:CONTEXT_PATTERNS]) for ranking in ranked
+        )),
+        "context_chars_chunked": round(statistics.mean(chunked_context)),
+        "embed_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "embed_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "batch_per_s": round(len(eval_set) / batch_seconds, 1) if batch_seconds else 0,
+        "load_s": round(load_seconds, 2),
+        "rss_mb": round((rss_bytes() - rss_before) / 2**20, 1),
+    }
+    if reranker is not None:
+        reranked, rerank_latencies = rerank_rankings(reranker, hybrid, eval_set, rerank_candidates)
+        row["mrr_rerank"] = ranking_metrics(reranked, eval_set)["mrr"]
+        row["recall@3_rerank"] = ranking_metrics(reranked, eval_set)["recall@3"]
+        row["rerank_p50_ms"] = round(percentile(rerank_latencies, 50) * 1000, 2)
+        row["rerank_p95_ms"] = round(percentile(rerank_latencies, 95) * 1000, 2)
+    return row, pattern_vectors, query_vectors
+
+
+def chunked_rankings(embedder, query_vectors: np.ndarray, max_chars: int, per_pattern: int):
+    """Patterns ranked by their best chunk, as rag.chunking retrieves them, and each query's context size
+
+    The context size counts the header and the best chunks_per_pattern chunks
+    of the top CONTEXT_PATTERNS patterns.
+    """
+    headers, chunks, owners = {}, [], []
+    for pattern in SEED_PATTERNS:
+        headers[pattern["pattern_id"]], pattern_chunks = split_pattern(pattern["content"], max_chars)
+        chunks.extend(pattern_chunks)
+        owners.extend([pattern["pattern_id"]] * len(pattern_chunks))
+    chunk_vectors = normalize(embedder.embed_batch(chunks))
+
+    rankings, context_sizes = [], []
+    for query_scores in query_vectors @ chunk_vectors.T:
+        matched = {}
+        for i in np.argsort(-query_scores):
+            matched.setdefault(owners[i], []).append(i)
+        ranking = list(matched)
+        rankings.append(ranking)
+        context_sizes.append(sum(
+            len(headers[pattern_id]) + sum(len(chunks[i]) for i in matched[pattern_id][:per_pattern])
+            for pattern_id in ranking[:CONTEXT_PATTERNS]
+        ))
+    return rankings, context_sizes
+
+
+def lexical_rankings(eval_set):
+    """BM25 rankings of the seed patterns, as VectorStore's lexical index scores them"""
+    index = BM25Index()
+    index.add(
+        [p["pattern_id"] for p in SEED_PATTERNS],
+        [p["content"] for p in SEED_PATTERNS],
+        [p["name"] for p in SEED_PATTERNS],
+        [",".join(p.get("tags", [])) for p in SEED_PATTERNS],
+        [p["category"] for p in SEED_PATTERNS]
+    )
+    return [[index.ids[position] for position, _ in index.search(query["query"], len(SEED_PATTERNS))] for query in eval_set]
+
+
+def hybrid_rankings(vector_rankings, eval_set):
+    """Vector and BM25 rankings fused with the rag.hybrid weights"""
+    with open(os.path.join(BACKEND_DIR, "config.yaml"), "r") as f:
+        hybrid = yaml.safe_load(f)["rag"].get("hybrid") or {}
+    weights = [hybrid.get("vector_weight", 1.0), hybrid.get("lexical_weight", 1.0)]
+    return [
+        [pattern_id for pattern_id, _ in reciprocal_rank_fusion([vector, lexical], weights, hybrid.get("rrf_k", 60))]
+        for vector, lexical in zip(vector_rankings, lexical_rankings(eval_set))
+    ]
+
+
+def rerank_rankings(reranker, rankings, eval_set, candidates: int):
+    """Cross-encoder order of each ranking's top candidates, with per-query latency"""
+    patterns = {
+        p["pattern_id"]: {
+            "id": p["pattern_id"],
+            "content": p["content"],
+            "metadata": {"name": p["name"], "tags": ",".join(p.get("tags", []))},
+        }
+        for p in SEED_PATTERNS
+    }
+    reranked, latencies = [], []
+    for ranking, query in zip(rankings, eval_set):
+        start = time.perf_counter()
+        top = reranker.rerank(query["query"], [patterns[i] for i in ranking[:candidates]], candidates)
+        latencies.append(time.perf_counter() - start)
+        reranked.append([pattern["id"] for pattern in top] + ranking[candidates:])
+    return reranked, latencies
+
+
+def synthetic_vectors(anchors: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    """Distractors scattered around the real pattern vectors
+
+    Uniform random vectors are nearly orthogonal to everything and never
+    compete; perturbed copies of real embeddings do, like a large library of
+    related patterns would.
+    """
+    rng = np.random.default_rng(seed)
+    centers = anchors[rng.integers(0, len(anchors), size=count)]
+    jitter = rng.standard_normal((count, anchors.shape[1]), dtype=np.float32) * (noise / np.sqrt(anchors.shape[1]))
+    return normalize(centers + jitter)
+
+
+def synthetic_id(index: int) -> str:
+    return f"synthetic-{index}"
+
+
+class NumpyBackend:
+    """Exact search over an in-memory matrix; the ground truth for the others"""
+
+    def __init__(self, vectors: np.ndarray, ids):
+        self.vectors = vectors
+        self.ids = ids
+
+    def search(self, query: np.ndarray, top_k: int):
+        scores = self.vectors @ query
+        top = np.argpartition(-scores, min(top_k, len(scores) - 1))[:top_k]
+        return [self.ids[i] for i in top[np.argsort(-scores[top])]]
+
+    def store_bytes(self) -> int:
+        return self.vectors.nbytes
+
+    def memory_bytes(self) -> int:
+        return self.vectors.nbytes
+
+
+class LanceBackend:
+    """The application's VectorStore on a scratch directory
+
+    Backends opened on the same scratch directory share one table, so the
+    quantized variants search exactly the rows loaded into the flat one.
+    """
+
+    def __init__(self, scratch_dir: str, dimension: int, quantization: str = "none", rerank_candidates: int = 50):
+        from src.vector_store import VectorStore
+
+        self.directory = os.path.join(scratch_dir, "lancedb")
+        with open(os.path.join(BACKEND_DIR, "config.yaml"), "r") as f:
+            config = yaml.safe_load(f)
+        config["vector_db"] = dict(
+            config["vector_db"], persist_directory=self.directory, read_consistency_seconds=None,
+            quantization=quantization, rerank_candidates=rerank_candidates, tables={}
+        )
+        config["embeddings"] = dict(config["embeddings"], dimension=dimension)
+        config_path = os.path.join(scratch_dir, f"vector_store-{quantization}.yaml")
+        with open(config_path, "w") as f:
+            yaml.safe_dump(config, f)
+
+        self.store = VectorStore(config_path)
+
+    def load(self, vectors: np.ndarray, pattern_count: int):
+        self.store.add_patterns_batch(
+            [p["pattern_id"] for p in SEED_PATTERNS],
+            [p["content"] for p in SEED_PATTERNS],
+            vectors[:pattern_count].tolist(),
+            [{"category": p["category"], "name": p["name"], "tags": ",".join(p.get("tags", []))} for p in SEED_PATTERNS]
+        )
+        # Bulk rows go in as Arrow batches; per-row dicts would not scale to 1M
+        for start in range(pattern_count, len(vectors), INSERT_CHUNK):
+            chunk = vectors[start:start + INSERT_CHUNK]
+            count = len(chunk)
+            self.store.table.add(pa.table({
+                "id": [synthetic_id(i) for i in range(start, start + count)],
+                "content": [""] * count,
+                "category": ["synthetic"] * count,
+                "name": [""] * count,
+                "tags": [""] * count,
+                "vector": pa.FixedSizeListArray.from_arrays(pa.array(chunk.reshape(-1), type=pa.float32()), chunk.shape[1]),
+            }))
+
+    def create_ivfpq_index(self, size: int, dimension: int):
+        num_sub_vectors = next(d for d in range(max(1, dimension // 8), 0, -1) if dimension % d == 0)
+        self.store.table.create_index(
+            num_partitions=max(1, min(1024, int(np.sqrt(size)))),
+            num_sub_vectors=num_sub_vectors
+        )
+
+    def search(self, query: np.ndarray, top_k: int):
+        return self.store.search(query.tolist(), top_k=top_k)["ids"][0]
+
+    def store_bytes(self) -> int:
+        return directory_bytes(self.directory)
+
+    def memory_bytes(self) -> int:
+        # Flat LanceDB search streams vectors from disk; quantized search keeps codes resident
+        return self.store.index.nbytes if self.store.index is not None else 0
+
+
+def measure_backend(backend, name: str, size: int, query_vectors, eval_set, exact_top, top_k: int, build_seconds: float, rss_delta: int):
+    latencies = []
+    ranked = []
+    for query in query_vectors:
+        start = time.perf_counter()
+        ranked.append(backend.search(query, top_k))
+        latencies.append(time.perf_counter() - start)
+
+    # Index recall: overlap with exact top-k, independent of the labels
+    overlap = statistics.mean(len(set(ids) & set(truth)) / len(truth) for ids, truth in zip(ranked, exact_top))
+    quality = ranking_metrics(ranked, eval_set)
+    return {
+        "backend": name,
+        "size": size,
+        "search_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "search_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "recall@1": quality["recall@1"],
+        "recall@5": quality["recall@5"],
+        "mrr": quality["mrr"],
+        f"index_recall@{top_k}": round(overlap, 3),
+        "build_s": round(build_seconds, 2),
+        "store_mb": round(backend.store_bytes() / 2**20, 1),
+        "index_mb": round(backend.memory_bytes() / 2**20, 1),
+        "rss_mb": round(rss_delta / 2**20, 1),
+    }
+
+
+def evaluate_scale(sizes, backends, pattern_vectors, query_vectors, eval_set, args):
+    rows = []
+    pattern_ids = [p["pattern_id"] for p in SEED_PATTERNS]
+    for size in sizes:
+        count = max(0, size - len(pattern_vectors))
+        print(f"Store size {size:,}: generating {count:,} synthetic vectors...")
+        vectors = np.concatenate([pattern_vectors, synthetic_vectors(pattern_vectors, count, args.noise, args.seed)])
+        ids = pattern_ids + [synthetic_id(i) for i in range(len(pattern_vectors), len(vectors))]
+
+        exact = NumpyBackend(vectors, ids)
+        exact_top = [exact.search(query, args.top_k) for query in query_vectors]
+        if "numpy" in backends:
+            rows.append(measure_backend(exact, "numpy", size, query_vectors, eval_set, exact_top, args.top_k, 0.0, vectors.nbytes))
+
+        if any(backend.startswith("lancedb") for backend in backends):
+            scratch_dir = tempfile.mkdtemp(prefix="delm-retrieval-")
+            try:
+                rss_before = rss_bytes()
+                started = time.perf_counter()
+                lance = LanceBackend(scratch_dir, int(vectors.shape[1]))
+                lance.load(vectors, len(pattern_vectors))
+                load_seconds = time.perf_counter() - started
+                if "lancedb" in backends:
+                    rows.append(measure_backend(lance, "lancedb", size, query_vectors, eval_set, exact_top, args.top_k, load_seconds, rss_bytes() - rss_before))
+                for quantization in ("int8", "binary"):
+                    if f"lancedb-{quantization}" in backends:
+                        rss_before = rss_bytes()
+                        started = time.perf_counter()
+                        quantized = LanceBackend(scratch_dir, int(vectors.shape[1]), quantization, args.rerank_candidates)
+                        index_seconds = time.perf_counter() - started
+                        rows.append(measure_backend(quantized, f"lancedb-{quantization}", size, query_vectors, eval_set, exact_top, args.top_k, load_seconds + index_seconds, rss_bytes() - rss_before))
+                        del quantized
+                if "lancedb-ivfpq" in backends:
+                    if size < 1000:
+                        print("  lancedb-ivfpq skipped: PQ training needs at least 1,000 vectors")
+                    else:
+                        started = time.perf_counter()
+                        lance.create_ivfpq_index(size, vectors.shape[1])
+                        index_seconds = time.perf_counter() - started
+                        rows.append(measure_backend(lance, "lancedb-ivfpq", size, query_vectors, eval_set, exact_top, args.top_k, load_seconds + index_seconds, rss_bytes() - rss_before))
+            finally:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+        del vectors, exact
+    return rows
+
+
+def print_table(rows):
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    widths = [max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).rjust(width) for column, width in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DELM retrieval quality and cost")
+    parser.add_argument("--models", default=None, help="comma-separated embedding models, or 'stub' (default: config)")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="store sizes, e.g. 1000,100000,1000000")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"comma-separated from: {', '.join(BACKENDS)}")
+    parser.add_argument("--scale-model", help="model whose vectors are used for the size sweep (default: first)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-candidates", type=int, default=50, help="float32 re-rank depth for the quantized backends")
+    parser.add_argument("--noise", type=float, default=1.0, help="spread of synthetic vectors around real ones")
+    parser.add_argument("--cross-encoder", help="also re-rank the hybrid ranking with this cross-encoder model")
+    parser.add_argument("--cross-encoder-candidates", type=int, default=20, help="candidates the cross-encoder scores per query")
+    parser.add_argument("--chunk-chars", type=int, help="chunk size for the chunked ranking (default: rag.chunking.max_chars)")
+    parser.add_argument("--hand-only", action="store_true", help="skip the synthetic query expansions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/retrieval-<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    with open(os.path.join(BACKEND_DIR, "config.yaml"), "r") as f:
+        config = yaml.safe_load(f)
+    default_model = config["embeddings"]["model"]
+    chunking = config["rag"].get("chunking") or {}
+    chunk_chars = args.chunk_chars or chunking.get("max_chars", DEFAULT_MAX_CHARS)
+    models = [m.strip() for m in (args.models or default_model).split(",") if m.strip()]
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        sys.exit(f"Unknown backends: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    scale_model = args.scale_model or models[0]
+    if scale_model not in models:
+        models.append(scale_model)
+
+    eval_set = build_eval_set(include_synthetic=not args.hand_only)
+    print(f"{len(eval_set)} labeled queries over {len(SEED_PATTERNS)} seed patterns\n")
+
+    reranker = None
+    if args.cross_encoder:
+        from src.reranker import Reranker
+        reranker = Reranker(args.cross_encoder)
+
+    scratch_dir = tempfile.mkdtemp(prefix="delm-retrieval-")
+    model_rows = []
+    scale_vectors = None
+    try:
+        for model in models:
+            print(f"Evaluating {model}...")
+            row, pattern_vectors, query_vectors = evaluate_model(
+                model, eval_set, scratch_dir, reranker, args.cross_encoder_candidates,
+                chunk_chars, chunking.get("chunks_per_pattern", 2)
+            )
+            model_rows.append(row)
+            if model == scale_model:
+                scale_vectors = (pattern_vectors, query_vectors)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    print()
+    print_table(model_rows)
+    print()
+
+    scale_rows = evaluate_scale(sizes, backends, *scale_vectors, eval_set, args) if sizes and backends else []
+    print(f"\nVector search with {scale_model} (noise {args.noise}, top_k {args.top_k}):\n")
+    print_table(scale_rows)
+
+    commit = git_commit()
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"retrieval-{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "queries": len(eval_set),
+                "patterns": len(SEED_PATTERNS),
+                "scale_model": scale_model,
+                "noise": args.noise,
+                "top_k": args.top_k,
+                "rerank_candidates": args.rerank_candidates,
+                "cross_encoder": args.cross_encoder,
+                "cross_encoder_candidates": args.cross_encoder_candidates if args.cross_encoder else None,
+                "chunk_chars": chunk_chars,
+                "seed": args.seed,
+            },
+            "models": model_rows,
+            "scale": scale_rows,
+        }, f, indent=2)
+    print(f"\nSaved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+#!/bin/bash
+
+# DELM - Production Launcher (multiple workers, no --reload)
+# Usage: ./serve.sh [workers]
+
+cd "$(dirname "$0")"
+
+if [ ! -d "venv" ]; then
+    echo "Virtual environment not found. Run ./start.sh first to set up the environment."
+    exit 1
+fi
+
+if [ -n "$1" ]; then
+    export DELM_WORKERS=$1
+fi
+
+if [ -x "venv/bin/gunicorn" ]; then
+    # Preloads embeddings and icon assets once; workers share them copy-on-write
+    echo "Starting DELM with gunicorn (workers: ${DELM_WORKERS:-from config.yaml})"
+    ./venv/bin/gunicorn src.api:app -c gunicorn.conf.py &
+else
+    # uvicorn spawns workers rather than forking, so every worker loads its own copy
+    WORKERS=${DELM_WORKERS:-$(./venv/bin/python3 -c "import yaml; print(yaml.safe_load(open('config.yaml'))['server'].get('workers', 1))")}
+    echo "gunicorn not installed; starting uvicorn with $WORKERS workers (no preloading)"
+    ./venv/bin/uvicorn src.api:app --host 127.0.0.1 --port 3005 --workers "$WORKERS" &
+fi
+
+echo $! > .server.pid
+echo "DELM server started with PID $(cat .server.pid)"
@@ -0,0 +1,83 @@
+#!/bin/bash
+
+# DELM - Model-serving sidecars
+# Usage: ./sidecars.sh start|stop|restart|status [service] [instances]
+#   service: embeddings, llm or renderer (default: every service in config.yaml)
+#   instances: overrides sidecars.instances for that service
+
+cd "$(dirname "$0")"
+
+PYTHON=./venv/bin/python3
+[ -x "$PYTHON" ] || PYTHON=python3
+
+PID_DIR=.sidecars
+mkdir -p "$PID_DIR"
+
+config_value() {
+    $PYTHON -c "import yaml; c = yaml.safe_load(open('config.yaml')).get('sidecars', {}); print($1)"
+}
+
+SERVICES=${2:-$(config_value "' '.join(c.get('services', ['embeddings', 'llm', 'renderer']))")}
+
+start_service() {
+    local service=$1
+    local count=${2:-$(config_value "c.get('instances', {}).get('$service', 1)")}
+    for ((i = 0; i < count; i++)); do
+        local pidfile="$PID_DIR/$service-$i.pid"
+        if [ -f "$pidfile" ] && ps -p "$(cat "$pidfile")" > /dev/null 2>&1; then
+            echo "$service-$i already running (PID $(cat "$pidfile"))"
+            continue
+        fi
+        $PYTHON -m src.sidecar "$service" --instance "$i" > "$PID_DIR/$service-$i.log" 2>&1 &
+        echo $! > "$pidfile"
+        echo "Started $service-$i (PID $!)"
+    done
+}
+
+stop_service() {
+    local service=$1
+    for pidfile in "$PID_DIR/$service"-*.pid; do
+        [ -f "$pidfile" ] || continue
+        local pid=$(cat "$pidfile")
+        if ps -p "$pid" > /dev/null 2>&1; then
+            kill "$pid"
+            echo "Stopped $(basename "$pidfile" .pid) (PID $pid)"
+        fi
+        rm "$pidfile"
+    done
+    # Remove sockets so the API stops routing to this service's instances
+    local socket_dir=$(config_value "c.get('socket_dir', './data/sockets')")
+    rm -f "$socket_dir/$service"-*.sock
+}
+
+status_service() {
+    local service=$1
+    for pidfile in "$PID_DIR/$service"-*.pid; do
+        [ -f "$pidfile" ] || continue
+        local pid=$(cat "$pidfile")
+        if ps -p "$pid" > /dev/null 2>&1; then
+            echo "$(basename "$pidfile" .pid): running (PID $pid)"
+        else
+            echo "$(basename "$pidfile" .pid): not running"
+        fi
+    done
+}
+
+case "$1" in
+    start)
+        for service in $SERVICES; do start_service "$service" "$3"; done
+        ;;
+    stop)
+        for service in $SERVICES; do stop_service "$service"; done
+        ;;
+    restart)
+        for service in $SERVICES; do stop_service "$service"; sleep 1; start_service "$service" "$3"; done
+        ;;
+    status)
+        for service in $SERVICES; do status_service "$service"; done
+        ;;
+    *)
+        echo "Usage: $0 start|stop|restart|status [service] [instances]"
+        exit 1
+        ;;
+esac
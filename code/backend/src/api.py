@@ -1,17 +1,35 @@
 """
 FastAPI server for DELM
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, field_validator
 from typing import List, Optional, Dict, Any
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import zipfile
+from urllib.parse import quote
 import yaml
 
 from .rag import RAGPipeline
 from .image_generator import get_image_generator
 from .svg_generator import get_svg_generator
-from .sd_generator import get_sd_generator
+from .sd_generator import get_sd_generator, decode_latent_preview, GenerationCancelled, DEFAULT_SEED
+from .diffusion_queue import get_diffusion_queue, QueueFullError, PRIORITIES
+from .jobs import get_job_manager, JobCancelled
+from .sidecar import get_sidecar_client, RemoteService, SERVICES
+from .metrics import RequestMetricsMiddleware, register_collector, render_metrics
+from .tracing import TracingMiddleware, configure_tracing
+from .profiling import (
+    ProfilingMiddleware, ProfilerBusy, PROFILE_MEDIA_TYPES, get_profile_recorder, get_memory_tracker
+)
 
 app = FastAPI(
     title="DELM API",
@@ -26,15 +44,123 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-Id", "Server-Timing"],
 )
 
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip that leaves event streams alone so events are not held in the compressor"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Each add_middleware wraps the ones added before it, so requests pass through
+# Profiling -> Tracing -> RequestMetrics -> GZip -> CORS -> routes. The root span
+# covers compression and metrics; profiling sits outside it so writing a report
+# does not count toward the request's traced time.
+
+# Compress text responses (SVG sprites, JSON manifests)
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=1024)
+
+app.add_middleware(RequestMetricsMiddleware)
+
+configure_tracing()
+app.add_middleware(TracingMiddleware)
+
+# ?profile=1 or X-Profile: 1 from an admin profiles that request
+app.add_middleware(ProfilingMiddleware)
+
 # Initialize RAG pipeline
 rag_pipeline = None
 
+# Loaded in the parent process before workers fork (see gunicorn.conf.py);
+# benchmark.py sets both to stubs when running the app in-process
+_preloaded_embeddings = None
+_preloaded_llm = None
+
+def preload_components():
+    """Load read-only components once so forked workers share them copy-on-write
+
+    Only weights and static assets are loaded here; no inference runs, since
+    thread pools started before fork can deadlock in the children. MLX models
+    (the LLM and FLUX) hold Metal state that does not survive fork, so they
+    still load per worker.
+    """
+    global _preloaded_embeddings
+    from .embeddings import EmbeddingService
+
+    if get_sidecar_client("embeddings") is None:
+        _preloaded_embeddings = EmbeddingService()
+    get_svg_generator().prebuild_assets()
+
+def _remote_service(service: str) -> Optional[RemoteService]:
+    client = get_sidecar_client(service)
+    return RemoteService(client) if client else None
+
 @app.on_event("startup")
 async def startup_event():
     global rag_pipeline
-    rag_pipeline = RAGPipeline()
+    # Services configured as sidecars are proxied; the rest load in-process
+    rag_pipeline = RAGPipeline(
+        embeddings=_remote_service("embeddings") or _preloaded_embeddings,
+        llm=_remote_service("llm") or _preloaded_llm
+    )
+
+    svg_gen = get_svg_generator()
+    if _preloaded_embeddings is None:
+        svg_gen.prebuild_assets()
+    try:
+        svg_gen.search_index.attach_embeddings(rag_pipeline.embeddings)
+    except Exception as e:
+        print(f"Icon semantic search unavailable: {e}")
+
+    sd_gen = get_sd_generator()
+    if sd_gen.config.get('stable_diffusion', {}).get('warm_on_startup'):
+        asyncio.get_running_loop().run_in_executor(None, sd_gen.warm_up)
+
+    frames = get_profile_recorder().trace_memory_frames
+    if frames:
+        get_memory_tracker().start(frames)
+
+    job_manager = get_job_manager()
+    for job_type, handler in JOB_HANDLERS.items():
+        job_manager.register(job_type, handler)
+    await job_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_job_manager().stop()
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the client already holds the current version"""
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+def _variant_etag(base_etag: str, *parts) -> str:
+    """Derive an ETag for a parameterized variant of a cached asset"""
+    digest = hashlib.sha1(base_etag.encode('utf-8'))
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+    return f'"{digest.hexdigest()[:16]}"'
+
+def _parse_icon_names(names: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated icon name list; empty means all icons"""
+    if not names:
+        return None
+    return [name for name in names.split(",") if name.strip()]
+
+def _cacheable_response(request: Request, content, media_type: str, etag: str, headers: Optional[Dict[str, str]] = None):
+    """Return content with ETag/Cache-Control headers, or 304 if unchanged"""
+    cache_headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if headers:
+        cache_headers.update(headers)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+    if media_type == "application/json":
+        return JSONResponse(content=content, headers=cache_headers)
+    return Response(content=content, media_type=media_type, headers=cache_headers)
 
 # Request/Response models
 class GenerateRequest(BaseModel):
@@ -46,6 +172,7 @@ class GenerateResponse(BaseModel):
     output: str
     patterns_used: int
     pattern_ids: List[str]
+    context_tokens: int = 0
 
 class PatternRequest(BaseModel):
     pattern_id: str
@@ -54,65 +181,213 @@ class PatternRequest(BaseModel):
     name: str
     tags: Optional[List[str]] = None
 
+class PatternUpdate(BaseModel):
+    content: str
+    category: str
+    name: str
+    tags: Optional[List[str]] = None
+
 class SearchRequest(BaseModel):
     query: str
     category: Optional[str] = None
     top_k: int = 5
 
-class ImageGenerateRequest(BaseModel):
+# Response encodings: "binary" returns raw image bytes; "base64" and
+# "data_url" return JSON carrying exactly one encoding of the image
+RESPONSE_FORMATS = ("binary", "base64", "data_url")
+IMAGE_FORMATS = ("png", "webp", "avif", "auto")
+
+class ImageOutputRequest(BaseModel):
+    format: str = "binary"  # binary, base64, data_url
+    image_format: str = "png"  # png, webp, avif, auto (negotiated from Accept)
+    quality: int = 85  # lossy encoder quality for webp/avif
+
+    @field_validator("format")
+    @classmethod
+    def check_format(cls, value: str) -> str:
+        if value not in RESPONSE_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+        return value
+
+    @field_validator("image_format")
+    @classmethod
+    def check_image_format(cls, value: str) -> str:
+        value = value.lower()
+        if value not in IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {', '.join(IMAGE_FORMATS)}")
+        return value
+
+    @field_validator("quality")
+    @classmethod
+    def check_quality(cls, value: int) -> int:
+        if not 1 <= value <= 100:
+            raise ValueError("quality must be between 1 and 100")
+        return value
+
+class ImageGenerateRequest(ImageOutputRequest):
     prompt: str
     width: int = 800
     height: int = 600
-    format: str = "base64"  # "base64" or "binary"
 
-class ComponentMockupRequest(BaseModel):
+class ComponentMockupRequest(ImageOutputRequest):
     component_type: str  # button, card, input, navbar
     props: Dict[str, Any] = {}
     width: int = 400
     height: int = 300
-    format: str = "base64"
 
-class CodeToImageRequest(BaseModel):
+class CodeToImageRequest(ImageOutputRequest):
     code: str
     width: int = 800
     height: int = 600
-    format: str = "base64"
 
-class IconRequest(BaseModel):
+class IconRequest(ImageOutputRequest):
     name: str
     size: int = 24
     color: str = "currentColor"
     stroke_width: float = 2
-    format: str = "svg"  # svg or png
+    format: str = "svg"  # svg, binary, base64, data_url ("png" is an alias for base64)
 
-class SymbolRequest(BaseModel):
+    @field_validator("format")
+    @classmethod
+    def check_format(cls, value: str) -> str:
+        value = "base64" if value == "png" else value
+        if value != "svg" and value not in RESPONSE_FORMATS:
+            raise ValueError(f"format must be svg or one of {', '.join(RESPONSE_FORMATS)}")
+        return value
+
+class SymbolRequest(ImageOutputRequest):
     symbol_type: str  # circle, hexagon, star, diamond, triangle, ring, badge
     size: int = 64
     primary_color: str = "#3b82f6"
     secondary_color: str = "#60a5fa"
-    format: str = "svg"
+    id_suffix: Optional[str] = None  # override the generated gradient id suffix
+    format: str = "svg"  # svg, binary, base64, data_url ("png" is an alias for base64)
+
+    @field_validator("format")
+    @classmethod
+    def check_format(cls, value: str) -> str:
+        value = "base64" if value == "png" else value
+        if value != "svg" and value not in RESPONSE_FORMATS:
+            raise ValueError(f"format must be svg or one of {', '.join(RESPONSE_FORMATS)}")
+        return value
+
+class SymbolsRequest(BaseModel):
+    symbol_types: Optional[List[str]] = None  # None renders every symbol type
+    size: int = 64
+    primary_color: str = "#3b82f6"
+    secondary_color: str = "#60a5fa"
+
+class DiffusionPriorityRequest(ImageOutputRequest):
+    priority: str = "normal"  # high, normal, low
+
+    @field_validator("priority")
+    @classmethod
+    def check_priority(cls, value: str) -> str:
+        if value not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        return value
 
-class LogoRequest(BaseModel):
+class LogoRequest(DiffusionPriorityRequest):
     description: str
     style: str = "modern"  # modern, vintage, playful, tech, organic, bold
     width: int = 512
     height: int = 512
-    format: str = "base64"
 
-class IllustrationRequest(BaseModel):
+class IllustrationRequest(DiffusionPriorityRequest):
     description: str
     style: str = "digital"  # digital, watercolor, vector, sketch, isometric
     width: int = 768
     height: int = 512
-    format: str = "base64"
 
-class AIImageRequest(BaseModel):
+class AIImageRequest(DiffusionPriorityRequest):
     prompt: str
     width: int = 512
     height: int = 512
     num_steps: int = 4
     seed: Optional[int] = None
-    format: str = "base64"
+
+MAX_VARIANTS = 16
+
+class VariantsRequest(DiffusionPriorityRequest):
+    description: str
+    styles: Optional[List[str]] = None  # defaults to the endpoint's default style
+    seeds: Optional[List[int]] = None  # explicit seeds; otherwise `count` consecutive seeds
+    count: int = 4  # seeds per style when seeds is omitted
+    columns: Optional[int] = None  # contact sheet columns (default: square-ish grid)
+
+class LogoVariantsRequest(VariantsRequest):
+    width: int = 512
+    height: int = 512
+
+class IllustrationVariantsRequest(VariantsRequest):
+    width: int = 768
+    height: int = 512
+
+class AIImageStreamRequest(AIImageRequest):
+    previews: bool = True  # send an approximate preview with each step
+    preview_size: int = 128  # longest preview edge in pixels
+
+# Binary responses above this size are streamed in chunks
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+
+def _negotiate_image_format(accept: str) -> str:
+    """Pick the most compact encoding the client advertises support for"""
+    accept = accept.lower()
+    if "image/avif" in accept and get_image_generator().supports_avif():
+        return "avif"
+    if "image/webp" in accept:
+        return "webp"
+    return "png"
+
+def _iter_chunks(data: bytes):
+    view = memoryview(data)
+    for offset in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield bytes(view[offset:offset + STREAM_CHUNK_SIZE])
+
+def _content_disposition(name: str, extension: str) -> str:
+    """Inline Content-Disposition with an ASCII filename, plus the original as RFC 5987 filename*"""
+    filename = f"{name}.{extension}"
+    safe = f'{re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip("-.") or "image"}.{extension}'
+    header = f'inline; filename="{safe}"'
+    if safe != filename:
+        header += f"; filename*=UTF-8''{quote(filename, safe='')}"
+    return header
+
+def _image_response(
+    http_request: Request,
+    image_bytes: bytes,
+    options: ImageOutputRequest,
+    filename: str,
+    headers: Optional[Dict[str, str]] = None,
+    **metadata
+):
+    """Encode a rendered PNG per the request options and build the response
+
+    Binary responses send the image once (streamed when large); JSON
+    responses carry only the single encoding that was asked for.
+    """
+    image_gen = get_image_generator()
+    image_format = options.image_format
+    if image_format == "auto":
+        image_format = _negotiate_image_format(http_request.headers.get("accept", ""))
+    body, media_type = image_gen.encode_image(image_bytes, image_format, options.quality)
+
+    if options.format == "base64":
+        return {"image": image_gen.to_base64(body), "media_type": media_type, **metadata}
+    if options.format == "data_url":
+        return {"data_url": image_gen.to_data_url(body, media_type), "media_type": media_type, **metadata}
+
+    extension = media_type.split("/")[-1]
+    headers = {
+        "Content-Disposition": _content_disposition(filename, extension),
+        "Vary": "Accept",
+        **(headers or {})
+    }
+    if len(body) > STREAM_THRESHOLD:
+        headers["Content-Length"] = str(len(body))
+        return StreamingResponse(_iter_chunks(body), media_type=media_type, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
 
 # Endpoints
 @app.get("/")
@@ -127,6 +402,59 @@ async def health():
         "patterns_count": rag_pipeline.vector_store.count() if rag_pipeline else 0
     }
 
+# Metrics read from component stats at scrape time
+
+def _collect_cache_lookups():
+    samples = []
+    svg_stats = get_svg_generator().cache_stats()
+    for name in ("icon_render", "symbol_render", "icon_resolve"):
+        samples += [((name, "hit"), svg_stats[name]["hits"]), ((name, "miss"), svg_stats[name]["misses"])]
+
+    sd_cache = get_sd_generator().cache
+    if sd_cache is not None:
+        samples += [(("diffusion_image", "hit"), sd_cache.hits), (("diffusion_image", "miss"), sd_cache.misses)]
+
+    if rag_pipeline is not None and rag_pipeline.reranker is not None:
+        reranker = rag_pipeline.reranker
+        samples += [(("rerank_score", "hit"), reranker.hits), (("rerank_score", "miss"), reranker.misses)]
+    return samples
+
+def _collect_queue_depth():
+    stats = get_diffusion_queue().get_stats()
+    samples = [(("diffusion", lane), depth) for lane, depth in stats["lanes"].items()]
+    samples.append((("diffusion", "running"), stats["running"]))
+    job_counts = get_job_manager().store.counts()
+    samples += [(("jobs", status), job_counts.get(status, 0)) for status in ("queued", "running")]
+    return samples
+
+def _collect_diffusion_images():
+    stats = get_diffusion_queue().get_stats()
+    return [
+        (("completed",), stats["images_completed"]),
+        (("failed",), stats["images_failed"]),
+        (("cache_hit",), stats["cache_hits"])
+    ]
+
+def _collect_models_loaded():
+    llm_local = rag_pipeline is not None and not isinstance(rag_pipeline.llm, RemoteService)
+    embeddings_local = rag_pipeline is not None and not isinstance(rag_pipeline.embeddings, RemoteService)
+    return [
+        (("llm",), int(llm_local)),
+        (("embeddings",), int(embeddings_local)),
+        (("flux",), int(get_sd_generator().loaded))
+    ]
+
+register_collector("delm_cache_lookups_total", "Cache lookups by cache and result", "counter", ("cache", "result"), _collect_cache_lookups)
+register_collector("delm_queue_depth", "Work waiting or running per queue", "gauge", ("queue", "state"), _collect_queue_depth)
+register_collector("delm_diffusion_images_total", "Diffusion images by outcome", "counter", ("result",), _collect_diffusion_images)
+register_collector("delm_model_loaded", "Whether a model is loaded in this process", "gauge", ("model",), _collect_models_loaded)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    # Collectors read the job database, so render off the event loop
+    return Response(content=await asyncio.to_thread(render_metrics), media_type="text/plain; version=0.0.4")
+
 @app.post("/generate", response_model=GenerateResponse)
 async def generate(request: GenerateRequest):
     """Generate UI component, styles, or layout"""
@@ -145,22 +473,54 @@ async def generate(request: GenerateRequest):
 
 @app.post("/patterns")
 async def add_pattern(request: PatternRequest):
-    """Add a new design pattern to the knowledge base"""
+    """Add a design pattern to the knowledge base, replacing any with the same ID"""
     if not rag_pipeline:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
     try:
-        rag_pipeline.add_pattern(
+        updated = rag_pipeline.add_pattern(
             pattern_id=request.pattern_id,
             content=request.content,
             category=request.category,
             name=request.name,
             tags=request.tags
         )
-        return {"message": f"Pattern {request.pattern_id} added successfully"}
+        return {"message": f"Pattern {request.pattern_id} {'updated' if updated else 'added'} successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.put("/patterns/{pattern_id}")
+async def put_pattern(pattern_id: str, request: PatternUpdate):
+    """Create or replace the pattern with this ID"""
+    if not rag_pipeline:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    try:
+        updated = rag_pipeline.add_pattern(
+            pattern_id=pattern_id,
+            content=request.content,
+            category=request.category,
+            name=request.name,
+            tags=request.tags
+        )
+        return {"pattern_id": pattern_id, "updated": updated}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/patterns/{pattern_id}")
+async def delete_pattern(pattern_id: str):
+    """Remove a pattern from the knowledge base"""
+    if not rag_pipeline:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    try:
+        deleted = rag_pipeline.delete_pattern(pattern_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Pattern {pattern_id} not found")
+    return {"pattern_id": pattern_id, "deleted": True}
+
 @app.post("/search")
 async def search_patterns(request: SearchRequest):
     """Search for design patterns"""
@@ -195,7 +555,7 @@ async def get_categories():
 # Image Generation Endpoints
 
 @app.post("/generate/image")
-async def generate_image(request: ImageGenerateRequest):
+async def generate_image(request: ImageGenerateRequest, http_request: Request):
     """Generate UI mockup image from prompt"""
     if not rag_pipeline:
         raise HTTPException(status_code=503, detail="Model not loaded")
@@ -215,25 +575,17 @@ async def generate_image(request: ImageGenerateRequest):
             request.height
         )
 
-        if request.format == "binary":
-            return Response(
-                content=image_bytes,
-                media_type="image/png",
-                headers={"Content-Disposition": "inline; filename=mockup.png"}
-            )
-        else:
-            return {
-                "image": image_gen.to_base64(image_bytes),
-                "data_url": image_gen.to_data_url(image_bytes),
-                "width": request.width,
-                "height": request.height,
-                "code": result['output']
-            }
+        return _image_response(
+            http_request, image_bytes, request, "mockup",
+            width=request.width,
+            height=request.height,
+            code=result['output']
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate/mockup")
-async def generate_mockup(request: ComponentMockupRequest):
+async def generate_mockup(request: ComponentMockupRequest, http_request: Request):
     """Generate a simple component mockup image"""
     try:
         image_gen = get_image_generator()
@@ -244,25 +596,17 @@ async def generate_mockup(request: ComponentMockupRequest):
             request.height
         )
 
-        if request.format == "binary":
-            return Response(
-                content=image_bytes,
-                media_type="image/png",
-                headers={"Content-Disposition": f"inline; filename={request.component_type}.png"}
-            )
-        else:
-            return {
-                "image": image_gen.to_base64(image_bytes),
-                "data_url": image_gen.to_data_url(image_bytes),
-                "width": request.width,
-                "height": request.height,
-                "component_type": request.component_type
-            }
+        return _image_response(
+            http_request, image_bytes, request, request.component_type,
+            width=request.width,
+            height=request.height,
+            component_type=request.component_type
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate/code-to-image")
-async def code_to_image(request: CodeToImageRequest):
+async def code_to_image(request: CodeToImageRequest, http_request: Request):
     """Convert code to rendered image"""
     try:
         image_gen = get_image_generator()
@@ -272,32 +616,130 @@ async def code_to_image(request: CodeToImageRequest):
             request.height
         )
 
-        if request.format == "binary":
-            return Response(
-                content=image_bytes,
-                media_type="image/png",
-                headers={"Content-Disposition": "inline; filename=rendered.png"}
-            )
-        else:
-            return {
-                "image": image_gen.to_base64(image_bytes),
-                "data_url": image_gen.to_data_url(image_bytes),
-                "width": request.width,
-                "height": request.height
-            }
+        return _image_response(
+            http_request, image_bytes, request, "rendered",
+            width=request.width,
+            height=request.height
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # SVG Generation Endpoints
 
 @app.get("/icons")
-async def list_icons():
-    """List all available icons"""
+async def list_icons(request: Request):
+    """List all available icons (ETag-cacheable manifest)"""
+    svg_gen = get_svg_generator()
+    return _cacheable_response(
+        request,
+        svg_gen.get_icon_manifest(),
+        "application/json",
+        svg_gen.icon_manifest_etag
+    )
+
+@app.get("/icons/search")
+async def search_icons(q: str, limit: int = 10, semantic: bool = False):
+    """Fuzzy icon lookup: names, prefixes, typos, synonyms and (optionally) meaning"""
+    svg_gen = get_svg_generator()
+    matches = svg_gen.search_icons(q, limit=limit, semantic=semantic)
+    return {"query": q, "matches": matches, "count": len(matches)}
+
+@app.get("/icons/sprite.svg")
+async def icon_sprite_sheet(request: Request):
+    """Prebuilt SVG sprite sheet containing every icon as a <symbol>"""
+    svg_gen = get_svg_generator()
+    return _cacheable_response(
+        request,
+        svg_gen.build_sprite_sheet(),
+        "image/svg+xml",
+        svg_gen.icon_manifest_etag
+    )
+
+@app.get("/icons/sprite")
+async def icon_sprite(
+    request: Request,
+    names: Optional[str] = None,
+    color: str = "currentColor",
+    stroke_width: float = 2
+):
+    """SVG <symbol> sprite for a comma-separated set of icons (all if omitted)"""
+    svg_gen = get_svg_generator()
+    icon_names = _parse_icon_names(names)
+    found, missing = svg_gen.resolve_icon_names(icon_names)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown icons: {', '.join(missing)}")
+
+    return _cacheable_response(
+        request,
+        svg_gen.generate_sprite(found, color, stroke_width),
+        "image/svg+xml",
+        _variant_etag(svg_gen.icon_manifest_etag, "sprite", found, color, stroke_width)
+    )
+
+@app.get("/icons/atlas.json")
+async def icon_atlas_map(
+    request: Request,
+    names: Optional[str] = None,
+    size: int = 24,
+    color: str = "#000000",
+    stroke_width: float = 2,
+    padding: int = 0
+):
+    """Coordinate map for the PNG atlas returned by /icons/atlas.png"""
+    svg_gen = get_svg_generator()
+    found, missing = svg_gen.resolve_icon_names(_parse_icon_names(names))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown icons: {', '.join(missing)}")
+
+    _, coordinate_map = svg_gen.build_icon_atlas(found, size, color, stroke_width, padding)
+    return _cacheable_response(
+        request,
+        coordinate_map,
+        "application/json",
+        _variant_etag(svg_gen.icon_manifest_etag, "atlas-map", found, size, color, stroke_width, padding)
+    )
+
+@app.get("/icons/atlas.png")
+async def icon_atlas_png(
+    request: Request,
+    names: Optional[str] = None,
+    size: int = 24,
+    color: str = "#000000",
+    stroke_width: float = 2,
+    padding: int = 0
+):
+    """PNG atlas of icons laid out on a grid (see /icons/atlas.json for coordinates)"""
     svg_gen = get_svg_generator()
-    return {"icons": svg_gen.list_available_icons()}
+    found, missing = svg_gen.resolve_icon_names(_parse_icon_names(names))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown icons: {', '.join(missing)}")
+
+    etag = _variant_etag(svg_gen.icon_manifest_etag, "atlas-png", found, size, color, stroke_width, padding)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    try:
+        atlas_svg, coordinate_map = svg_gen.build_icon_atlas(found, size, color, stroke_width, padding)
+        image_gen = get_image_generator()
+        image_bytes = image_gen.svg_to_png(atlas_svg, coordinate_map["width"], coordinate_map["height"])
+        return _cacheable_response(request, image_bytes, "image/png", etag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/icons/pack.zip")
+async def icon_pack(request: Request):
+    """Prebuilt ZIP of every icon at the common pack sizes"""
+    svg_gen = get_svg_generator()
+    return _cacheable_response(
+        request,
+        svg_gen.build_icon_pack(),
+        "application/zip",
+        svg_gen.icon_manifest_etag,
+        headers={"Content-Disposition": "attachment; filename=delm-icons.zip"}
+    )
 
 @app.post("/generate/icon")
-async def generate_icon(request: IconRequest):
+async def generate_icon(request: IconRequest, http_request: Request):
     """Generate an SVG icon"""
     try:
         svg_gen = get_svg_generator()
@@ -319,19 +761,12 @@ async def generate_icon(request: IconRequest):
             html = f'<div style="display:flex;align-items:center;justify-content:center;width:100%;height:100%">{svg_content}</div>'
             image_bytes = await image_gen.html_to_png(html, request.size * 4, request.size * 4)
 
-            if request.format == "binary":
-                return Response(content=image_bytes, media_type="image/png")
-            else:
-                return {
-                    "image": image_gen.to_base64(image_bytes),
-                    "data_url": image_gen.to_data_url(image_bytes),
-                    "name": request.name
-                }
+            return _image_response(http_request, image_bytes, request, request.name, name=request.name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate/symbol")
-async def generate_symbol(request: SymbolRequest):
+async def generate_symbol(request: SymbolRequest, http_request: Request):
     """Generate a decorative symbol"""
     try:
         svg_gen = get_svg_generator()
@@ -339,7 +774,8 @@ async def generate_symbol(request: SymbolRequest):
             request.symbol_type,
             request.size,
             request.primary_color,
-            request.secondary_color
+            request.secondary_color,
+            request.id_suffix
         )
 
         if request.format == "svg":
@@ -353,108 +789,566 @@ async def generate_symbol(request: SymbolRequest):
             html = f'<div style="display:flex;align-items:center;justify-content:center;width:100%;height:100%">{svg_content}</div>'
             image_bytes = await image_gen.html_to_png(html, request.size * 2, request.size * 2)
 
-            if request.format == "binary":
-                return Response(content=image_bytes, media_type="image/png")
-            else:
-                return {
-                    "image": image_gen.to_base64(image_bytes),
-                    "data_url": image_gen.to_data_url(image_bytes),
-                    "symbol_type": request.symbol_type
-                }
+            return _image_response(
+                http_request, image_bytes, request, request.symbol_type,
+                symbol_type=request.symbol_type
+            )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate/symbols")
+async def generate_symbols(request: SymbolsRequest):
+    """Generate a palette of SVG symbols sharing size and colors"""
+    svg_gen = get_svg_generator()
+    symbol_types = request.symbol_types or svg_gen.list_symbol_types()
+
+    unknown = [t for t in symbol_types if t not in svg_gen.list_symbol_types()]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown symbol types: {', '.join(unknown)}")
+
+    symbols = {
+        symbol_type: svg_gen.generate_symbol(
+            symbol_type,
+            request.size,
+            request.primary_color,
+            request.secondary_color
+        )
+        for symbol_type in symbol_types
+    }
+    return {"symbols": symbols, "count": len(symbols)}
+
 # AI Image Generation Endpoints (Stable Diffusion)
 
+@app.get("/models/sd/status")
+async def sd_model_status():
+    """Stable Diffusion model load state and load-time metrics"""
+    return get_sd_generator().get_status()
+
+@app.get("/sidecars")
+async def sidecar_metrics():
+    """Per-instance metrics for each model-serving sidecar"""
+    services = {}
+    for service in SERVICES:
+        client = get_sidecar_client(service)
+        services[service] = await asyncio.to_thread(client.metrics) if client else "in-process"
+    return services
+
+@app.post("/models/sd/warmup")
+async def sd_model_warmup():
+    """Load the Stable Diffusion model now instead of on the first request"""
+    sd_gen = get_sd_generator()
+    status = await asyncio.to_thread(sd_gen.warm_up)
+    if not status["loaded"]:
+        raise HTTPException(status_code=503, detail=status["last_load_error"] or "Model failed to load")
+    return status
+
+@app.post("/models/sd/unload")
+async def sd_model_unload():
+    """Free Stable Diffusion model memory; it reloads on the next request"""
+    sd_gen = get_sd_generator()
+    unloaded = await asyncio.to_thread(sd_gen.unload)
+    return {"unloaded": unloaded, **sd_gen.get_status()}
+
+@app.delete("/models/sd/cache")
+async def sd_cache_clear():
+    """Drop every cached diffusion output"""
+    sd_gen = get_sd_generator()
+    if sd_gen.cache is None:
+        return {"cleared": 0}
+    cleared = await asyncio.to_thread(sd_gen.cache.clear)
+    return {"cleared": cleared}
+
+def _queue_headers(job) -> Dict[str, str]:
+    return {"X-Queue-Position": str(job.queue_position), "X-Job-Id": job.id}
+
 @app.post("/generate/ai-image")
-async def generate_ai_image(request: AIImageRequest):
+async def generate_ai_image(request: AIImageRequest, http_request: Request):
     """Generate an image using Stable Diffusion"""
     try:
-        sd_gen = get_sd_generator()
-        image_bytes = sd_gen.generate(
+        image_bytes, job = await get_diffusion_queue().run(
             request.prompt,
             request.width,
             request.height,
             request.num_steps,
-            request.seed
+            request.seed,
+            request.priority
         )
 
         if image_bytes is None:
             raise HTTPException(status_code=500, detail="Image generation failed")
 
-        if request.format == "binary":
-            return Response(content=image_bytes, media_type="image/png")
-        else:
-            import base64
-            b64 = base64.b64encode(image_bytes).decode('utf-8')
-            return {
-                "image": b64,
-                "data_url": f"data:image/png;base64,{b64}",
-                "width": request.width,
-                "height": request.height,
-                "prompt": request.prompt
-            }
+        return _image_response(
+            http_request, image_bytes, request, "ai-image",
+            headers=_queue_headers(job),
+            width=request.width,
+            height=request.height,
+            prompt=request.prompt,
+            queue_position=job.queue_position
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate/logo")
-async def generate_logo(request: LogoRequest):
+async def generate_logo(request: LogoRequest, http_request: Request):
     """Generate a logo using AI"""
     try:
         sd_gen = get_sd_generator()
-        image_bytes = sd_gen.generate_logo(
-            request.description,
-            request.style,
+        image_bytes, job = await get_diffusion_queue().run(
+            sd_gen.logo_prompt(request.description, request.style),
             request.width,
-            request.height
+            request.height,
+            priority=request.priority
         )
 
         if image_bytes is None:
             raise HTTPException(status_code=500, detail="Logo generation failed")
 
+        return _image_response(
+            http_request, image_bytes, request, "logo",
+            headers=_queue_headers(job),
+            width=request.width,
+            height=request.height,
+            description=request.description,
+            style=request.style,
+            queue_position=job.queue_position
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _generate_variants(
+    request: VariantsRequest,
+    http_request: Request,
+    prompt_builder,
+    default_style: str,
+    kind: str
+):
+    """Fan a description out over styles x seeds as one queued batch"""
+    styles = request.styles or [default_style]
+    seeds = request.seeds or [DEFAULT_SEED + i for i in range(max(1, request.count))]
+    variants = [(style, seed) for style in styles for seed in seeds]
+    if len(variants) > MAX_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(variants)} variants requested; at most {MAX_VARIANTS} are allowed"
+        )
+
+    try:
+        # Grouped by style, so seed variants of one prompt run back-to-back
+        images, jobs = await get_diffusion_queue().run_many(
+            [prompt_builder(request.description, style) for style, _ in variants],
+            [seed for _, seed in variants],
+            request.width,
+            request.height,
+            priority=request.priority
+        )
+
+        image_gen = get_image_generator()
+        labels = [f"{style} / seed {seed}" for style, seed in variants]
+        sheet = await asyncio.to_thread(image_gen.build_contact_sheet, images, labels, request.columns)
+
+        image_format = request.image_format
+        if image_format == "auto":
+            image_format = _negotiate_image_format(http_request.headers.get("accept", ""))
+        encoded = [image_gen.encode_image(image, image_format, request.quality) for image in images]
+
         if request.format == "binary":
-            return Response(content=image_bytes, media_type="image/png")
-        else:
-            import base64
-            b64 = base64.b64encode(image_bytes).decode('utf-8')
-            return {
-                "image": b64,
-                "data_url": f"data:image/png;base64,{b64}",
-                "width": request.width,
-                "height": request.height,
-                "description": request.description,
-                "style": request.style
-            }
+            # One archive carries the sheet and every individual variant
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+                archive.writestr("contact-sheet.png", sheet)
+                for (style, seed), (body, media_type) in zip(variants, encoded):
+                    archive.writestr(f"{kind}-{style}-{seed}.{media_type.split('/')[-1]}", body)
+            return Response(
+                content=buffer.getvalue(),
+                media_type="application/zip",
+                headers={"Content-Disposition": f"attachment; filename={kind}-variants.zip"}
+            )
+
+        def payload(body: bytes, media_type: str) -> Dict[str, Any]:
+            if request.format == "base64":
+                return {"image": image_gen.to_base64(body), "media_type": media_type}
+            return {"data_url": image_gen.to_data_url(body, media_type), "media_type": media_type}
+
+        return {
+            "description": request.description,
+            "width": request.width,
+            "height": request.height,
+            "contact_sheet": payload(sheet, "image/png"),
+            "variants": [
+                {"style": style, "seed": seed, "job_id": job.id, **payload(body, media_type)}
+                for (style, seed), job, (body, media_type) in zip(variants, jobs, encoded)
+            ]
+        }
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate/logo/variants")
+async def generate_logo_variants(request: LogoVariantsRequest, http_request: Request):
+    """Generate a logo across several styles and seeds with a contact sheet"""
+    return await _generate_variants(request, http_request, get_sd_generator().logo_prompt, "modern", "logo")
+
 @app.post("/generate/illustration")
-async def generate_illustration(request: IllustrationRequest):
+async def generate_illustration(request: IllustrationRequest, http_request: Request):
     """Generate an illustration using AI"""
     try:
         sd_gen = get_sd_generator()
-        image_bytes = sd_gen.generate_illustration(
-            request.description,
-            request.style,
+        image_bytes, job = await get_diffusion_queue().run(
+            sd_gen.illustration_prompt(request.description, request.style),
             request.width,
-            request.height
+            request.height,
+            priority=request.priority
         )
 
         if image_bytes is None:
             raise HTTPException(status_code=500, detail="Illustration generation failed")
 
-        if request.format == "binary":
-            return Response(content=image_bytes, media_type="image/png")
-        else:
-            import base64
-            b64 = base64.b64encode(image_bytes).decode('utf-8')
-            return {
-                "image": b64,
-                "data_url": f"data:image/png;base64,{b64}",
-                "width": request.width,
-                "height": request.height,
-                "description": request.description,
-                "style": request.style
-            }
+        return _image_response(
+            http_request, image_bytes, request, "illustration",
+            headers=_queue_headers(job),
+            width=request.width,
+            height=request.height,
+            description=request.description,
+            style=request.style,
+            queue_position=job.queue_position
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/generate/illustration/variants")
+async def generate_illustration_variants(request: IllustrationVariantsRequest, http_request: Request):
+    """Generate an illustration across several styles and seeds with a contact sheet"""
+    return await _generate_variants(
+        request, http_request, get_sd_generator().illustration_prompt, "digital", "illustration"
+    )
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/generate/ai-image/stream")
+async def stream_ai_image(request: AIImageStreamRequest):
+    """Generate an image, streaming per-step progress and previews as server-sent events
+
+    Disconnecting cancels the generation at its next step.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    disconnected = threading.Event()
+
+    def on_step(step: int, total: int, latents):
+        # Runs on the diffusion worker thread
+        if disconnected.is_set():
+            raise GenerationCancelled("Client disconnected")
+        data = {"step": step, "total": total}
+        if request.previews and latents is not None:
+            preview = decode_latent_preview(latents, request.width, request.height, request.preview_size)
+            if preview is not None:
+                data["preview"] = get_image_generator().to_data_url(preview, "image/jpeg")
+        loop.call_soon_threadsafe(events.put_nowait, data)
+
+    try:
+        job = await get_diffusion_queue().submit(
+            request.prompt,
+            request.width,
+            request.height,
+            request.num_steps,
+            request.seed,
+            request.priority,
+            step_callback=on_step
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def stream():
+        result = asyncio.wrap_future(job.future)
+        try:
+            yield _sse_event("queued", {"job_id": job.id, "queue_position": job.queue_position})
+
+            while not result.done() or not events.empty():
+                next_event = asyncio.ensure_future(events.get())
+                await asyncio.wait({next_event, result}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event.done():
+                    yield _sse_event("progress", next_event.result())
+                else:
+                    next_event.cancel()
+
+            try:
+                image_bytes = result.result()
+            except (GenerationCancelled, asyncio.CancelledError):
+                yield _sse_event("cancelled", {"job_id": job.id})
+                return
+            except Exception as e:
+                yield _sse_event("error", {"detail": str(e)})
+                return
+
+            image_gen = get_image_generator()
+            image_format = "png" if request.image_format == "auto" else request.image_format
+            body, media_type = image_gen.encode_image(image_bytes, image_format, request.quality)
+            yield _sse_event("complete", {
+                "data_url": image_gen.to_data_url(body, media_type),
+                "media_type": media_type,
+                "width": request.width,
+                "height": request.height,
+                "prompt": request.prompt
+            })
+        finally:
+            # Client went away (or we finished): stop any remaining denoising
+            disconnected.set()
+            job.future.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Job-Id": job.id}
+    )
+
+@app.get("/queue/diffusion")
+async def diffusion_queue_stats():
+    """Diffusion queue depth per lane, batching and images/minute throughput"""
+    return get_diffusion_queue().get_stats()
+
+@app.get("/queue/diffusion/{job_id}")
+async def diffusion_queue_position(job_id: str):
+    """Current queue position of a pending diffusion job"""
+    position = get_diffusion_queue().position(job_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Job is not queued (running, finished or unknown)")
+    return {"job_id": job_id, "queue_position": position}
+
+# Async Job Endpoints
+
+class JobRequest(BaseModel):
+    type: str  # ai-image, logo, illustration, image
+    params: Dict[str, Any] = {}
+
+async def _run_diffusion_job(prompt: str, request: DiffusionPriorityRequest, context, num_steps: int = 4, seed: Optional[int] = None) -> bytes:
+    """Queue a diffusion job, reporting denoising steps as job progress"""
+    job = await get_diffusion_queue().submit(
+        prompt,
+        request.width,
+        request.height,
+        num_steps,
+        seed,
+        request.priority,
+        step_callback=context.step_callback(end=0.95)
+    )
+    context.on_cancel(job.future.cancel)
+    try:
+        return await asyncio.wrap_future(job.future)
+    except asyncio.CancelledError:
+        if context.cancelled.is_set():
+            raise JobCancelled()
+        raise
+
+def _job_result(image_bytes: Optional[bytes], request: ImageOutputRequest, **metadata):
+    if image_bytes is None:
+        raise RuntimeError("Image generation failed")
+    body, media_type = get_image_generator().encode_image(image_bytes, request.image_format, request.quality)
+    return body, media_type, {"width": request.width, "height": request.height, **metadata}
+
+async def _ai_image_job(params: Dict[str, Any], context):
+    request = AIImageRequest(**params)
+    image_bytes = await _run_diffusion_job(request.prompt, request, context, request.num_steps, request.seed)
+    return _job_result(image_bytes, request, prompt=request.prompt, seed=request.seed)
+
+async def _logo_job(params: Dict[str, Any], context):
+    request = LogoRequest(**params)
+    prompt = get_sd_generator().logo_prompt(request.description, request.style)
+    image_bytes = await _run_diffusion_job(prompt, request, context)
+    return _job_result(image_bytes, request, description=request.description, style=request.style)
+
+async def _illustration_job(params: Dict[str, Any], context):
+    request = IllustrationRequest(**params)
+    prompt = get_sd_generator().illustration_prompt(request.description, request.style)
+    image_bytes = await _run_diffusion_job(prompt, request, context)
+    return _job_result(image_bytes, request, description=request.description, style=request.style)
+
+async def _image_job(params: Dict[str, Any], context):
+    request = ImageGenerateRequest(**params)
+    if not rag_pipeline:
+        raise RuntimeError("Model not loaded")
+    result = await asyncio.to_thread(rag_pipeline.generate, prompt=request.prompt, generation_type="component")
+    await asyncio.to_thread(context.report, 0.7)
+    context.check()
+    image_bytes = await get_image_generator().generate_from_code(result['output'], request.width, request.height)
+    return _job_result(image_bytes, request, code=result['output'])
+
+JOB_HANDLERS = {
+    "ai-image": _ai_image_job,
+    "logo": _logo_job,
+    "illustration": _illustration_job,
+    "image": _image_job,
+}
+
+JOB_REQUEST_MODELS = {
+    "ai-image": AIImageRequest,
+    "logo": LogoRequest,
+    "illustration": IllustrationRequest,
+    "image": ImageGenerateRequest,
+}
+
+def _job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    status = {
+        "job_id": job['id'],
+        "type": job['type'],
+        "status": job['status'],
+        "progress": round(job['progress'], 3),
+        "error": job['error'],
+        "created_at": job['created_at'],
+        "started_at": job['started_at'],
+        "finished_at": job['finished_at'],
+        "expires_at": job['expires_at']
+    }
+    if job['status'] == "completed":
+        status["media_type"] = job['media_type']
+        status["result"] = job['result_meta']
+        status["result_url"] = f"/jobs/{job['id']}/result"
+    return status
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest, http_request: Request):
+    """Submit a long-running generation and poll for its result"""
+    model = JOB_REQUEST_MODELS.get(request.type)
+    if model is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown job type: {request.type} (expected one of {', '.join(JOB_REQUEST_MODELS)})"
+        )
+    try:
+        params = model(**request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # The worker has no request to negotiate against, so resolve "auto" now
+    if params.image_format == "auto":
+        params.image_format = _negotiate_image_format(http_request.headers.get("accept", ""))
+
+    job_manager = get_job_manager()
+    job_id = await job_manager.submit(request.type, params.model_dump())
+    return _job_status(await asyncio.to_thread(job_manager.store.get, job_id))
+
+@app.get("/jobs")
+async def job_stats():
+    """Job counts by status"""
+    job_manager = get_job_manager()
+    counts = await asyncio.to_thread(job_manager.store.counts)
+    return {"workers": job_manager.workers, "running": len(job_manager.running), "jobs": counts}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status and progress"""
+    job = await asyncio.to_thread(get_job_manager().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Download the result of a completed job"""
+    job = await asyncio.to_thread(get_job_manager().store.get, job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    extension = job['media_type'].split("/")[-1]
+    return Response(
+        content=job['result'],
+        media_type=job['media_type'],
+        headers={"Content-Disposition": f"inline; filename={job['type']}-{job_id}.{extension}"}
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job_manager = get_job_manager()
+    if await asyncio.to_thread(job_manager.store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not await job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    return _job_status(await asyncio.to_thread(job_manager.store.get, job_id))
+
+# Admin Profiling Endpoints
+
+MAX_PROFILE_WINDOW_SECONDS = 300
+
+class ProfileWindowRequest(BaseModel):
+    seconds: float = 10.0
+
+class MemoryTraceRequest(BaseModel):
+    frames: int = 10  # stack depth recorded per allocation; deeper costs more memory
+
+def _require_admin(http_request: Request):
+    if not get_profile_recorder().is_admin(http_request.headers):
+        raise HTTPException(status_code=403, detail="Admin access required (profiling.enabled and X-Admin-Token)")
+
+@app.post("/admin/profile")
+async def profile_window(request: ProfileWindowRequest, http_request: Request):
+    """Profile the server for a time window and store the report"""
+    _require_admin(http_request)
+    if not 0 < request.seconds <= MAX_PROFILE_WINDOW_SECONDS:
+        raise HTTPException(status_code=422, detail=f"seconds must be between 0 and {MAX_PROFILE_WINDOW_SECONDS}")
+    try:
+        return await get_profile_recorder().profile_window(request.seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/profiles")
+async def list_profiles(http_request: Request):
+    """Stored profile reports, newest first"""
+    _require_admin(http_request)
+    return {"profiler": get_profile_recorder().profiler_kind, "profiles": get_profile_recorder().list_profiles()}
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str, http_request: Request):
+    """Download a stored profile report"""
+    _require_admin(http_request)
+    path = get_profile_recorder().profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path, "rb") as f:
+        content = f.read()
+    return Response(
+        content=content,
+        media_type=PROFILE_MEDIA_TYPES.get(os.path.splitext(name)[1], "application/octet-stream"),
+        headers={"Content-Disposition": f"inline; filename={name}"}
+    )
+
+@app.post("/admin/memory/start")
+async def start_memory_tracing(request: MemoryTraceRequest, http_request: Request):
+    """Start tracemalloc so /admin/memory can report allocation sites"""
+    _require_admin(http_request)
+    get_memory_tracker().start(request.frames)
+    return {"tracing": True, "frames": request.frames}
+
+@app.post("/admin/memory/stop")
+async def stop_memory_tracing(http_request: Request):
+    """Stop tracemalloc and release its bookkeeping memory"""
+    _require_admin(http_request)
+    get_memory_tracker().stop()
+    return {"tracing": False}
+
+@app.get("/admin/memory")
+async def memory_snapshot(
+    http_request: Request,
+    top: int = 25,
+    group_by: str = "lineno",
+    compare: bool = False
+):
+    """Top allocation sites, or growth since the previous snapshot with compare=true"""
+    _require_admin(http_request)
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=422, detail="group_by must be lineno, filename or traceback")
+    tracker = get_memory_tracker()
+    if not tracker.tracing:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /admin/memory/start first")
+    return await asyncio.to_thread(tracker.snapshot, top, group_by, compare)
@@ -0,0 +1,183 @@
+"""
+Code-aware splitting of long patterns into chunks the embedding model sees in
+full, so search matches any part of a pattern and the generation context
+carries only the parts that matched
+"""
+import re
+from typing import List, Tuple
+
+# About 256 embedding tokens of code, the all-MiniLM-L6-v2 input limit
+DEFAULT_MAX_CHARS = 600
+
+# Deepest bracket level split on before falling back to runs of lines
+MAX_SPLIT_DEPTH = 3
+
+_PREAMBLE = re.compile(r"""^(import\b|export\s+(\*|\{[^}]*\})\s+from\b|['"]use \w+['"]|@import\b|@charset\b)""")
+_COMMENT = re.compile(r"^(//|/\*|\*|<!--)")
+# Statements ending like this continue on the next line
+_CONTINUATION = re.compile(r"(=|=>|,|\{|\(|\[|&&|\|\||\?|:|\+|-)$")
+
+_OPENERS = "{(["
+_CLOSERS = "})]"
+
+
+def chunk_id(pattern_id: str, index: int) -> str:
+    return f"{pattern_id}#{index}"
+
+
+def chunk_index(chunk_id: str) -> int:
+    return int(chunk_id.rsplit("#", 1)[1])
+
+
+def _scan_line(line: str, depth: int, in_comment: bool) -> Tuple[int, bool, str]:
+    """Bracket depth after the line, whether a block comment is still open, and the code without comments"""
+    code = []
+    quote = None
+    i = 0
+    while i < len(line):
+        char = line[i]
+        pair = line[i:i + 2]
+        if in_comment:
+            if pair == "*/":
+                in_comment = False
+                i += 1
+        elif quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+            code.append(char)
+        elif pair == "/*":
+            in_comment = True
+            i += 1
+        elif pair == "//" and (i == 0 or line[i - 1] != ":"):
+            break
+        else:
+            if char in "'\"`":
+                quote = char
+            elif char in _OPENERS:
+                depth += 1
+            elif char in _CLOSERS:
+                depth = max(depth - 1, 0)
+            code.append(char)
+        i += 1
+    # Strings do not span lines; an apostrophe in JSX text only affects its own line
+    return depth, in_comment, "".join(code).strip()
+
+
+def _analyze(lines: List[str]) -> List[Tuple[int, int, str]]:
+    """(depth at start, depth at end, code) for each line"""
+    analyzed = []
+    depth, in_comment = 0, False
+    for line in lines:
+        start = depth
+        depth, in_comment, code = _scan_line(line, depth, in_comment)
+        analyzed.append((start, depth, code))
+    return analyzed
+
+
+def _boundaries(analyzed, start: int, end: int, depth: int) -> List[int]:
+    """Lines in [start, end) that begin a statement at this bracket depth, moved up over leading comments"""
+    boundaries = []
+    previous_code = None
+    pending = None
+    for i in range(start, end):
+        line_depth, end_depth, code = analyzed[i]
+        if not code:
+            # Comments and blank lines belong to the statement below them
+            if pending is None and line_depth == depth:
+                pending = i
+            continue
+        if (
+            line_depth == depth
+            and previous_code is not None
+            and analyzed[previous_code][1] == depth
+            and not _CONTINUATION.search(analyzed[previous_code][2])
+            and code[0] not in _CLOSERS
+        ):
+            boundaries.append(pending if pending is not None else i)
+        previous_code = i
+        pending = None
+    return boundaries
+
+
+def _text(lines: List[str], start: int, end: int) -> str:
+    return "\n".join(lines[start:end]).strip("\n")
+
+
+def _split_range(lines, analyzed, start: int, end: int, depth: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Line ranges of at most max_chars, cut at statement boundaries as shallow as possible"""
+    if len(_text(lines, start, end)) <= max_chars:
+        return [(start, end)]
+    if depth > MAX_SPLIT_DEPTH:
+        ranges, first = [], start
+        for i in range(start + 1, end):
+            if len(_text(lines, first, i + 1)) > max_chars:
+                ranges.append((first, i))
+                first = i
+        return ranges + [(first, end)]
+
+    cuts = [start] + [i for i in _boundaries(analyzed, start, end, depth) if i > start] + [end]
+    pieces = []
+    for piece_start, piece_end in zip(cuts, cuts[1:]):
+        pieces.extend(_split_range(lines, analyzed, piece_start, piece_end, depth + 1, max_chars))
+    # Rejoin neighbours that fit together
+    merged = [pieces[0]]
+    for piece_start, piece_end in pieces[1:]:
+        if len(_text(lines, merged[-1][0], piece_end)) <= max_chars:
+            merged[-1] = (merged[-1][0], piece_end)
+        else:
+            merged.append((piece_start, piece_end))
+    return merged
+
+
+def split_pattern(content: str, max_chars: int = DEFAULT_MAX_CHARS) -> Tuple[str, List[str]]:
+    """(header, chunks) for a pattern
+
+    The header is the leading imports and directives. Chunks follow top-level
+    declarations (components, functions, interfaces, CSS rules); longer ones
+    are cut between the statements inside them, and each continuation starts
+    with its declaration's first line. A pattern within max_chars is one chunk.
+    Every pattern gets at least one chunk, so each stored pattern has a row in
+    the chunk table: an empty or all-header pattern is one whole-content chunk.
+    """
+    content = content.strip("\n")
+    if len(content) <= max_chars:
+        return "", [content]
+
+    lines = content.split("\n")
+    analyzed = _analyze(lines)
+    top_level = [0] + [i for i in _boundaries(analyzed, 0, len(lines), 0) if i > 0] + [len(lines)]
+    blocks = [(start, end) for start, end in zip(top_level, top_level[1:]) if _text(lines, start, end).strip()]
+
+    header_end = 0
+    for start, end in blocks:
+        code = next((code for _, _, code in analyzed[start:end] if code), "")
+        if code and not _PREAMBLE.match(code):
+            break
+        header_end = end
+    header = _text(lines, 0, header_end)
+
+    # (text, whether it continues the declaration before it)
+    chunks: List[Tuple[str, bool]] = []
+    for start, end in blocks:
+        if end <= header_end:
+            continue
+        title = next((lines[i].strip() for i in range(start, end) if analyzed[i][2]), "")[:120]
+        budget = max(max_chars - len(title) - 4, max_chars // 2)
+        for position, (piece_start, piece_end) in enumerate(_split_range(lines, analyzed, start, end, 1, budget)):
+            text = _text(lines, piece_start, piece_end)
+            if text.strip():
+                chunks.append((f"{title} ...\n{text}", True) if position else (text, False))
+
+    # Rejoin neighbouring small blocks, such as a props interface and its component
+    merged: List[str] = []
+    for text, continued in chunks:
+        if merged and not continued and len(merged[-1]) + len(text) + 2 <= max_chars:
+            merged[-1] = f"{merged[-1]}\n\n{text}"
+        else:
+            merged.append(text)
+    if not merged:
+        # Nothing after the imports and directives; the whole pattern is the chunk
+        return "", [content]
+    return header, merged
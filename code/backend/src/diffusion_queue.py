@@ -0,0 +1,416 @@
+"""
+Diffusion job queue with priority lanes and batched generation
+"""
+import asyncio
+import hashlib
+import io
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Tuple
+import yaml
+
+from .sd_generator import GenerationCancelled, StepCallback
+from .tracing import current_span, record_span
+
+# Lanes are drained strictly in this order
+PRIORITIES = ("high", "normal", "low")
+
+
+class QueueFullError(Exception):
+    """Raised when the diffusion queue is at capacity"""
+
+
+class DiffusionJob:
+    def __init__(
+        self,
+        prompt: str,
+        width: int,
+        height: int,
+        num_steps: int,
+        seed: Optional[int],
+        priority: str,
+        step_callback: Optional[StepCallback] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.width = width
+        self.height = height
+        self.num_steps = num_steps
+        self.seed = seed
+        self.priority = priority
+        self.step_callback = step_callback
+        self.submitted_at = time.monotonic()
+        self.submitted_ns = time.time_ns()
+        # The worker thread has no request context; spans are attached to the submitter's
+        self.trace_parent = current_span()
+        self.queue_position = 0
+        self.future: Future = Future()
+
+    @property
+    def batch_key(self) -> Tuple[int, int, int]:
+        """Jobs sharing size and step count can be denoised in one batch"""
+        return (self.width, self.height, self.num_steps)
+
+
+class FluxDiffusionBackend:
+    """Runs batches on the shared StableDiffusionGenerator"""
+    name = "flux"
+
+    def __init__(self, sd_generator):
+        self.sd_generator = sd_generator
+
+    def cached_image(self, prompt: str, width: int, height: int, num_steps: int, seed: Optional[int]) -> Optional[bytes]:
+        return self.sd_generator.cached_image(prompt, width, height, num_steps, seed)
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        seeds: List[Optional[int]],
+        width: int,
+        height: int,
+        num_steps: int,
+        step_callbacks: Optional[List[Optional[StepCallback]]] = None
+    ) -> List[Optional[bytes]]:
+        """Returns PNG bytes per prompt, or None for cancelled generations"""
+        return self.sd_generator.generate_batch(prompts, seeds, width, height, num_steps, step_callbacks)
+
+
+class FakeDiffusionBackend:
+    """CPU stand-in that renders a deterministic gradient per (prompt, seed)
+
+    A batch costs step_seconds per step regardless of its size, mimicking
+    the amortization of a real batched denoising run.
+    """
+    name = "fake"
+
+    def __init__(self, step_seconds: float = 0.0):
+        self.step_seconds = step_seconds
+        self.batches_run = 0
+
+    def cached_image(self, prompt: str, width: int, height: int, num_steps: int, seed: Optional[int]) -> Optional[bytes]:
+        return None
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        seeds: List[Optional[int]],
+        width: int,
+        height: int,
+        num_steps: int,
+        step_callbacks: Optional[List[Optional[StepCallback]]] = None
+    ) -> List[Optional[bytes]]:
+        step_callbacks = step_callbacks or [None] * len(prompts)
+        cancelled = set()
+        for step in range(1, num_steps + 1):
+            if self.step_seconds:
+                time.sleep(self.step_seconds)
+            for index, step_callback in enumerate(step_callbacks):
+                if step_callback is None or index in cancelled:
+                    continue
+                try:
+                    step_callback(step, num_steps, None)
+                except GenerationCancelled:
+                    cancelled.add(index)
+        self.batches_run += 1
+        return [
+            None if index in cancelled else self._render(prompt, seed, width, height)
+            for index, (prompt, seed) in enumerate(zip(prompts, seeds))
+        ]
+
+    def _render(self, prompt: str, seed: Optional[int], width: int, height: int) -> bytes:
+        from PIL import Image, ImageOps
+
+        digest = hashlib.sha256(f"{prompt}|{seed}".encode('utf-8')).digest()
+        start, end = tuple(digest[0:3]), tuple(digest[3:6])
+        gradient = Image.linear_gradient('L').resize((width, height))
+        img = ImageOps.colorize(gradient, start, end)
+
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+
+class DiffusionQueue:
+    def __init__(
+        self,
+        backend,
+        max_batch_size: int = 4,
+        batch_wait_ms: int = 50,
+        max_queue_size: int = 64
+    ):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+
+        self._lanes: Dict[str, deque] = {priority: deque() for priority in PRIORITIES}
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._running_batch: List[DiffusionJob] = []
+
+        # Throughput metrics
+        self.images_completed = 0
+        self.images_failed = 0
+        self.cache_hits = 0
+        self.batches_run = 0
+        self.total_wait_seconds = 0.0
+        self.total_batch_seconds = 0.0
+        self._completions: deque = deque()
+
+    async def submit(
+        self,
+        prompt: str,
+        width: int = 512,
+        height: int = 512,
+        num_steps: int = 4,
+        seed: Optional[int] = None,
+        priority: str = "normal",
+        step_callback: Optional[StepCallback] = None
+    ) -> DiffusionJob:
+        """Queue a diffusion job; its future resolves to PNG bytes
+
+        Cached outputs resolve immediately without waiting behind queued work.
+        """
+        return (await self.submit_many([prompt], [seed], width, height, num_steps, priority, [step_callback]))[0]
+
+    async def submit_many(
+        self,
+        prompts: List[str],
+        seeds: List[Optional[int]],
+        width: int = 512,
+        height: int = 512,
+        num_steps: int = 4,
+        priority: str = "normal",
+        step_callbacks: Optional[List[Optional[StepCallback]]] = None
+    ) -> List[DiffusionJob]:
+        """Queue related jobs back-to-back so they are taken as one batch
+
+        Either every uncached job is queued or, when the queue lacks room
+        for all of them, none is. The cache is looked up once per job, off
+        the event loop; the worker only re-checks it without counting.
+        """
+        if priority not in self._lanes:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+
+        step_callbacks = step_callbacks or [None] * len(prompts)
+        cached_images = await asyncio.to_thread(
+            lambda: [self.backend.cached_image(prompt, width, height, num_steps, seed) for prompt, seed in zip(prompts, seeds)]
+        )
+        jobs, pending = [], []
+        for prompt, seed, step_callback, cached in zip(prompts, seeds, step_callbacks, cached_images):
+            job = DiffusionJob(prompt, width, height, num_steps, seed, priority, step_callback)
+            jobs.append(job)
+            if cached is None:
+                pending.append(job)
+                continue
+            if step_callback:
+                step_callback(num_steps, num_steps, None)
+            job.future.set_result(cached)
+            self.cache_hits += 1
+
+        if pending:
+            with self._cond:
+                if self._depth_locked() + len(pending) > self.max_queue_size:
+                    raise QueueFullError(f"Diffusion queue is full ({self.max_queue_size} jobs)")
+                self._lanes[priority].extend(pending)
+                for job in pending:
+                    job.queue_position = self._position_locked(job.id)
+                self._ensure_worker()
+                self._cond.notify()
+        return jobs
+
+    async def run(
+        self,
+        prompt: str,
+        width: int = 512,
+        height: int = 512,
+        num_steps: int = 4,
+        seed: Optional[int] = None,
+        priority: str = "normal",
+        step_callback: Optional[StepCallback] = None
+    ) -> Tuple[bytes, DiffusionJob]:
+        """Submit a job and await its image without blocking the event loop"""
+        job = await self.submit(prompt, width, height, num_steps, seed, priority, step_callback)
+        image_bytes = await asyncio.wrap_future(job.future)
+        return image_bytes, job
+
+    async def run_many(
+        self,
+        prompts: List[str],
+        seeds: List[Optional[int]],
+        width: int = 512,
+        height: int = 512,
+        num_steps: int = 4,
+        priority: str = "normal"
+    ) -> Tuple[List[bytes], List[DiffusionJob]]:
+        """Submit related jobs together and await all of their images"""
+        jobs = await self.submit_many(prompts, seeds, width, height, num_steps, priority)
+        images = await asyncio.gather(*(asyncio.wrap_future(job.future) for job in jobs))
+        return list(images), jobs
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Number of queued jobs ahead of job_id (None if not queued)"""
+        with self._cond:
+            return self._position_locked(job_id)
+
+    def depth(self) -> int:
+        with self._cond:
+            return self._depth_locked()
+
+    def _depth_locked(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def _position_locked(self, job_id: str) -> Optional[int]:
+        ahead = 0
+        for priority in PRIORITIES:
+            for job in self._lanes[priority]:
+                if job.id == job_id:
+                    return ahead
+                ahead += 1
+        return None
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_worker, name="diffusion-worker", daemon=True)
+            self._worker.start()
+
+    def _take_batch_locked(self) -> List[DiffusionJob]:
+        """Pop the next job plus compatible jobs, highest priority first"""
+        head = None
+        for priority in PRIORITIES:
+            if self._lanes[priority]:
+                head = self._lanes[priority].popleft()
+                break
+        if head is None:
+            return []
+
+        batch = [head]
+        for priority in PRIORITIES:
+            lane = self._lanes[priority]
+            for job in list(lane):
+                if len(batch) >= self.max_batch_size:
+                    return batch
+                if job.batch_key == head.batch_key:
+                    lane.remove(job)
+                    batch.append(job)
+        return batch
+
+    def _run_worker(self):
+        while True:
+            with self._cond:
+                while self._depth_locked() == 0:
+                    self._cond.wait()
+                # Give compatible requests a moment to arrive and share the batch
+                if self.batch_wait and self._depth_locked() < self.max_batch_size:
+                    self._cond.wait(self.batch_wait)
+                batch = self._take_batch_locked()
+                self._running_batch = batch
+
+            # Drop jobs whose callers cancelled while they were queued
+            batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+            if batch:
+                self._execute(batch)
+
+            with self._cond:
+                self._running_batch = []
+
+    def _execute(self, batch: List[DiffusionJob]):
+        width, height, num_steps = batch[0].batch_key
+        started = time.monotonic()
+        started_ns = time.time_ns()
+        for job in batch:
+            self.total_wait_seconds += started - job.submitted_at
+            record_span("diffusion_queue_wait", job.trace_parent, job.submitted_ns, started_ns, priority=job.priority)
+
+        try:
+            images = self.backend.generate_batch(
+                [job.prompt for job in batch],
+                [job.seed for job in batch],
+                width, height, num_steps,
+                [job.step_callback for job in batch]
+            )
+        except Exception as e:
+            print(f"Diffusion batch error: {e}")
+            for job in batch:
+                self._record_batch_span(job, batch, started_ns, error=str(e)[:200])
+                job.future.set_exception(e)
+            self.images_failed += len(batch)
+            return
+
+        finished = time.monotonic()
+        self.batches_run += 1
+        self.total_batch_seconds += finished - started
+        for job, image_bytes in zip(batch, images):
+            self._record_batch_span(job, batch, started_ns, cancelled=image_bytes is None)
+            if image_bytes is None:
+                job.future.set_exception(GenerationCancelled("Generation cancelled"))
+                continue
+            job.future.set_result(image_bytes)
+            self.images_completed += 1
+            self._completions.append(finished)
+
+    @staticmethod
+    def _record_batch_span(job: DiffusionJob, batch: List[DiffusionJob], started_ns: int, **attributes):
+        record_span(
+            "diffusion_batch", job.trace_parent, started_ns, time.time_ns(),
+            steps=job.num_steps, width=job.width, height=job.height, seed=job.seed,
+            batch_size=len(batch), **attributes
+        )
+
+    def images_per_minute(self) -> int:
+        cutoff = time.monotonic() - 60
+        while self._completions and self._completions[0] < cutoff:
+            self._completions.popleft()
+        return len(self._completions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            lanes = {priority: len(self._lanes[priority]) for priority in PRIORITIES}
+            running = len(self._running_batch)
+        completed = self.images_completed
+        return {
+            "backend": self.backend.name,
+            "queue_depth": sum(lanes.values()),
+            "lanes": lanes,
+            "running": running,
+            "max_batch_size": self.max_batch_size,
+            "images_completed": completed,
+            "images_failed": self.images_failed,
+            "cache_hits": self.cache_hits,
+            "batches_run": self.batches_run,
+            "avg_batch_size": round(completed / self.batches_run, 2) if self.batches_run else 0,
+            "avg_wait_seconds": round(self.total_wait_seconds / completed, 3) if completed else 0,
+            "images_per_minute": self.images_per_minute()
+        }
+
+
+# Singleton
+_diffusion_queue = None
+_diffusion_queue_lock = threading.Lock()
+
+def get_diffusion_queue(config_path: str = "config.yaml") -> DiffusionQueue:
+    global _diffusion_queue
+    if _diffusion_queue is None:
+        with _diffusion_queue_lock:
+            if _diffusion_queue is None:
+                with open(config_path, 'r') as f:
+                    config = yaml.safe_load(f)
+                queue_config = config.get('diffusion_queue', {})
+
+                if queue_config.get('backend', 'flux') == 'fake':
+                    backend = FakeDiffusionBackend(queue_config.get('fake_step_seconds', 0.0))
+                else:
+                    from .sd_generator import get_sd_generator
+                    backend = FluxDiffusionBackend(get_sd_generator())
+
+                _diffusion_queue = DiffusionQueue(
+                    backend,
+                    max_batch_size=queue_config.get('max_batch_size', 4),
+                    batch_wait_ms=queue_config.get('batch_wait_ms', 50),
+                    max_queue_size=queue_config.get('max_queue_size', 64)
+                )
+                print(f"Diffusion queue ready ({backend.name} backend)")
+    return _diffusion_queue
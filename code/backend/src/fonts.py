@@ -0,0 +1,50 @@
+"""
+Font resolution for server-side text rendering (placeholders, contact sheets)
+"""
+import os
+from functools import lru_cache
+from typing import Optional
+from PIL import ImageFont
+
+# Checked in order; the first that exists is used for every size
+FONT_CANDIDATES = (
+    # macOS
+    "/System/Library/Fonts/Helvetica.ttc",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    # Debian/Ubuntu
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    # Fedora/Arch
+    "/usr/share/fonts/dejavu-sans-fonts/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/liberation-sans/LiberationSans-Regular.ttf",
+    # Windows
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+
+@lru_cache(maxsize=1)
+def resolve_font_path() -> Optional[str]:
+    """Find a usable TrueType font once per process (None if no system font)"""
+    override = os.environ.get("DELM_FONT_PATH")
+    for path in ((override,) if override else ()) + FONT_CANDIDATES:
+        try:
+            ImageFont.truetype(path, 12)
+            return path
+        except (OSError, ValueError):
+            continue
+    print("No system TrueType font found; using Pillow's bundled font")
+    return None
+
+
+@lru_cache(maxsize=32)
+def get_font(size: int = 12):
+    """Font at the given pixel size, falling back to Pillow's bundled font"""
+    path = resolve_font_path()
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        # Pillow >= 10.1 bundles a scalable font
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
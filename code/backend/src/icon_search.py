@@ -0,0 +1,261 @@
+"""
+Icon lookup index: prefix trie, trigram fuzzy matching, synonyms and
+optional semantic matching through the embedding service
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+# Alternative names that should resolve to a built-in icon
+ICON_SYNONYMS = {
+    "home": ["house", "main", "start"],
+    "user": ["person", "profile", "account", "avatar", "people"],
+    "settings": ["gear", "cog", "cogwheel", "preferences", "config", "options"],
+    "search": ["magnifier", "magnifying-glass", "find", "lookup", "zoom"],
+    "menu": ["hamburger", "bars", "navicon"],
+    "close": ["x", "times", "cancel", "dismiss", "exit"],
+    "check": ["tick", "done", "ok", "confirm", "success", "checkmark"],
+    "plus": ["add", "new", "create"],
+    "minus": ["subtract", "remove-line", "less"],
+    "arrow-right": ["next", "forward", "right"],
+    "arrow-left": ["back", "previous", "left"],
+    "arrow-up": ["up", "ascend"],
+    "arrow-down": ["down", "descend"],
+    "heart": ["like", "love", "favorite", "favourite"],
+    "star": ["rating", "featured"],
+    "mail": ["email", "envelope", "message", "inbox"],
+    "phone": ["call", "telephone", "contact"],
+    "camera": ["photo", "snapshot"],
+    "download": ["save", "export"],
+    "upload": ["import", "publish"],
+    "trash": ["delete", "remove", "bin", "trash-can", "garbage", "rubbish", "waste"],
+    "edit": ["pencil", "pen", "write", "modify", "compose"],
+    "copy": ["duplicate", "clone", "clipboard"],
+    "share": ["send", "social"],
+    "lock": ["locked", "secure", "private", "padlock", "password"],
+    "unlock": ["unlocked", "open-lock", "public"],
+    "eye": ["view", "show", "visible", "preview", "watch"],
+    "eye-off": ["hide", "hidden", "invisible"],
+    "bell": ["notification", "alert", "alarm", "notify"],
+    "calendar": ["date", "schedule", "event"],
+    "clock": ["time", "history", "watch-time", "recent"],
+    "folder": ["directory"],
+    "file": ["document", "doc", "page"],
+    "image": ["picture", "photo-gallery", "gallery", "img"],
+    "video": ["movie", "film", "record"],
+    "music": ["audio", "song", "sound"],
+    "code": ["brackets", "developer", "source"],
+    "terminal": ["console", "shell", "command-line", "cli"],
+    "database": ["db", "storage", "server"],
+    "cloud": ["weather", "upload-cloud", "sync"],
+    "sun": ["light-mode", "brightness", "day"],
+    "moon": ["dark-mode", "night"],
+    "refresh": ["reload", "sync-alt", "retry", "rotate"],
+    "filter": ["funnel"],
+    "sort": ["order", "arrange"],
+    "chart": ["graph", "analytics", "stats", "statistics", "bar-chart"],
+    "globe": ["world", "earth", "language", "internet", "web"],
+    "link": ["url", "chain", "hyperlink"],
+    "wifi": ["wireless", "network", "signal"],
+    "battery": ["power", "charge"],
+    "zap": ["lightning", "bolt", "flash", "energy"],
+    "gift": ["present", "reward"],
+    "shopping-cart": ["cart", "basket", "shop", "checkout", "buy"],
+    "tag": ["label", "price"],
+    "bookmark": ["saved", "ribbon"],
+    "flag": ["report", "milestone"],
+    "map": ["location", "directions"],
+    "navigation": ["gps", "locate", "pointer"],
+    "compass": ["explore", "discover"],
+    "layers": ["stack", "levels"],
+}
+
+# Synonyms that also name another concept ("watch" the clock, "server" the
+# machine). They rank in search but never resolve a requested icon name, so
+# an unknown name still renders the placeholder instead of a wrong icon.
+SEARCH_ONLY_SYNONYMS = {
+    "watch", "public", "contact", "record", "server", "sync",
+    "main", "start", "social", "source", "storage", "pointer", "report",
+}
+
+
+def normalize_icon_query(text: str) -> str:
+    """Normalize free text into the hyphenated lowercase icon naming scheme"""
+    text = text.strip().lower()
+    text = re.sub(r'[\s_\.]+', '-', text)
+    text = re.sub(r'[^a-z0-9\-]', '', text)
+    # Strip decorative prefixes/suffixes used by icon libraries
+    text = re.sub(r'^(icon-|fa-|mdi-|bi-)', '', text)
+    text = re.sub(r'(-icon|-outline|-solid)$', '', text)
+    return text.strip('-')
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "icons")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Every icon reachable below this node, so prefix lookup is O(len(prefix))
+        self.icons: Dict[str, str] = {}
+
+
+class IconSearchIndex:
+    def __init__(
+        self,
+        icon_names: List[str],
+        synonyms: Optional[Dict[str, List[str]]] = None,
+        search_only: Optional[Set[str]] = None
+    ):
+        self.icon_names = sorted(icon_names)
+        self.synonyms = synonyms if synonyms is not None else ICON_SYNONYMS
+        self.search_only = search_only if search_only is not None else SEARCH_ONLY_SYNONYMS
+
+        # term -> icon name, where terms are icon names plus their synonyms
+        self.terms: Dict[str, str] = {}
+        self.trie = _TrieNode()
+        self.trigram_index: Dict[str, Set[str]] = {}
+        self.term_trigrams: Dict[str, Set[str]] = {}
+
+        self.embedding_service = None
+        self.icon_vectors = None
+
+        self._build()
+        self._resolve_cached = lru_cache(maxsize=2048)(self._resolve)
+
+    def _build(self):
+        """Index every icon name and synonym"""
+        # Names first so a synonym can never shadow a real icon name
+        for name in self.icon_names:
+            self._add_term(name, name)
+            # Index the individual words of compound names ("shopping-cart" -> "cart")
+            for word in name.split('-'):
+                self._add_trie(word, name)
+        for name in self.icon_names:
+            for synonym in self.synonyms.get(name, []):
+                self._add_term(normalize_icon_query(synonym), name)
+
+    def _add_term(self, term: str, icon: str):
+        if not term or term in self.terms:
+            return
+        self.terms[term] = icon
+        self._add_trie(term, icon)
+
+        grams = _trigrams(term)
+        self.term_trigrams[term] = grams
+        for gram in grams:
+            self.trigram_index.setdefault(gram, set()).add(term)
+
+    def _add_trie(self, term: str, icon: str):
+        node = self.trie
+        for char in term:
+            node = node.children.setdefault(char, _TrieNode())
+            node.icons.setdefault(icon, term)
+
+    def _prefix_matches(self, query: str) -> Dict[str, str]:
+        node = self.trie
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return {}
+        return node.icons
+
+    def _fuzzy_matches(self, query: str, min_similarity: float = 0.3) -> List[Tuple[str, float]]:
+        """Trigram (Dice coefficient) matches over all indexed terms"""
+        query_grams = _trigrams(query)
+        shared: Dict[str, int] = {}
+        for gram in query_grams:
+            for term in self.trigram_index.get(gram, ()):
+                shared[term] = shared.get(term, 0) + 1
+
+        matches = []
+        for term, count in shared.items():
+            similarity = 2 * count / (len(query_grams) + len(self.term_trigrams[term]))
+            if similarity >= min_similarity:
+                matches.append((term, similarity))
+        return matches
+
+    def search(self, query: str, limit: int = 10, semantic: bool = False) -> List[Dict[str, Any]]:
+        """Return ranked icon matches for a free-text query"""
+        normalized = normalize_icon_query(query)
+        if not normalized:
+            return []
+
+        best: Dict[str, Dict[str, Any]] = {}
+
+        def consider(icon: str, score: float, match: str, term: str):
+            current = best.get(icon)
+            if current is None or score > current["score"]:
+                best[icon] = {"name": icon, "score": round(score, 4), "match": match, "term": term}
+
+        # Exact name or synonym
+        icon = self.terms.get(normalized)
+        if icon is not None:
+            consider(icon, 1.0 if icon == normalized else 0.95, "exact" if icon == normalized else "synonym", normalized)
+
+        # Prefix (typeahead); prefixes of the icon's own name rank above prefixes of its synonyms
+        for icon, term in self._prefix_matches(normalized).items():
+            base = 0.7 if term == icon or term in icon.split('-') else 0.6
+            consider(icon, base + 0.25 * len(normalized) / max(len(term), len(normalized)), "prefix", term)
+
+        # Fuzzy (typos, word order, partial names)
+        for term, similarity in self._fuzzy_matches(normalized):
+            consider(self.terms[term], 0.9 * similarity, "fuzzy", term)
+
+        # Semantic (optional, only when lexical matching is weak)
+        if semantic and self.icon_vectors is not None:
+            top_score = max((m["score"] for m in best.values()), default=0.0)
+            if top_score < 0.7:
+                for icon, similarity in self._semantic_matches(query, limit):
+                    consider(icon, 0.85 * similarity, "semantic", icon)
+
+        ranked = sorted(best.values(), key=lambda m: (-m["score"], m["name"]))
+        return ranked[:limit]
+
+    def resolve(self, query: str) -> Optional[str]:
+        """Resolve an icon name or synonym to a built-in icon; None otherwise
+
+        Prefix and fuzzy matches, and ambiguous synonyms (SEARCH_ONLY_SYNONYMS),
+        are only suggestions for search: "ca" or "watch" would otherwise
+        silently render an unrelated icon.
+        """
+        return self._resolve_cached(query)
+
+    def _resolve(self, query: str) -> Optional[str]:
+        term = normalize_icon_query(query)
+        icon = self.terms.get(term)
+        if icon is None or (term != icon and term in self.search_only):
+            return None
+        return icon
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hits, misses and size of the resolve memo"""
+        info = self._resolve_cached.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+    def attach_embeddings(self, embedding_service):
+        """Embed icon descriptions so queries can fall back to semantic matching"""
+        import numpy as np
+
+        texts = [
+            f"{name.replace('-', ' ')} icon: {', '.join(self.synonyms.get(name, []))}"
+            for name in self.icon_names
+        ]
+        vectors = np.asarray(embedding_service.embed_batch(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.icon_vectors = vectors / np.maximum(norms, 1e-12)
+        self.embedding_service = embedding_service
+        print(f"Icon search index: embedded {len(texts)} icons")
+
+    def _semantic_matches(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        import numpy as np
+
+        vector = np.asarray(self.embedding_service.embed(query), dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        scores = self.icon_vectors @ vector
+        top = np.argsort(-scores)[:limit]
+        return [(self.icon_names[i], float(scores[i])) for i in top]
@@ -4,17 +4,36 @@ Image generation service for UI mockups - renders real components
 import base64
 import io
 import asyncio
-from typing import Optional, Dict, Any
-from PIL import Image, ImageDraw, ImageFont
+import math
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple, List
+from PIL import Image, ImageDraw, features
 import yaml
 
+from .fonts import get_font
+from .metrics import time_stage
+from .sidecar import get_sidecar_client
+
+# Output encodings supported by encode_image
+IMAGE_MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
 class ImageGenerator:
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", use_sidecar: bool = True):
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
 
+        # When set, HTML rendering runs in the renderer sidecar process
+        self.renderer = get_sidecar_client("renderer", config_path) if use_sidecar else None
+
         self.playwright = None
         self.browser = None
+        self._avif_supported = None
+        # Degraded-mode error images repeat; render each (size, message) once
+        self._error_image_cached = lru_cache(maxsize=128)(self._render_error_image)
         print("Image generator initialized")
 
     async def _get_browser(self):
@@ -39,6 +58,17 @@ class ImageGenerator:
         full_page: bool = False
     ) -> bytes:
         """Convert HTML/CSS to PNG image using playwright"""
+        with time_stage("html_render", width=width, height=height, full_page=full_page, sidecar=self.renderer is not None):
+            return await self._render_html(html_content, width, height, full_page)
+
+    async def _render_html(self, html_content: str, width: int, height: int, full_page: bool) -> bytes:
+        if self.renderer is not None:
+            try:
+                return await self.renderer.acall("html_to_png", html_content, width, height, full_page)
+            except Exception as e:
+                print(f"Renderer sidecar error: {e}")
+                return self._generate_error_image(width, height, f"Renderer unavailable:\n{str(e)[:100]}")
+
         browser = await self._get_browser()
 
         if browser is None:
@@ -91,16 +121,30 @@ class ImageGenerator:
             print(f"Screenshot error: {e}")
             return self._generate_error_image(width, height, f"Render error:\n{str(e)[:100]}")
 
+    def svg_to_png(self, svg_content: str, width: int, height: int) -> bytes:
+        """Rasterize a standalone SVG document at its exact pixel size"""
+        try:
+            import cairosvg
+            with time_stage("svg_rasterize", width=width, height=height):
+                return cairosvg.svg2png(
+                    bytestring=svg_content.encode('utf-8'),
+                    output_width=width,
+                    output_height=height
+                )
+        except Exception as e:
+            print(f"SVG rasterize error: {e}")
+            return self._generate_error_image(width, height, f"SVG render error:\n{str(e)[:100]}")
+
     def _generate_error_image(self, width: int, height: int, message: str) -> bytes:
         """Generate an error placeholder image"""
+        return self._error_image_cached(width, height, message)
+
+    def _render_error_image(self, width: int, height: int, message: str) -> bytes:
         img = Image.new('RGB', (width, height), color='#fee2e2')
         draw = ImageDraw.Draw(img)
         draw.rectangle([0, 0, width-1, height-1], outline='#ef4444', width=2)
 
-        try:
-            font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 14)
-        except:
-            font = ImageFont.load_default()
+        font = get_font(14)
 
         # Draw multiline text
         y = 20
@@ -336,14 +380,86 @@ class ImageGenerator:
 
         return html
 
+    def encode_image(self, png_bytes: bytes, image_format: str = "png", quality: int = 85) -> Tuple[bytes, str]:
+        """Re-encode rendered PNG bytes; returns (bytes, media type)
+
+        PNG passes through untouched. AVIF falls back to WebP when this
+        Pillow build has no AVIF encoder.
+        """
+        image_format = image_format.lower()
+        if image_format not in IMAGE_MEDIA_TYPES:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        if image_format == "png":
+            return png_bytes, IMAGE_MEDIA_TYPES["png"]
+        if image_format == "avif" and not self.supports_avif():
+            image_format = "webp"
+
+        with time_stage("encode", format=image_format, quality=quality, input_bytes=len(png_bytes)):
+            img = Image.open(io.BytesIO(png_bytes))
+            buffer = io.BytesIO()
+            img.save(buffer, format=image_format.upper(), quality=quality)
+            return buffer.getvalue(), IMAGE_MEDIA_TYPES[image_format]
+
+    def build_contact_sheet(
+        self,
+        images: List[bytes],
+        labels: List[str],
+        columns: Optional[int] = None,
+        thumb_size: int = 256,
+        padding: int = 12
+    ) -> bytes:
+        """Lay out images in a labelled grid and return it as PNG bytes"""
+        columns = columns or math.ceil(math.sqrt(len(images)))
+        columns = max(1, min(columns, len(images)))
+        rows = math.ceil(len(images) / columns)
+        label_height = 20
+
+        cell_w = thumb_size + padding
+        cell_h = thumb_size + label_height + padding
+        sheet = Image.new('RGB', (columns * cell_w + padding, rows * cell_h + padding), color='#ffffff')
+        draw = ImageDraw.Draw(sheet)
+
+        font = get_font(12)
+
+        for index, (image_bytes, label) in enumerate(zip(images, labels)):
+            x = padding + (index % columns) * cell_w
+            y = padding + (index // columns) * cell_h
+
+            thumb = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+            thumb.thumbnail((thumb_size, thumb_size))
+            offset_x = x + (thumb_size - thumb.width) // 2
+            offset_y = y + (thumb_size - thumb.height) // 2
+            sheet.paste(thumb, (offset_x, offset_y))
+            draw.rectangle([x - 1, y - 1, x + thumb_size, y + thumb_size], outline='#e5e7eb')
+            draw.text((x, y + thumb_size + 4), label, fill='#374151', font=font)
+
+        buffer = io.BytesIO()
+        sheet.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def supports_avif(self) -> bool:
+        """Whether Pillow can encode AVIF (built in from Pillow 11.3, or via plugin)"""
+        if self._avif_supported is None:
+            try:
+                self._avif_supported = bool(features.check("avif"))
+            except Exception:
+                self._avif_supported = False
+            if not self._avif_supported:
+                try:
+                    import pillow_avif  # noqa: F401 - registers the AVIF plugin
+                    self._avif_supported = True
+                except ImportError:
+                    pass
+        return self._avif_supported
+
     def to_base64(self, image_bytes: bytes) -> str:
         """Convert image bytes to base64 string"""
         return base64.b64encode(image_bytes).decode('utf-8')
 
-    def to_data_url(self, image_bytes: bytes) -> str:
+    def to_data_url(self, image_bytes: bytes, media_type: str = "image/png") -> str:
         """Convert image bytes to data URL"""
         b64 = self.to_base64(image_bytes)
-        return f"data:image/png;base64,{b64}"
+        return f"data:{media_type};base64,{b64}"
 
     async def close(self):
         """Clean up resources"""
@@ -0,0 +1,166 @@
+"""
+Incremental pattern ingestion: only new or changed content is embedded, so
+refreshing a large, mostly unchanged library costs lookups instead of model time
+"""
+import yaml
+from typing import List, Dict, Any, Optional
+from .vector_store import VectorStore, content_hash
+from .chunking import split_pattern, chunk_id, DEFAULT_MAX_CHARS
+
+# Patterns looked up, embedded and written per step
+INGEST_BATCH_SIZE = 256
+
+# Stored columns compared against incoming patterns
+_STORED_COLUMNS = ["content_hash", "embedding_model", "category", "name", "tags", "vector"]
+
+
+def open_chunk_store(config_path: str = "config.yaml") -> Optional[VectorStore]:
+    """Store for the <collection_name>_chunks table when rag.chunking is enabled, else None"""
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    if not (config['rag'].get('chunking') or {}).get('enabled'):
+        return None
+    return VectorStore(config_path, collection_name=f"{config['vector_db']['collection_name']}_chunks")
+
+
+def ingest_patterns(
+    vector_store: VectorStore,
+    embeddings,
+    patterns: List[Dict[str, Any]],
+    batch_size: int = INGEST_BATCH_SIZE,
+    chunk_store: Optional[VectorStore] = None,
+    max_chars: int = DEFAULT_MAX_CHARS
+) -> Dict[str, int]:
+    """Upsert patterns (pattern_id, content, category, name, tags) by ID
+
+    A stored pattern whose content hash and embedding model match keeps its
+    vector; if its metadata matches too it is not rewritten at all. Returns
+    counts: embedded, skipped (embedding reused), unchanged (skipped and not
+    rewritten), inserted and updated. With a chunk_store, every pattern's
+    chunks are brought up to date the same way, adding chunks_embedded,
+    chunks_skipped and chunks_deleted.
+    """
+    result = {"embedded": 0, "skipped": 0, "unchanged": 0, "inserted": 0, "updated": 0}
+    if chunk_store is not None:
+        result.update(chunks_embedded=0, chunks_skipped=0, chunks_deleted=0)
+    # The last occurrence of an id wins
+    patterns = list({pattern['pattern_id']: pattern for pattern in patterns}.values())
+    for start in range(0, len(patterns), batch_size):
+        batch = patterns[start:start + batch_size]
+        stored = vector_store.get_stored([pattern['pattern_id'] for pattern in batch], _STORED_COLUMNS)
+
+        rows, to_embed = [], []
+        for pattern in batch:
+            row = {
+                'pattern': pattern,
+                'metadata': {
+                    'category': pattern['category'],
+                    'name': pattern['name'],
+                    'tags': ','.join(pattern.get('tags') or [])
+                },
+                'embedding': None
+            }
+            previous = stored.get(pattern['pattern_id'])
+            if (
+                previous is not None
+                and previous['content_hash'] == content_hash(pattern['content'])
+                and previous['embedding_model'] == vector_store.embedding_model
+            ):
+                result['skipped'] += 1
+                if all(previous[key] == value for key, value in row['metadata'].items()):
+                    result['unchanged'] += 1
+                    continue
+                row['embedding'] = previous['vector']
+            else:
+                to_embed.append(row)
+            rows.append(row)
+
+        if to_embed:
+            vectors = embeddings.embed_batch([row['pattern']['content'] for row in to_embed])
+            for row, vector in zip(to_embed, vectors):
+                row['embedding'] = vector.tolist()
+            result['embedded'] += len(to_embed)
+        if rows:
+            written = vector_store.upsert_patterns(
+                pattern_ids=[row['pattern']['pattern_id'] for row in rows],
+                contents=[row['pattern']['content'] for row in rows],
+                embeddings=[row['embedding'] for row in rows],
+                metadatas=[row['metadata'] for row in rows]
+            )
+            result['inserted'] += written['inserted']
+            result['updated'] += written['updated']
+        if chunk_store is not None:
+            _sync_chunks(chunk_store, embeddings, batch, max_chars, result)
+    return result
+
+
+def _sync_chunks(
+    chunk_store: VectorStore,
+    embeddings,
+    patterns: List[Dict[str, Any]],
+    max_chars: int,
+    result: Dict[str, int]
+):
+    """Re-chunk patterns, embedding only chunks whose text is new for their pattern"""
+    # Vectors are only read for chunks whose embedding is reused
+    stored = chunk_store.get_stored(
+        [pattern['pattern_id'] for pattern in patterns],
+        [column for column in _STORED_COLUMNS if column != "vector"] + ["parent_id"],
+        key="parent_id"
+    )
+    # A chunk that only moved within its pattern keeps its vector
+    ids_by_hash = {
+        (row['parent_id'], row['content_hash']): stored_id
+        for stored_id, row in stored.items()
+        if row['embedding_model'] == chunk_store.embedding_model
+    }
+
+    rows, to_embed, reused, current = [], [], [], set()
+    for pattern in patterns:
+        metadata = {
+            'category': pattern['category'],
+            'name': pattern['name'],
+            'tags': ','.join(pattern.get('tags') or []),
+            'parent_id': pattern['pattern_id']
+        }
+        _, chunks = split_pattern(pattern['content'], max_chars)
+        for index, text in enumerate(chunks):
+            row = {'id': chunk_id(pattern['pattern_id'], index), 'content': text, 'metadata': metadata, 'embedding': None}
+            current.add(row['id'])
+            text_hash = content_hash(text)
+            previous = stored.get(row['id'])
+            if (
+                previous is not None
+                and previous['content_hash'] == text_hash
+                and previous['embedding_model'] == chunk_store.embedding_model
+                and all(previous[key] == value for key, value in metadata.items())
+            ):
+                result['chunks_skipped'] += 1
+                continue
+            source = ids_by_hash.get((pattern['pattern_id'], text_hash))
+            if source is None:
+                to_embed.append(row)
+            else:
+                reused.append((row, source))
+            rows.append(row)
+
+    if reused:
+        vectors = chunk_store.get_stored([source for _, source in reused], ["vector"])
+        for row, source in reused:
+            row['embedding'] = vectors[source]['vector']
+        result['chunks_skipped'] += len(reused)
+    if to_embed:
+        vectors = embeddings.embed_batch([row['content'] for row in to_embed])
+        for row, vector in zip(to_embed, vectors):
+            row['embedding'] = vector.tolist()
+        result['chunks_embedded'] += len(to_embed)
+    if rows:
+        chunk_store.upsert_patterns(
+            pattern_ids=[row['id'] for row in rows],
+            contents=[row['content'] for row in rows],
+            embeddings=[row['embedding'] for row in rows],
+            metadatas=[row['metadata'] for row in rows]
+        )
+    stale = [stored_id for stored_id in stored if stored_id not in current]
+    if stale:
+        result['chunks_deleted'] += chunk_store.delete(stale)
@@ -0,0 +1,366 @@
+"""
+Asynchronous generation jobs backed by a local SQLite queue
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple, List
+import yaml
+
+from .tracing import start_trace, finish_trace
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler when its job has been cancelled"""
+
+
+class JobContext:
+    """Handed to job handlers to report progress and observe cancellation"""
+
+    def __init__(self, job_id: str, store: "JobStore"):
+        self.job_id = job_id
+        self.store = store
+        self.cancelled = threading.Event()
+        self._cancel_callbacks: List[Callable[[], Any]] = []
+        self._last_progress = -1.0
+
+    def report(self, progress: float):
+        """Record progress in [0, 1]; writes are throttled to 1% changes
+
+        Also picks up cancellations requested through another worker process.
+        """
+        progress = max(0.0, min(1.0, progress))
+        if progress - self._last_progress >= 0.01 or progress == 1.0:
+            self._last_progress = progress
+            if self.store.update_progress(self.job_id, progress):
+                self.cancel()
+
+    def step_callback(self, start: float = 0.0, end: float = 1.0):
+        """Diffusion step callback mapping steps onto [start, end] of overall progress"""
+        def callback(step: int, total: int, latents=None):
+            self.check()
+            self.report(start + (end - start) * step / max(total, 1))
+        return callback
+
+    def check(self):
+        """Raise if the job has been cancelled"""
+        if self.cancelled.is_set():
+            from .sd_generator import GenerationCancelled
+            raise GenerationCancelled("Job cancelled")
+
+    def on_cancel(self, callback: Callable[[], Any]):
+        self._cancel_callbacks.append(callback)
+
+    def cancel(self):
+        self.cancelled.set()
+        for callback in self._cancel_callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+
+# handler(params, context) -> (result bytes, media type, result metadata)
+JobHandler = Callable[[Dict[str, Any], JobContext], Awaitable[Tuple[bytes, str, Dict[str, Any]]]]
+
+
+class JobStore:
+    def __init__(self, db_path: str):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_table()
+
+    def _create_table(self):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    error TEXT,
+                    result BLOB,
+                    media_type TEXT,
+                    result_meta TEXT,
+                    worker_pid INTEGER,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    expires_at REAL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def create(self, job_type: str, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, type, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, job_type, json.dumps(params), time.time())
+            )
+        return job_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Move the oldest queued job to running and return it
+
+        The conditional UPDATE makes the claim safe when several server
+        processes poll the same database.
+        """
+        while True:
+            with self._lock, self.conn:
+                row = self.conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                cursor = self.conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, worker_pid = ? WHERE id = ? AND status = 'queued'",
+                    (time.time(), os.getpid(), row['id'])
+                )
+            if cursor.rowcount:
+                break
+            # Another process claimed it first; try the next one
+
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def update_progress(self, job_id: str, progress: float) -> bool:
+        """Record progress; returns True if cancellation has been requested"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ? AND status = 'running'",
+                (progress, job_id)
+            )
+            row = self.conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Flag a running job so whichever process runs it stops at its next report"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+                (job_id,)
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, result: bytes, media_type: str, meta: Dict[str, Any], ttl: float):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                """UPDATE jobs SET status = 'completed', progress = 1, result = ?, media_type = ?,
+                   result_meta = ?, finished_at = ?, expires_at = ? WHERE id = ? AND status = 'running'""",
+                (result, media_type, json.dumps(meta), now, now + ttl, job_id)
+            )
+
+    def finish(self, job_id: str, status: str, error: Optional[str], ttl: float):
+        """Mark a job failed or cancelled"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, expires_at = ? WHERE id = ?",
+                (status, error, now, now + ttl, job_id)
+            )
+
+    def cancel_queued(self, job_id: str, ttl: float) -> bool:
+        """Cancel a job that has not started yet"""
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                """UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ?
+                   WHERE id = ? AND status = 'queued'""",
+                (now, now + ttl, job_id)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        columns = "*" if include_result else (
+            "id, type, status, progress, error, media_type, result_meta, "
+            "cancel_requested, created_at, started_at, finished_at, expires_at"
+        )
+        with self._lock:
+            row = self.conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result_meta'] = json.loads(job['result_meta']) if job.get('result_meta') else None
+        if 'params' in job:
+            job['params'] = json.loads(job['params'])
+        return job
+
+    def requeue_running(self) -> int:
+        """Return jobs whose worker process has died to the queue"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, worker_pid FROM jobs WHERE status = 'running'"
+            ).fetchall()
+        orphaned = [row['id'] for row in rows if not _process_alive(row['worker_pid'])]
+
+        with self._lock, self.conn:
+            for job_id in orphaned:
+                self.conn.execute(
+                    """UPDATE jobs SET status = 'queued', progress = 0, started_at = NULL, worker_pid = NULL
+                       WHERE id = ? AND status = 'running'""",
+                    (job_id,)
+                )
+        return len(orphaned)
+
+    def delete_expired(self) -> int:
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid or pid == os.getpid():
+        # Our own pid on startup means a previous process that had the same pid
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobManager:
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 2,
+        result_ttl_seconds: float = 3600,
+        poll_interval: float = 1.0,
+        cleanup_interval: float = 60
+    ):
+        self.store = store
+        self.workers = max(1, workers)
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval = poll_interval
+        self.cleanup_interval = cleanup_interval
+
+        self.handlers: Dict[str, JobHandler] = {}
+        self.running: Dict[str, JobContext] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, job_type: str, handler: JobHandler):
+        self.handlers[job_type] = handler
+
+    async def submit(self, job_type: str, params: Dict[str, Any]) -> str:
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = await asyncio.to_thread(self.store.create, job_type, params)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job"""
+        if await asyncio.to_thread(self.store.cancel_queued, job_id, self.result_ttl_seconds):
+            return True
+        context = self.running.get(job_id)
+        if context is not None:
+            context.cancel()
+            return True
+        # Running in another worker process
+        return await asyncio.to_thread(self.store.request_cancel, job_id)
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        requeued = await asyncio.to_thread(self.store.requeue_running)
+        if requeued:
+            print(f"Requeued {requeued} interrupted jobs")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+        print(f"Job manager started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        # SQLite calls run in threads so a lock wait or WAL checkpoint never stalls the event loop
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_job(job)
+
+    async def _run_job(self, job: Dict[str, Any]):
+        context = JobContext(job['id'], self.store)
+        self.running[job['id']] = context
+        # Jobs outlive their submitting request, so each runs under its own trace keyed by job id
+        root, token = start_trace(f"job {job['type']}", request_id=job['id'], job_type=job['type'])
+        try:
+            handler = self.handlers[job['type']]
+            result, media_type, meta = await handler(job['params'], context)
+            if context.cancelled.is_set():
+                raise JobCancelled()
+            await asyncio.to_thread(self.store.complete, job['id'], result, media_type, meta, self.result_ttl_seconds)
+        except asyncio.CancelledError:
+            # Server shutting down; leave the job for requeue on next start
+            raise
+        except Exception as e:
+            if context.cancelled.is_set():
+                await asyncio.to_thread(self.store.finish, job['id'], "cancelled", None, self.result_ttl_seconds)
+            else:
+                print(f"Job {job['id']} failed: {e}")
+                await asyncio.to_thread(self.store.finish, job['id'], "failed", str(e), self.result_ttl_seconds)
+                root.status = "error"
+        finally:
+            self.running.pop(job['id'], None)
+            finish_trace(root, token)
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            removed = await asyncio.to_thread(self.store.delete_expired)
+            if removed:
+                print(f"Removed {removed} expired jobs")
+
+
+# Singleton
+_job_manager = None
+
+def get_job_manager(config_path: str = "config.yaml") -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+        jobs_config = config.get('jobs', {})
+        store = JobStore(jobs_config.get('db_path', './data/jobs.sqlite3'))
+        _job_manager = JobManager(
+            store,
+            workers=jobs_config.get('workers', 2),
+            result_ttl_seconds=jobs_config.get('result_ttl_seconds', 3600),
+            cleanup_interval=jobs_config.get('cleanup_interval_seconds', 60)
+        )
+    return _job_manager
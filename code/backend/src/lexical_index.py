@@ -0,0 +1,98 @@
+"""
+In-memory BM25 index over pattern content, names and tags, for exact terms
+(component names, Tailwind classes) that embeddings rank poorly
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+
+# Compound identifiers such as bg-primary-600, md:grid-cols-3 or React.FC
+_WORD = re.compile(r"[A-Za-z0-9]+(?:[-_:/.][A-Za-z0-9]+)*")
+_PART = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+
+# Term frequency multipliers; a match in the name or tags says more than one in the code
+FIELD_WEIGHTS = {"content": 1.0, "name": 3.0, "tags": 2.0}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words; compound and camelCase words also yield their parts"""
+    tokens = []
+    for word in _WORD.findall(text or ""):
+        tokens.append(word.lower())
+        parts = _PART.findall(word)
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index of weighted term frequencies, one document per table row
+
+    Documents are addressed by row position, like the quantized vector
+    index, so hits can be fetched from LanceDB by offset.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.clear()
+
+    def clear(self):
+        self.ids: List[str] = []
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._lengths: List[float] = []
+        self._categories: List[str] = []
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: List[str], contents: List[str], names: List[str], tags: List[str], categories: List[str]):
+        for pattern_id, content, name, pattern_tags, category in zip(ids, contents, names, tags, categories):
+            position = len(self.ids)
+            frequencies: Counter = Counter()
+            for field, text in (("content", content), ("name", name), ("tags", pattern_tags)):
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    frequencies[token] += weight
+            for token, frequency in frequencies.items():
+                self._postings.setdefault(token, {})[position] = frequency
+            length = sum(frequencies.values())
+            self.ids.append(pattern_id)
+            self._lengths.append(length)
+            self._categories.append(category or "")
+            self._total_length += length
+
+    def search(self, query: str, top_k: int, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(row position, score) of the best matches, best first"""
+        if not self.ids:
+            return []
+        count = len(self.ids)
+        average_length = self._total_length / count or 1.0
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings.items():
+                if category is not None and self._categories[position] != category:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / average_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], weights: List[float], k: int = 60) -> List[Tuple[str, float]]:
+    """(id, score) best first; an id scores weight / (k + rank) in each ranking it appears in"""
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        seen = set()
+        for pattern_id in ranking:
+            if pattern_id in seen:
+                continue
+            seen.add(pattern_id)
+            scores[pattern_id] = scores.get(pattern_id, 0.0) + weight / (k + len(seen))
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,256 @@
+"""
+Prometheus metrics: a small in-process registry rendered in the text
+exposition format, so instrumentation needs no extra dependency
+"""
+import bisect
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Callable, Iterable
+
+from .tracing import span
+
+# Seconds; spans sub-millisecond encodes through multi-minute model loads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CollectorMetric(_Metric):
+    """Values read from existing component stats at scrape time"""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Iterable[str], collect: Callable[[], List[Tuple[LabelValues, float]]]):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            samples = self.collect()
+        except Exception:
+            return []
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in samples]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Idempotent so collectors can be re-registered after a reload
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "delm_stage_seconds", "Time spent in each pipeline stage", ("stage",)
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "delm_request_seconds", "HTTP request latency by route", ("endpoint", "method")
+))
+REQUESTS = REGISTRY.register(Counter(
+    "delm_requests_total", "HTTP requests by route and status", ("endpoint", "method", "status")
+))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    "delm_request_errors_total", "HTTP requests answered with a 5xx or an unhandled exception", ("endpoint",)
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "delm_stage_errors_total", "Exceptions raised inside a pipeline stage", ("stage",)
+))
+TOKENS = REGISTRY.register(Counter(
+    "delm_llm_tokens_total", "LLM tokens processed", ("kind",)
+))
+CONTEXT_TOKENS = REGISTRY.register(Histogram(
+    "delm_context_tokens", "Tokens of retrieved pattern context per generation prompt",
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192)
+))
+
+
+@contextmanager
+def time_stage(stage: str, **attributes):
+    """Record the duration of a pipeline stage and trace it as a span
+
+    Yields the span so callers can attach attributes known only at the end.
+    """
+    start = time.perf_counter()
+    try:
+        with span(stage, **attributes) as stage_span:
+            yield stage_span
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def register_collector(name: str, documentation: str, kind: str, labelnames: Iterable[str], collect):
+    return REGISTRY.register(CollectorMetric(name, documentation, kind, labelnames, collect))
+
+
+def _resident_memory() -> List[Tuple[LabelValues, float]]:
+    samples = []
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    samples.append((("peak_rss",), peak if sys.platform == "darwin" else peak * 1024))
+    try:
+        with open("/proc/self/statm") as f:
+            samples.append((("rss",), int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")))
+    except OSError:
+        pass
+
+    mx = sys.modules.get("mlx.core")
+    if mx is not None:
+        get_active = getattr(mx, "get_active_memory", None) or getattr(getattr(mx, "metal", None), "get_active_memory", None)
+        if get_active:
+            samples.append((("mlx_active",), get_active()))
+    return samples
+
+
+register_collector("delm_memory_bytes", "Process and MLX memory", "gauge", ("kind",), _resident_memory)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency, status and errors per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            method = scope.get("method", "")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, method=method)
+            REQUESTS.inc(endpoint=endpoint, method=method, status=str(status[0]))
+            if status[0] >= 500:
+                REQUEST_ERRORS.inc(endpoint=endpoint)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -2,8 +2,16 @@
 Small Language Model interface optimized for Apple Silicon using MLX
 """
 from mlx_lm import load, generate
+import time
 import yaml
 from typing import Optional
+from .metrics import STAGE_SECONDS, TOKENS, time_stage
+from .tracing import span, record_span, current_span
+
+try:
+    from mlx_lm import stream_generate
+except ImportError:
+    stream_generate = None
 
 class DesignLLM:
     def __init__(self, config_path: str = "config.yaml"):
@@ -52,16 +60,56 @@ class DesignLLM:
         """Generate text from prompt"""
 
         formatted_prompt = self._format_prompt(prompt, system_prompt)
-
-        response = generate(
-            self.model,
-            self.tokenizer,
-            prompt=formatted_prompt,
-            max_tokens=max_tokens or self.max_tokens,
-            verbose=False
-        )
-
-        return response
+        max_tokens = max_tokens or self.max_tokens
+
+        with span("llm_generate", max_tokens=max_tokens) as llm_span:
+            if stream_generate is None:
+                with time_stage("llm_decode"):
+                    return generate(
+                        self.model,
+                        self.tokenizer,
+                        prompt=formatted_prompt,
+                        max_tokens=max_tokens,
+                        verbose=False
+                    )
+
+            # Streaming separates prefill (time to first token) from decode
+            start = time.perf_counter()
+            start_ns = time.time_ns()
+            first_token_at = None
+            pieces = []
+            generated = 0
+            prompt_tokens = None
+            for response in stream_generate(
+                self.model,
+                self.tokenizer,
+                prompt=formatted_prompt,
+                max_tokens=max_tokens
+            ):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                # mlx_lm >= 0.19 yields GenerationResponse objects, older versions yield text
+                pieces.append(getattr(response, "text", response))
+                generated = getattr(response, "generation_tokens", generated + 1)
+                prompt_tokens = getattr(response, "prompt_tokens", prompt_tokens)
+            end = time.perf_counter()
+
+            prefill_seconds = (first_token_at or end) - start
+            STAGE_SECONDS.observe(prefill_seconds, stage="llm_prefill")
+            STAGE_SECONDS.observe(end - (first_token_at or end), stage="llm_decode")
+            if prompt_tokens is None:
+                prompt_tokens = len(self.tokenizer.encode(formatted_prompt))
+            TOKENS.inc(prompt_tokens, kind="prompt")
+            TOKENS.inc(generated, kind="generated")
+
+            # Both phases ran inside one loop, so their spans are recorded after the fact
+            first_token_ns = start_ns + int(prefill_seconds * 1e9)
+            end_ns = start_ns + int((end - start) * 1e9)
+            record_span("llm_prefill", current_span(), start_ns, first_token_ns, tokens_in=prompt_tokens)
+            record_span("llm_decode", current_span(), first_token_ns, end_ns, tokens_out=generated)
+            llm_span.set(tokens_in=prompt_tokens, tokens_out=generated)
+
+            return "".join(pieces)
 
     def generate_ui_component(
         self,
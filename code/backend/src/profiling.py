@@ -0,0 +1,343 @@
+"""
+On-demand profiling of single requests or time windows, and tracemalloc
+memory snapshots, for diagnosing slowness and leaks in a running server
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Optional, Dict, Any, List
+from urllib.parse import parse_qs
+import yaml
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+PROFILE_MEDIA_TYPES = {
+    ".html": "text/html",
+    ".json": "application/json",
+    ".prof": "application/octet-stream",
+    ".txt": "text/plain",
+}
+
+_PROFILE_NAME = re.compile(r"^[\w.-]+$")
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class ProfileSession:
+    __slots__ = ("kind", "profiler", "started_at", "stem", "filename")
+
+    def __init__(self, kind: str, profiler, stem: str, extension: str):
+        self.kind = kind
+        self.profiler = profiler
+        self.started_at = time.time()
+        self.stem = stem
+        self.filename = stem + extension
+
+
+class ProfileRecorder:
+    """Runs one profiler at a time and writes its reports to a directory
+
+    pyinstrument is used when installed (HTML or speedscope output);
+    otherwise cProfile writes a .prof file plus a text summary.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        enabled: bool = False,
+        admin_token: str = "",
+        profiler: str = "auto",
+        output_format: str = "html",
+        interval: float = 0.001,
+        max_profiles: int = 100,
+        trace_memory_frames: int = 0
+    ):
+        self.directory = directory
+        # Behind a local reverse proxy every client looks like loopback, so only a token proves admin
+        if enabled and not admin_token:
+            print("profiling.enabled is set without profiling.admin_token or DELM_ADMIN_TOKEN; profiling stays off")
+            enabled = False
+        self.enabled = enabled
+        self.admin_token = admin_token
+        self.profiler = profiler
+        self.output_format = output_format
+        self.interval = interval
+        self.max_profiles = max_profiles
+        # Non-zero starts tracemalloc at startup, so early allocations are attributed too
+        self.trace_memory_frames = trace_memory_frames
+        self._busy = threading.Lock()
+
+    @property
+    def profiler_kind(self) -> str:
+        if self.profiler == "cprofile" or PyinstrumentProfiler is None:
+            return "cprofile"
+        return "pyinstrument"
+
+    def is_admin(self, headers) -> bool:
+        """Whether profiling is enabled and the request carries the admin token"""
+        if not self.enabled:
+            return False
+        # Headers are decoded as latin-1; compare_digest only accepts ASCII str, so compare bytes
+        return hmac.compare_digest(headers.get("x-admin-token", "").encode("latin-1"), self.admin_token.encode("utf-8"))
+
+    def begin(self, label: str, async_mode: bool) -> ProfileSession:
+        """Start profiling; async_mode follows one request's task across awaits"""
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is already running")
+        try:
+            slug = re.sub(r"[^\w]+", "-", label).strip("-")[:60] or "profile"
+            stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:6]}"
+            kind = self.profiler_kind
+            if kind == "pyinstrument":
+                profiler = PyinstrumentProfiler(interval=self.interval, async_mode="enabled" if async_mode else "disabled")
+                profiler.start()
+                extension = ".speedscope.json" if self.output_format == "speedscope" else ".html"
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                extension = ".prof"
+        except Exception as e:
+            # e.g. cProfile refuses to start while another profiler is active
+            self._busy.release()
+            raise ProfilerBusy(f"Profiler unavailable: {e}") from e
+        return ProfileSession(kind, profiler, stem, extension)
+
+    def stop(self, session: ProfileSession):
+        """Stop the profiler; must run in the context that began it"""
+        try:
+            if session.kind == "pyinstrument":
+                session.profiler.stop()
+            else:
+                session.profiler.disable()
+        finally:
+            self._busy.release()
+
+    def save(self, session: ProfileSession) -> Dict[str, Any]:
+        """Render and write the report (slow for large profiles; run off the event loop)"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, session.filename)
+        if session.kind == "pyinstrument":
+            if self.output_format == "speedscope":
+                from pyinstrument.renderers import SpeedscopeRenderer
+                content = session.profiler.output(renderer=SpeedscopeRenderer())
+            else:
+                content = session.profiler.output_html()
+            with open(path, "w") as f:
+                f.write(content)
+        else:
+            session.profiler.dump_stats(path)
+            # Readable without tooling; the .prof opens in snakeviz or `python -m pstats`
+            summary = io.StringIO()
+            pstats.Stats(session.profiler, stream=summary).sort_stats("cumulative").print_stats(60)
+            with open(os.path.join(self.directory, f"{session.stem}.txt"), "w") as f:
+                f.write(summary.getvalue())
+
+        self._prune()
+        return {
+            "name": session.filename,
+            "profiler": session.kind,
+            "seconds": round(time.time() - session.started_at, 3),
+            "size_bytes": os.path.getsize(path)
+        }
+
+    def _prune(self):
+        """Keep the newest max_profiles reports; a cProfile report is a .prof and its .txt"""
+        reports: Dict[str, List[str]] = {}
+        for name in os.listdir(self.directory):
+            reports.setdefault(name.split(".", 1)[0], []).append(os.path.join(self.directory, name))
+        newest_first = sorted(reports.values(), key=lambda paths: max(map(os.path.getmtime, paths)), reverse=True)
+        for paths in newest_first[self.max_profiles:]:
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            profiles.append({"name": name, "size_bytes": os.path.getsize(path), "created_at": os.path.getmtime(path)})
+        return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Path of a stored report, or None; rejects anything that is not a plain file name"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    async def profile_window(self, seconds: float) -> Dict[str, Any]:
+        """Profile everything the event loop thread runs for `seconds`"""
+        session = self.begin(f"window-{seconds:g}s", async_mode=False)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.stop(session)
+        return await asyncio.to_thread(self.save, session)
+
+
+class MemoryTracker:
+    """tracemalloc snapshots with diffs against the previous snapshot"""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._previous_at: Optional[float] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._previous = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self._previous = None
+        self._previous_at = None
+
+    def snapshot(self, top: int = 25, group_by: str = "lineno", compare: bool = False) -> Dict[str, Any]:
+        """Largest allocation sites, or the largest growth since the previous snapshot"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+
+        allocations = []
+        if compare and self._previous is not None:
+            for stat in snapshot.compare_to(self._previous, group_by)[:top]:
+                allocations.append({
+                    "location": self._location(stat.traceback, group_by),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff
+                })
+        else:
+            for stat in snapshot.statistics(group_by)[:top]:
+                allocations.append({
+                    "location": self._location(stat.traceback, group_by),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count
+                })
+
+        result = {
+            "tracing": True,
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_mb": round(current / 2**20, 2),
+            "peak_mb": round(peak / 2**20, 2),
+            "tracemalloc_overhead_mb": round(tracemalloc.get_tracemalloc_memory() / 2**20, 2),
+            "group_by": group_by,
+            "compared_to": self._previous_at if compare and self._previous is not None else None,
+            "allocations": allocations
+        }
+        self._previous = snapshot
+        self._previous_at = time.time()
+        return result
+
+    @staticmethod
+    def _location(traceback: tracemalloc.Traceback, group_by: str):
+        if group_by == "traceback":
+            return traceback.format()
+        frame = traceback[0]
+        return f"{frame.filename}:{frame.lineno}" if group_by == "lineno" else frame.filename
+
+
+def _profile_requested(scope) -> bool:
+    for key, value in scope.get("headers", []):
+        if key == b"x-profile":
+            return value.decode("latin-1").lower() in ("1", "true", "yes")
+    query = scope.get("query_string", b"")
+    if b"profile=" not in query:
+        return False
+    value = parse_qs(query.decode("latin-1")).get("profile", [""])[0]
+    return value.lower() in ("1", "true", "yes")
+
+
+class ProfilingMiddleware:
+    """Profiles requests carrying ?profile=1 or X-Profile: 1 from admins
+
+    The report name is returned in the X-Profile header and the report is
+    stored under profiling.directory. Non-admin requests are served
+    normally and the flag is ignored.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        recorder = get_profile_recorder()
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        if not recorder.is_admin(headers):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            session = recorder.begin(f"{scope.get('method')} {scope.get('path')}", async_mode=True)
+        except ProfilerBusy:
+            session = None
+        profile_header = session.filename if session else "busy"
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile", profile_header.encode("latin-1"))]
+            await send(message)
+
+        if session is None:
+            await self.app(scope, receive, send_with_profile)
+            return
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            recorder.stop(session)
+            # The response has been sent by now; rendering does not delay it
+            await asyncio.to_thread(recorder.save, session)
+
+
+# Singletons
+_profile_recorder = None
+_memory_tracker = MemoryTracker()
+
+def get_profile_recorder(config_path: str = "config.yaml") -> ProfileRecorder:
+    global _profile_recorder
+    if _profile_recorder is None:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+        profiling_config = config.get('profiling', {})
+        _profile_recorder = ProfileRecorder(
+            profiling_config.get('directory', './data/profiles'),
+            enabled=profiling_config.get('enabled', False),
+            admin_token=profiling_config.get('admin_token') or os.environ.get('DELM_ADMIN_TOKEN', ''),
+            profiler=profiling_config.get('profiler', 'auto'),
+            output_format=profiling_config.get('format', 'html'),
+            interval=profiling_config.get('interval_seconds', 0.001),
+            max_profiles=profiling_config.get('max_profiles', 100),
+            trace_memory_frames=profiling_config.get('trace_memory_frames', 0)
+        )
+    return _profile_recorder
+
+def get_memory_tracker() -> MemoryTracker:
+    return _memory_tracker
@@ -0,0 +1,128 @@
+"""
+Compact in-memory embedding indexes (int8 or 1-bit) used to pick search
+candidates, which are then re-ranked against the float32 vectors in LanceDB
+"""
+import numpy as np
+from typing import List, Dict, Optional
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# int8 scales are recalibrated as the index grows until they rest on this many rows
+CALIBRATION_ROWS = 10000
+
+# Rows scored per step, bounding the float32 temporaries for int8 codes
+SCORE_CHUNK_ROWS = 65536
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class QuantizedIndex:
+    """Quantized copies of the stored vectors, in row order
+
+    int8 keeps one byte per dimension (4x smaller than float32) with a
+    per-dimension scale calibrated on the first rows added; values outside
+    that range are clipped. binary keeps one bit per dimension (32x
+    smaller), set when the value is above that dimension's calibrated mean,
+    and ranks by Hamming distance.
+    """
+
+    def __init__(self, dimension: int, mode: str):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+        self.dimension = dimension
+        self.mode = mode
+        self.scale: Optional[np.ndarray] = None
+        self.center: Optional[np.ndarray] = None
+        self.calibration_rows = 0
+        self.ids: List[str] = []
+        self._categories: Dict[str, int] = {}
+        width = dimension if mode == "int8" else (dimension + 7) // 8
+        self._codes = np.zeros((0, width), dtype=np.int8 if mode == "int8" else np.uint8)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._category_codes = np.zeros(0, dtype=np.int32)
+        # Appends are buffered and concatenated once before the next search
+        self._pending: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def needs_calibration(self) -> bool:
+        """Calibrated on too few rows; the caller should rebuild from the full vectors"""
+        return self.calibration_rows < CALIBRATION_ROWS and len(self) >= 2 * max(self.calibration_rows, 1)
+
+    @property
+    def nbytes(self) -> int:
+        self._consolidate()
+        return self._codes.nbytes + self._norms.nbytes + self._category_codes.nbytes
+
+    def _calibrate(self, vectors: np.ndarray):
+        if len(vectors):
+            self.center = vectors.mean(axis=0).astype(np.float32)
+            max_abs = np.abs(vectors).max(axis=0)
+        else:
+            self.center = np.zeros(self.dimension, dtype=np.float32)
+            max_abs = np.ones(self.dimension, dtype=np.float32)
+        self.scale = np.where(max_abs > 0, max_abs / 127, 1 / 127).astype(np.float32)
+        self.calibration_rows = len(vectors)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.scale is None:
+            self._calibrate(vectors)
+        if self.mode == "binary":
+            return np.packbits(vectors > self.center, axis=1)
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def add(self, ids: List[str], vectors, categories: List[str]):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        category_codes = np.array(
+            [self._categories.setdefault(category or "", len(self._categories)) for category in categories],
+            dtype=np.int32
+        )
+        codes = self._encode(vectors)
+        # Squared norms of the dequantized vectors turn int8 dot products into L2 ranking
+        norms = (
+            np.square(codes.astype(np.float32) * self.scale).sum(axis=1)
+            if self.mode == "int8" else np.zeros(len(codes), dtype=np.float32)
+        )
+        self._pending.append((codes, norms, category_codes))
+        self.ids.extend(ids)
+
+    def _consolidate(self):
+        if self._pending:
+            codes, norms, categories = zip(*self._pending)
+            self._codes = np.concatenate((self._codes,) + codes)
+            self._norms = np.concatenate((self._norms,) + norms)
+            self._category_codes = np.concatenate((self._category_codes,) + categories)
+            self._pending = []
+
+    def candidates(self, query, count: int, category: Optional[str] = None) -> List[int]:
+        """Row positions of the `count` rows nearest the query by quantized score"""
+        self._consolidate()
+        if not len(self.ids):
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        if self.mode == "binary":
+            query_bits = np.packbits(query > self.center)
+            for start in range(0, len(scores), SCORE_CHUNK_ROWS):
+                chunk = self._codes[start:start + SCORE_CHUNK_ROWS]
+                scores[start:start + len(chunk)] = -_POPCOUNT[np.bitwise_xor(chunk, query_bits)].sum(axis=1, dtype=np.int32)
+        else:
+            # -|q - x|^2 = 2 q.x - |x|^2 - |q|^2; the last term is constant per query
+            scaled_query = query * self.scale
+            for start in range(0, len(scores), SCORE_CHUNK_ROWS):
+                chunk = self._codes[start:start + SCORE_CHUNK_ROWS]
+                scores[start:start + len(chunk)] = 2 * (chunk.astype(np.float32) @ scaled_query) - self._norms[start:start + len(chunk)]
+
+        if category is not None:
+            code = self._categories.get(category)
+            if code is None:
+                return []
+            scores[self._category_codes != code] = -np.inf
+
+        count = min(count, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        return [int(i) for i in top if np.isfinite(scores[i])]
@@ -5,20 +5,53 @@ import yaml
 from typing import List, Dict, Any, Optional
 from .embeddings import EmbeddingService
 from .vector_store import VectorStore
+from .ingest import ingest_patterns, open_chunk_store
+from .chunking import split_pattern, chunk_index, DEFAULT_MAX_CHARS
+from .lexical_index import reciprocal_rank_fusion
 from .model import DesignLLM
+from .reranker import Reranker
+from .metrics import time_stage, CONTEXT_TOKENS
+from .tracing import span
 
 class RAGPipeline:
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(
+        self,
+        config_path: str = "config.yaml",
+        embeddings: Optional[EmbeddingService] = None,
+        llm: Optional[DesignLLM] = None
+    ):
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
 
         print("Initializing RAG Pipeline...")
-        self.embeddings = EmbeddingService(config_path)
+        # A preloaded service is shared copy-on-write by forked workers
+        self.embeddings = embeddings or EmbeddingService(config_path)
         self.vector_store = VectorStore(config_path)
-        self.llm = DesignLLM(config_path)
+        self.llm = llm or DesignLLM(config_path)
 
         self.top_k = self.config['rag']['top_k']
         self.similarity_threshold = self.config['rag']['similarity_threshold']
+        self.hybrid = self.config['rag'].get('hybrid') or {}
+        if self.hybrid.get('enabled') and self.vector_store.lexical is None:
+            print("rag.hybrid is enabled but vector_db.lexical_index is off; using vector search only")
+
+        # Long patterns are searched as chunks and returned with the chunks that matched
+        self.chunking = self.config['rag'].get('chunking') or {}
+        self.max_chars = self.chunking.get('max_chars', DEFAULT_MAX_CHARS)
+        self.chunk_store = open_chunk_store(config_path)
+        if self.chunk_store is not None and not self.chunks_complete():
+            print("rag.chunking is enabled but not every pattern is chunked; searching whole patterns "
+                  "until `python maintain_patterns.py rechunk` is run")
+
+        self.rerank = self.config['rag'].get('rerank') or {}
+        self.reranker = None
+        if self.rerank.get('enabled'):
+            self.reranker = Reranker(
+                self.rerank.get('model', 'cross-encoder/ms-marco-MiniLM-L-6-v2'),
+                batch_size=self.rerank.get('batch_size', 16),
+                max_length=self.rerank.get('max_length', 512),
+                cache_size=self.rerank.get('cache_size', 4096)
+            )
 
         print("RAG Pipeline ready!")
 
@@ -28,22 +61,124 @@ class RAGPipeline:
         category: Optional[str] = None,
         top_k: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """Retrieve relevant design patterns for a query"""
+        """Retrieve relevant design patterns for a query
+
+        With chunking, chunks are ranked and mapped back to their patterns,
+        each returned with its best-matching 'chunks'.
+        """
+        top_k = top_k or self.top_k
+        chunked = self.chunks_complete()
+        store = self.chunk_store if chunked else self.vector_store
+        # Several chunks of one pattern can rank together, so chunk rankings go deeper
+        depth = max(self.chunking.get('chunks_per_pattern', 2), 2) if chunked else 1
+        # The re-ranker picks top_k from a deeper candidate list
+        candidate_k = (max(top_k, self.rerank.get('candidates', 20)) if self.reranker is not None else top_k) * depth
+        hybrid = self.hybrid.get('enabled') and store.lexical is not None
+        # Fusion needs a deeper list from each ranking than it returns
+        fetch_k = max(candidate_k, self.hybrid.get('candidates', 20) * depth) if hybrid else candidate_k
 
         # Generate embedding for query
-        query_embedding = self.embeddings.embed(query).tolist()
+        with time_stage("embed"):
+            query_embedding = self.embeddings.embed(query).tolist()
 
         # Build filter if category specified
         filter_metadata = {"category": category} if category else None
 
         # Search vector store
-        results = self.vector_store.search(
-            query_embedding=query_embedding,
-            top_k=top_k or self.top_k,
-            filter_metadata=filter_metadata
+        with time_stage("vector_search", top_k=fetch_k, category=category or "") as search_span:
+            results = store.search(
+                query_embedding=query_embedding,
+                top_k=fetch_k,
+                filter_metadata=filter_metadata
+            )
+            search_span.set(pattern_ids=results['ids'][0] if results['ids'] else [])
+        patterns = self._format_results(results)
+
+        if hybrid:
+            with time_stage("lexical_search", top_k=fetch_k, category=category or "") as lexical_span:
+                lexical_results = store.lexical_search(query, top_k=fetch_k, filter_metadata=filter_metadata)
+                lexical_span.set(pattern_ids=lexical_results['ids'][0])
+            patterns = self.fuse_rankings(
+                [patterns, self._format_results(lexical_results)],
+                [self.hybrid.get('vector_weight', 1.0), self.hybrid.get('lexical_weight', 1.0)]
+            )[:candidate_k]
+
+        if self.reranker is not None:
+            with time_stage("rerank", candidates=len(patterns)) as rerank_span:
+                # Chunks are all kept in score order and grouped below
+                patterns = self.reranker.rerank(query, patterns, len(patterns) if chunked else top_k)
+                rerank_span.set(pattern_ids=[p['id'] for p in patterns])
+
+        if chunked:
+            with time_stage("parent_lookup", chunks=len(patterns)) as parent_span:
+                patterns = self._parent_patterns(patterns, top_k)
+                parent_span.set(pattern_ids=[p['id'] for p in patterns])
+
+        return patterns
+
+    def chunks_complete(self) -> bool:
+        """Whether every stored pattern has chunks
+
+        A pattern without chunks would be unreachable from chunk search, so
+        whole patterns are searched until the chunk table covers them all.
+        """
+        if self.chunk_store is None or self.chunk_store.count() == 0:
+            return False
+        return self.vector_store.distinct("id") <= self.chunk_store.distinct("parent_id")
+
+    def _parent_patterns(self, chunks: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """The top_k patterns of a best-first chunk ranking, each with up to chunks_per_pattern 'chunks'
+
+        A pattern ranks by its best chunk and takes that chunk's distance and scores.
+        """
+        per_pattern = self.chunking.get('chunks_per_pattern', 2)
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk in chunks:
+            group = groups.setdefault(chunk['metadata']['parent_id'], [])
+            if len(group) < per_pattern:
+                group.append(chunk)
+        parent_ids = list(groups)[:top_k]
+        stored = self.vector_store.get_stored(parent_ids, ["content", "category", "name", "tags"])
+
+        patterns = []
+        for parent_id in parent_ids:
+            row = stored.get(parent_id)
+            if row is None:
+                # Chunks of a pattern deleted by another worker since the search
+                continue
+            best = groups[parent_id][0]
+            pattern = {
+                'id': parent_id,
+                'content': row['content'],
+                'metadata': {'category': row['category'], 'name': row['name'], 'tags': row['tags']},
+                'distance': best['distance']
+            }
+            for key in ('score', 'rerank_score'):
+                if key in best:
+                    pattern[key] = best[key]
+            pattern['chunks'] = sorted(
+                ({'id': chunk['id'], 'index': chunk_index(chunk['id']), 'content': chunk['content']} for chunk in groups[parent_id]),
+                key=lambda chunk: chunk['index']
+            )
+            patterns.append(pattern)
+        return patterns
+
+    def fuse_rankings(self, rankings: List[List[Dict[str, Any]]], weights: List[float]) -> List[Dict[str, Any]]:
+        """Patterns ordered by reciprocal rank fusion, each with its fused 'score'"""
+        fused = reciprocal_rank_fusion(
+            [[pattern['id'] for pattern in ranking] for ranking in rankings],
+            weights,
+            self.hybrid.get('rrf_k', 60)
         )
+        # The first ranking a pattern appears in supplies its fields (the vector one carries distance)
+        patterns_by_id = {}
+        for ranking in rankings:
+            for pattern in ranking:
+                patterns_by_id.setdefault(pattern['id'], pattern)
+        return [dict(patterns_by_id[pattern_id], score=score) for pattern_id, score in fused]
 
-        # Format results
+    def _format_results(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pattern dicts from a VectorStore result set"""
         patterns = []
         if results['documents'] and results['documents'][0]:
             for i, doc in enumerate(results['documents'][0]):
@@ -69,13 +204,27 @@ class RAGPipeline:
             category = metadata.get('category', 'general')
             name = metadata.get('name', f'Pattern {i}')
 
+            body = self._chunk_context(pattern) if pattern.get('chunks') else pattern['content']
+
             context_parts.append(f"""
 --- {name} ({category}) ---
-{pattern['content']}
+{body}
 """)
 
         return "\n".join(context_parts)
 
+    def _chunk_context(self, pattern: Dict[str, Any]) -> str:
+        """A pattern's header (imports) and matched chunks in source order, with gaps marked"""
+        header, _ = split_pattern(pattern['content'], self.max_chars)
+        parts = [header] if header else []
+        previous = None
+        for chunk in pattern['chunks']:
+            if previous is not None and chunk['index'] != previous + 1:
+                parts.append("// ...")
+            parts.append(chunk['content'])
+            previous = chunk['index']
+        return "\n\n".join(parts)
+
     def generate(
         self,
         prompt: str,
@@ -84,11 +233,21 @@ class RAGPipeline:
     ) -> Dict[str, Any]:
         """Full RAG pipeline: retrieve patterns and generate output"""
 
-        # Retrieve relevant patterns
-        patterns = self.retrieve(prompt, category=category)
+        with span("rag_generate", generation_type=generation_type):
+            return self._generate(prompt, generation_type, category)
+
+    def _generate(self, prompt: str, generation_type: str, category: Optional[str]) -> Dict[str, Any]:
+        # Retrieve relevant patterns; a re-ranked list is precise enough to
+        # keep the prompt, and so prefill, to the best few
+        context_k = self.rerank.get('top_n', 3) if self.reranker is not None else None
+        patterns = self.retrieve(prompt, category=category, top_k=context_k)
 
         # Build context from patterns
-        context = self.build_context(patterns)
+        with time_stage("context_build") as context_span:
+            context = self.build_context(patterns)
+            context_tokens = self.count_tokens(context)
+            context_span.set(context_tokens=context_tokens)
+        CONTEXT_TOKENS.observe(context_tokens)
 
         # Generate based on type
         if generation_type == "component":
@@ -103,9 +262,17 @@ class RAGPipeline:
         return {
             'output': output,
             'patterns_used': len(patterns),
-            'pattern_ids': [p['id'] for p in patterns]
+            'pattern_ids': [p['id'] for p in patterns],
+            'context_tokens': context_tokens
         }
 
+    def count_tokens(self, text: str) -> int:
+        """LLM tokenizer count when the model is local, else about 4 characters per token"""
+        tokenizer = getattr(self.llm, 'tokenizer', None)
+        if tokenizer is not None:
+            return len(tokenizer.encode(text))
+        return len(text) // 4
+
     def add_pattern(
         self,
         pattern_id: str,
@@ -113,21 +280,30 @@ class RAGPipeline:
         category: str,
         name: str,
         tags: List[str] = None
-    ):
-        """Add a new design pattern to the knowledge base"""
-
-        embedding = self.embeddings.embed(content).tolist()
-        metadata = {
+    ) -> bool:
+        """Add a design pattern to the knowledge base, replacing any with the same ID; True if replaced"""
+        result = self.add_patterns([{
+            'pattern_id': pattern_id,
+            'content': content,
             'category': category,
             'name': name,
-            'tags': ','.join(tags) if tags else ''
-        }
+            'tags': tags
+        }])
+        updated = result['inserted'] == 0
+        print(f"{'Updated' if updated else 'Added'} pattern: {name} ({pattern_id})")
+        return updated
 
-        self.vector_store.add_pattern(
-            pattern_id=pattern_id,
-            content=content,
-            embedding=embedding,
-            metadata=metadata
+    def add_patterns(self, patterns: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert many patterns (pattern_id, content, category, name, tags), embedding only changed content"""
+        return ingest_patterns(
+            self.vector_store, self.embeddings, patterns, chunk_store=self.chunk_store, max_chars=self.max_chars
         )
 
-        print(f"Added pattern: {name} ({pattern_id})")
+    def delete_pattern(self, pattern_id: str) -> bool:
+        """Remove a pattern from the knowledge base; False if there was none"""
+        deleted = self.vector_store.delete([pattern_id]) > 0
+        if self.chunk_store is not None:
+            self.chunk_store.delete([pattern_id], column="parent_id")
+        if deleted:
+            print(f"Deleted pattern: {pattern_id}")
+        return deleted
@@ -0,0 +1,85 @@
+"""
+Cross-encoder re-ranking of retrieved patterns: the query and each candidate
+are scored together, which ranks far better than comparing embeddings
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from sentence_transformers import CrossEncoder
+
+
+class Reranker:
+    """Scores (query, pattern) pairs in batches, with an LRU cache of scores
+
+    Scores are cached per query, pattern id and content, so repeated and
+    refined queries over the same candidates skip the model, and an edited
+    pattern is scored again.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 16,
+        max_length: int = 512,
+        cache_size: int = 4096,
+        model: Optional[Any] = None
+    ):
+        print(f"Loading re-ranking model: {model_name}")
+        self.model = model or CrossEncoder(model_name, max_length=max_length)
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _document(pattern: Dict[str, Any]) -> str:
+        metadata = pattern.get('metadata', {})
+        header = " | ".join(part for part in (metadata.get('name'), metadata.get('tags')) if part)
+        return f"{header}\n{pattern['content']}" if header else pattern['content']
+
+    def score(self, query: str, patterns: List[Dict[str, Any]]) -> List[float]:
+        keys = [(query, pattern['id'], hash(pattern['content'])) for pattern in patterns]
+        scores: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                scores.append(score)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            predicted = self.model.predict(
+                [(query, self._document(patterns[i])) for i in missing],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def rerank(self, query: str, patterns: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+        """The top_n patterns by cross-encoder score, each with its 'rerank_score'"""
+        if not patterns:
+            return []
+        scored = [dict(pattern, rerank_score=score) for pattern, score in zip(patterns, self.score(query, patterns))]
+        scored.sort(key=lambda pattern: pattern['rerank_score'], reverse=True)
+        return scored[:top_n]
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0
+        }
@@ -1,50 +1,316 @@
 """
 Stable Diffusion image generation via MLX for Apple Silicon
 """
+import gc
 import io
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Callable
 from PIL import Image
 import yaml
 
+from .fonts import get_font
+from .image_cache import DiskImageCache
+from .metrics import time_stage
+
+# step_callback(step, total_steps, latents); latents is None when unavailable
+StepCallback = Callable[[int, int, Any], None]
+
+
+# mflux needs a seed; unseeded requests have always used this one
+DEFAULT_SEED = 42
+
+# Text encodings mflux keeps per prompt on the loaded model
+PROMPT_CACHE_SIZE = 64
+
+
+class GenerationCancelled(Exception):
+    """Raised from a step callback to abort a running generation"""
+
+
+# Linear map from the 16 FLUX latent channels to RGB, a cheap stand-in for the VAE
+LATENT_RGB_FACTORS = [
+    [-0.0346, 0.0244, 0.0681],
+    [0.0034, 0.0210, 0.0687],
+    [0.0275, -0.0668, -0.0433],
+    [-0.0174, 0.0160, 0.0617],
+    [0.0859, 0.0721, 0.0329],
+    [0.0004, 0.0383, 0.0115],
+    [0.0405, 0.0861, 0.0915],
+    [-0.0236, -0.0185, -0.0259],
+    [-0.0245, 0.0250, 0.1180],
+    [0.1008, 0.0755, -0.0421],
+    [-0.0515, 0.0201, 0.0011],
+    [0.0428, -0.0012, -0.0036],
+    [0.0817, 0.0765, 0.0749],
+    [-0.1264, -0.0522, -0.1103],
+    [-0.0280, -0.0881, -0.0499],
+    [-0.1262, -0.0982, -0.0778],
+]
+LATENT_RGB_BIAS = [-0.0329, -0.0718, -0.0851]
+
+
+def decode_latent_preview(latents, width: int, height: int, max_size: int = 128) -> Optional[bytes]:
+    """Approximate a low-resolution JPEG preview from in-progress latents
+
+    Skips the VAE entirely: each latent pixel is projected to RGB with a
+    fixed linear map, which is enough to show composition and color.
+    Returns None when the latent layout is not recognised.
+    """
+    import numpy as np
+
+    try:
+        array = np.asarray(latents, dtype=np.float32)
+    except Exception:
+        return None
+
+    rows, cols = height // 16, width // 16
+    if array.size == rows * cols * 64:
+        # Packed (1, rows*cols, 64): 16 channels x 2x2 patch per token; average the patch
+        array = array.reshape(rows, cols, 16, 2, 2).mean(axis=(3, 4))
+    elif array.ndim == 4 and array.shape[1] == 16:
+        # Unpacked (1, 16, H, W)
+        array = array[0].transpose(1, 2, 0)
+    else:
+        return None
+
+    rgb = array @ np.asarray(LATENT_RGB_FACTORS, dtype=np.float32) + np.asarray(LATENT_RGB_BIAS, dtype=np.float32)
+    rgb = np.clip((rgb + 1.0) * 127.5, 0, 255).astype(np.uint8)
+
+    scale = max_size / max(width, height)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    img = Image.fromarray(rgb).resize(size, Image.BILINEAR)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=70)
+    return buffer.getvalue()
+
+
+# Prompt presets appended to user descriptions
+LOGO_STYLE_PROMPTS = {
+    "modern": "modern minimalist logo design, clean lines, professional, vector style",
+    "vintage": "vintage retro logo design, classic typography, badge style",
+    "playful": "playful colorful logo design, friendly, rounded shapes",
+    "tech": "tech startup logo, geometric shapes, futuristic, sleek",
+    "organic": "organic natural logo design, flowing lines, earth tones",
+    "bold": "bold impactful logo design, strong typography, high contrast"
+}
+
+ICON_STYLE_PROMPTS = {
+    "flat": "flat design icon, solid colors, no shadows, minimalist",
+    "3d": "3D rendered icon, soft shadows, glossy finish",
+    "outline": "outline icon, thin lines, minimal, monochrome",
+    "glyph": "glyph icon, solid fill, simple shapes",
+    "duotone": "duotone icon, two colors, modern flat design"
+}
+
+ILLUSTRATION_STYLE_PROMPTS = {
+    "digital": "digital illustration, clean lines, vibrant colors",
+    "watercolor": "watercolor painting style, soft edges, artistic",
+    "vector": "vector art style, flat colors, geometric shapes",
+    "sketch": "pencil sketch style, hand-drawn look, detailed",
+    "isometric": "isometric illustration, 3D perspective, flat shading"
+}
+
+DEVICE_PROMPTS = {
+    "desktop": "desktop application UI, modern interface design",
+    "mobile": "mobile app UI, smartphone screen, iOS/Android style",
+    "tablet": "tablet app UI, iPad style interface",
+    "web": "website UI design, browser mockup"
+}
+
 class StableDiffusionGenerator:
     def __init__(self, config_path: str = "config.yaml"):
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
 
+        sd_config = self.config.get('stable_diffusion', {})
+        self.model_variant = sd_config.get('model', 'schnell')
+        self.quantize = sd_config.get('quantize', 8)
+        self.idle_unload_seconds = sd_config.get('idle_unload_seconds', 0)
+
+        # Generations are deterministic for a fixed seed, so outputs can be reused
+        cache_config = sd_config.get('cache', {})
+        self.cache = None
+        if cache_config.get('enabled', True):
+            self.cache = DiskImageCache(
+                cache_config.get('directory', './data/sd_cache'),
+                int(cache_config.get('max_size_mb', 1024) * 1024 * 1024)
+            )
+
         self.model = None
         self.loaded = False
+
+        # While the model is unavailable every request gets a placeholder; render each once
+        self._placeholder_cached = lru_cache(maxsize=128)(self._render_placeholder)
+
+        # Single-flight loading: one thread loads, concurrent callers wait on the lock
+        self._load_lock = threading.Lock()
+        self._active_generations = 0
+        self._last_used = time.monotonic()
+        self._idle_monitor = None
+        self._stop_idle_monitor = threading.Event()
+
+        # Load-time metrics
+        self.load_count = 0
+        self.unload_count = 0
+        self.last_load_seconds = None
+        self.total_load_seconds = 0.0
+        self.last_load_error = None
+
         print("Stable Diffusion generator initialized (model will load on first use)")
 
     def _load_model(self):
-        """Lazy load the Stable Diffusion model"""
+        """Lazy load the Stable Diffusion model (thread-safe, single-flight)"""
         if self.loaded:
             return True
 
+        with self._load_lock:
+            # Another thread may have finished loading while we waited
+            if self.loaded:
+                return True
+
+            start = time.perf_counter()
+            try:
+                # mflux 0.11+ has classes in mflux.generate
+                from mflux.generate import Flux1, Config, ModelConfig
+
+                print(f"Loading FLUX model ({self.model_variant}, {self.quantize}-bit); "
+                      "this may take a minute on first run...")
+
+                # FLUX.1 schnell by default for faster generation
+                with time_stage("diffusion_load", variant=self.model_variant, quantize=self.quantize):
+                    self.model = Flux1(
+                        model_config=getattr(ModelConfig, self.model_variant)(),
+                        quantize=self.quantize
+                    )
+
+                self.loaded = True
+                self._last_used = time.monotonic()
+                self.last_load_seconds = time.perf_counter() - start
+                self.total_load_seconds += self.last_load_seconds
+                self.load_count += 1
+                self.last_load_error = None
+                print(f"FLUX model loaded successfully in {self.last_load_seconds:.1f}s")
+
+                self._start_idle_monitor()
+                return True
+
+            except ImportError as e:
+                self.last_load_error = str(e)
+                print(f"mflux import error: {e}")
+                print("Install with: pip install mflux")
+                return False
+            except Exception as e:
+                self.last_load_error = str(e)
+                print(f"Error loading FLUX model: {e}")
+                import traceback
+                traceback.print_exc()
+                return False
+
+    @contextmanager
+    def _model_in_use(self):
+        """Mark the model busy so the idle monitor never unloads it mid-generation"""
+        with self._load_lock:
+            self._active_generations += 1
         try:
-            # mflux 0.11+ has classes in mflux.generate
-            from mflux.generate import Flux1, Config, ModelConfig
-
-            print("Loading FLUX model (this may take a minute on first run)...")
-
-            # Use FLUX.1 schnell for faster generation
-            self.model = Flux1(
-                model_config=ModelConfig.schnell(),
-                quantize=8  # 8-bit quantization for memory efficiency
-            )
+            yield
+        finally:
+            with self._load_lock:
+                self._active_generations -= 1
+                self._last_used = time.monotonic()
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Load the model ahead of the first request"""
+        self._load_model()
+        return self.get_status()
+
+    def unload(self) -> bool:
+        """Free model memory; the next request reloads on demand"""
+        with self._load_lock:
+            if not self.loaded or self._active_generations > 0:
+                return False
+
+            self.model = None
+            self.loaded = False
+            self.unload_count += 1
+            gc.collect()
+            try:
+                import mlx.core as mx
+                if hasattr(mx, "clear_cache"):
+                    mx.clear_cache()
+                else:
+                    mx.metal.clear_cache()
+            except Exception:
+                pass
+
+        print("FLUX model unloaded")
+        return True
+
+    def _start_idle_monitor(self):
+        """Start the background thread enforcing the idle-unload policy"""
+        if not self.idle_unload_seconds or self._idle_monitor is not None:
+            return
+
+        def monitor():
+            interval = min(60, max(1, self.idle_unload_seconds / 4))
+            while not self._stop_idle_monitor.wait(interval):
+                idle = time.monotonic() - self._last_used
+                if self.loaded and self._active_generations == 0 and idle >= self.idle_unload_seconds:
+                    print(f"FLUX model idle for {idle:.0f}s, unloading")
+                    self.unload()
+
+        self._idle_monitor = threading.Thread(target=monitor, name="sd-idle-monitor", daemon=True)
+        self._idle_monitor.start()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Model load state and load-time metrics"""
+        return {
+            "loaded": self.loaded,
+            "model": self.model_variant,
+            "quantize": self.quantize,
+            "active_generations": self._active_generations,
+            "idle_seconds": round(time.monotonic() - self._last_used, 1),
+            "idle_unload_seconds": self.idle_unload_seconds,
+            "load_count": self.load_count,
+            "unload_count": self.unload_count,
+            "last_load_seconds": self.last_load_seconds,
+            "total_load_seconds": round(self.total_load_seconds, 3),
+            "last_load_error": self.last_load_error,
+            "cache": self.cache.get_stats() if self.cache else None
+        }
 
-            self.loaded = True
-            print("FLUX model loaded successfully")
-            return True
+    def _cache_key(self, prompt: str, width: int, height: int, num_steps: int, seed: Optional[int]) -> str:
+        return DiskImageCache.make_key(
+            model=self.model_variant,
+            quantize=self.quantize,
+            prompt=prompt,
+            width=width,
+            height=height,
+            steps=num_steps,
+            seed=seed or DEFAULT_SEED
+        )
+
+    def cached_image(
+        self,
+        prompt: str,
+        width: int = 512,
+        height: int = 512,
+        num_steps: int = 4,
+        seed: Optional[int] = None
+    ) -> Optional[bytes]:
+        """Previously generated PNG for these exact inputs, if cached"""
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(prompt, width, height, num_steps, seed))
 
-        except ImportError as e:
-            print(f"mflux import error: {e}")
-            print("Install with: pip install mflux")
-            return False
-        except Exception as e:
-            print(f"Error loading FLUX model: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+    def _peek_image(self, prompt: str, width: int, height: int, num_steps: int, seed: Optional[int]) -> Optional[bytes]:
+        """Cached PNG for a lookup that was already counted"""
+        if self.cache is None:
+            return None
+        return self.cache.peek(self._cache_key(prompt, width, height, num_steps, seed))
 
     def generate(
         self,
@@ -52,10 +318,34 @@ class StableDiffusionGenerator:
         width: int = 512,
         height: int = 512,
         num_steps: int = 4,
-        seed: Optional[int] = None
+        seed: Optional[int] = None,
+        step_callback: Optional[StepCallback] = None
     ) -> Optional[bytes]:
-        """Generate an image from a text prompt"""
-
+        """Generate an image from a text prompt
+
+        step_callback(step, total_steps, latents) is called after each
+        denoising step when mflux exposes in-loop callbacks, and once at
+        the end otherwise. It may raise GenerationCancelled to abort.
+        Results are served from the image cache when the same inputs
+        were generated before.
+        """
+        cached = self.cached_image(prompt, width, height, num_steps, seed)
+        if cached is not None:
+            if step_callback:
+                step_callback(num_steps, num_steps, None)
+            return cached
+        return self._generate(prompt, width, height, num_steps, seed, step_callback)
+
+    def _generate(
+        self,
+        prompt: str,
+        width: int,
+        height: int,
+        num_steps: int,
+        seed: Optional[int],
+        step_callback: Optional[StepCallback]
+    ) -> Optional[bytes]:
+        """Run diffusion and cache the output, without looking the cache up first"""
         if not self._load_model():
             return self._generate_placeholder(width, height, "SD model not available")
 
@@ -63,15 +353,32 @@ class StableDiffusionGenerator:
             from mflux.generate import Config
 
             # Generate the image
-            result = self.model.generate_image(
-                seed=seed or 42,
-                prompt=prompt,
-                config=Config(
-                    num_inference_steps=num_steps,
-                    height=height,
-                    width=width
-                )
-            )
+            with self._model_in_use():
+                model = self.model
+                if model is None:
+                    # Unloaded between the load check and now; load again
+                    self._load_model()
+                    model = self.model
+
+                detach = self._attach_step_callback(model, step_callback)
+                try:
+                    with time_stage("diffusion", steps=num_steps, width=width, height=height, seed=seed or DEFAULT_SEED):
+                        result = model.generate_image(
+                            seed=seed or DEFAULT_SEED,
+                            prompt=prompt,
+                            config=Config(
+                                num_inference_steps=num_steps,
+                                height=height,
+                                width=width
+                            )
+                        )
+                finally:
+                    if detach:
+                        detach()
+                    self._trim_prompt_cache(model)
+
+            if step_callback and detach is None:
+                step_callback(num_steps, num_steps, None)
 
             # Convert to PNG bytes - result.image is a PIL Image
             buffer = io.BytesIO()
@@ -80,12 +387,145 @@ class StableDiffusionGenerator:
             else:
                 # Fallback if result is the image itself
                 result.save(buffer, format='PNG')
-            return buffer.getvalue()
+            image_bytes = buffer.getvalue()
+
+            # Placeholders and errors never reach this point, so only real outputs are cached
+            if self.cache is not None:
+                self.cache.put(self._cache_key(prompt, width, height, num_steps, seed), image_bytes)
+            return image_bytes
 
+        except GenerationCancelled:
+            raise
         except Exception as e:
             print(f"Generation error: {e}")
             return self._generate_placeholder(width, height, f"Error: {str(e)[:50]}")
 
+    def _trim_prompt_cache(self, model):
+        """Bound mflux's per-prompt text encoding memo, dropping the oldest prompts
+
+        Repeated prompts (seed variants, retries) skip the T5/CLIP encoders
+        while their encoding is still in this memo.
+        """
+        prompt_cache = getattr(model, "prompt_cache", None)
+        if isinstance(prompt_cache, dict):
+            while len(prompt_cache) > PROMPT_CACHE_SIZE:
+                prompt_cache.pop(next(iter(prompt_cache)))
+
+    def _attach_step_callback(self, model, step_callback: Optional[StepCallback]):
+        """Best-effort hook into mflux's in-loop callbacks
+
+        Returns a detach function, or None when this mflux version has no
+        in-loop callback registry.
+        """
+        if step_callback is None:
+            return None
+
+        class _InLoopHook:
+            def __init__(self):
+                self.step = 0
+
+            def call_in_loop(self, *args, **kwargs):
+                # mflux signature: (t, seed, prompt, latents, config, time_steps)
+                self.step += 1
+                latents = kwargs.get("latents", args[3] if len(args) > 3 else None)
+                config = kwargs.get("config", args[4] if len(args) > 4 else None)
+                total = getattr(config, "num_inference_steps", None) or self.step
+                step_callback(self.step, total, latents)
+
+        hook = _InLoopHook()
+
+        # mflux >= 0.10: per-model registry
+        registry = getattr(model, "callbacks", None)
+        if registry is not None and hasattr(registry, "register"):
+            registry.register(hook)
+
+            def detach():
+                for name in ("in_loop", "in_loop_callbacks", "_in_loop"):
+                    callbacks = getattr(registry, name, None)
+                    if isinstance(callbacks, list) and hook in callbacks:
+                        callbacks.remove(hook)
+            return detach
+
+        # Older mflux: class-level registry
+        try:
+            from mflux.callbacks.callback_registry import CallbackRegistry
+            CallbackRegistry.register_in_loop(hook)
+            return lambda: CallbackRegistry.in_loop_callbacks().remove(hook)
+        except Exception:
+            return None
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        seeds: List[Optional[int]],
+        width: int = 512,
+        height: int = 512,
+        num_steps: int = 4,
+        step_callbacks: Optional[List[Optional[StepCallback]]] = None
+    ) -> List[Optional[bytes]]:
+        """Generate several same-size images under a single model hold
+
+        mflux has no batched denoising call, so images run back-to-back,
+        but the load check and in-use bookkeeping are paid once per batch.
+        Callers have already counted a cache lookup for every image, so the
+        cache is only peeked at here, catching images another request
+        generated in the meantime. A batch made entirely of such hits never
+        loads the model.
+        """
+        step_callbacks = step_callbacks or [None] * len(prompts)
+        cached = [
+            self._peek_image(prompt, width, height, num_steps, seed)
+            for prompt, seed in zip(prompts, seeds)
+        ]
+        if all(image is not None for image in cached):
+            for step_callback in step_callbacks:
+                if step_callback:
+                    step_callback(num_steps, num_steps, None)
+            return cached
+
+        if not self._load_model():
+            placeholder = self._generate_placeholder(width, height, "SD model not available")
+            return [placeholder for _ in prompts]
+
+        # Same-prompt images run back-to-back so they share one text encoding
+        images = []
+        with self._model_in_use():
+            for prompt, seed, step_callback, image in zip(prompts, seeds, step_callbacks, cached):
+                if image is None:
+                    # A duplicate earlier in this batch may have just been cached
+                    image = self._peek_image(prompt, width, height, num_steps, seed)
+                if image is not None:
+                    if step_callback:
+                        step_callback(num_steps, num_steps, None)
+                    images.append(image)
+                    continue
+                try:
+                    images.append(self._generate(prompt, width, height, num_steps, seed, step_callback))
+                except GenerationCancelled:
+                    # Cancelled images come back as None; the rest of the batch continues
+                    images.append(None)
+        return images
+
+    def logo_prompt(self, description: str, style: str = "modern") -> str:
+        """Expand a logo description with its style preset"""
+        style_addition = LOGO_STYLE_PROMPTS.get(style, LOGO_STYLE_PROMPTS["modern"])
+        return f"{description}, {style_addition}, white background, centered, high quality"
+
+    def icon_prompt(self, description: str, style: str = "flat") -> str:
+        """Expand an icon description with its style preset"""
+        style_addition = ICON_STYLE_PROMPTS.get(style, ICON_STYLE_PROMPTS["flat"])
+        return f"single {description} icon, {style_addition}, centered, white background, app icon style"
+
+    def illustration_prompt(self, description: str, style: str = "digital") -> str:
+        """Expand an illustration description with its style preset"""
+        style_addition = ILLUSTRATION_STYLE_PROMPTS.get(style, ILLUSTRATION_STYLE_PROMPTS["digital"])
+        return f"{description}, {style_addition}, high quality, detailed"
+
+    def ui_mockup_prompt(self, description: str, device: str = "desktop") -> str:
+        """Expand a UI mockup description with its device context"""
+        device_context = DEVICE_PROMPTS.get(device, DEVICE_PROMPTS["desktop"])
+        return f"{description}, {device_context}, clean modern design, professional UI/UX, high fidelity mockup"
+
     def generate_logo(
         self,
         description: str,
@@ -94,20 +534,7 @@ class StableDiffusionGenerator:
         height: int = 512
     ) -> Optional[bytes]:
         """Generate a logo from description"""
-
-        style_prompts = {
-            "modern": "modern minimalist logo design, clean lines, professional, vector style",
-            "vintage": "vintage retro logo design, classic typography, badge style",
-            "playful": "playful colorful logo design, friendly, rounded shapes",
-            "tech": "tech startup logo, geometric shapes, futuristic, sleek",
-            "organic": "organic natural logo design, flowing lines, earth tones",
-            "bold": "bold impactful logo design, strong typography, high contrast"
-        }
-
-        style_addition = style_prompts.get(style, style_prompts["modern"])
-        full_prompt = f"{description}, {style_addition}, white background, centered, high quality"
-
-        return self.generate(full_prompt, width, height)
+        return self.generate(self.logo_prompt(description, style), width, height)
 
     def generate_icon(
         self,
@@ -117,19 +544,7 @@ class StableDiffusionGenerator:
         height: int = 256
     ) -> Optional[bytes]:
         """Generate an icon from description"""
-
-        style_prompts = {
-            "flat": "flat design icon, solid colors, no shadows, minimalist",
-            "3d": "3D rendered icon, soft shadows, glossy finish",
-            "outline": "outline icon, thin lines, minimal, monochrome",
-            "glyph": "glyph icon, solid fill, simple shapes",
-            "duotone": "duotone icon, two colors, modern flat design"
-        }
-
-        style_addition = style_prompts.get(style, style_prompts["flat"])
-        full_prompt = f"single {description} icon, {style_addition}, centered, white background, app icon style"
-
-        return self.generate(full_prompt, width, height, num_steps=4)
+        return self.generate(self.icon_prompt(description, style), width, height, num_steps=4)
 
     def generate_illustration(
         self,
@@ -139,19 +554,7 @@ class StableDiffusionGenerator:
         height: int = 512
     ) -> Optional[bytes]:
         """Generate an illustration"""
-
-        style_prompts = {
-            "digital": "digital illustration, clean lines, vibrant colors",
-            "watercolor": "watercolor painting style, soft edges, artistic",
-            "vector": "vector art style, flat colors, geometric shapes",
-            "sketch": "pencil sketch style, hand-drawn look, detailed",
-            "isometric": "isometric illustration, 3D perspective, flat shading"
-        }
-
-        style_addition = style_prompts.get(style, style_prompts["digital"])
-        full_prompt = f"{description}, {style_addition}, high quality, detailed"
-
-        return self.generate(full_prompt, width, height, num_steps=4)
+        return self.generate(self.illustration_prompt(description, style), width, height, num_steps=4)
 
     def generate_ui_mockup(
         self,
@@ -161,22 +564,14 @@ class StableDiffusionGenerator:
         height: int = 512
     ) -> Optional[bytes]:
         """Generate a UI mockup image"""
-
-        device_prompts = {
-            "desktop": "desktop application UI, modern interface design",
-            "mobile": "mobile app UI, smartphone screen, iOS/Android style",
-            "tablet": "tablet app UI, iPad style interface",
-            "web": "website UI design, browser mockup"
-        }
-
-        device_context = device_prompts.get(device, device_prompts["desktop"])
-        full_prompt = f"{description}, {device_context}, clean modern design, professional UI/UX, high fidelity mockup"
-
-        return self.generate(full_prompt, width, height, num_steps=4)
+        return self.generate(self.ui_mockup_prompt(description, device), width, height, num_steps=4)
 
     def _generate_placeholder(self, width: int, height: int, message: str) -> bytes:
         """Generate a placeholder image when SD is not available"""
-        from PIL import Image, ImageDraw, ImageFont
+        return self._placeholder_cached(width, height, message)
+
+    def _render_placeholder(self, width: int, height: int, message: str) -> bytes:
+        from PIL import ImageDraw
 
         img = Image.new('RGB', (width, height), color='#fef3c7')  # Amber background
         draw = ImageDraw.Draw(img)
@@ -184,13 +579,8 @@ class StableDiffusionGenerator:
         # Border
         draw.rectangle([0, 0, width-1, height-1], outline='#f59e0b', width=3)
 
-        # Try to load fonts
-        try:
-            font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 12)
-            title_font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 14)
-        except:
-            font = ImageFont.load_default()
-            title_font = font
+        font = get_font(12)
+        title_font = get_font(14)
 
         # Title
         title = "AI Image Generation Unavailable"
@@ -228,9 +618,12 @@ class StableDiffusionGenerator:
 
 # Singleton
 _sd_generator = None
+_sd_generator_lock = threading.Lock()
 
 def get_sd_generator() -> StableDiffusionGenerator:
     global _sd_generator
     if _sd_generator is None:
-        _sd_generator = StableDiffusionGenerator()
+        with _sd_generator_lock:
+            if _sd_generator is None:
+                _sd_generator = StableDiffusionGenerator()
     return _sd_generator
@@ -0,0 +1,344 @@
+"""
+Model-serving sidecars: run the LLM, embedder and HTML renderer in their
+own processes and call them from the API over authenticated Unix sockets
+
+Start a service instance with:
+
+    python -m src.sidecar embeddings --instance 0
+
+The API discovers every <socket_dir>/<service>-<n>.sock and spreads calls
+across the instances.
+"""
+import argparse
+import asyncio
+import glob
+import itertools
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Optional, Dict, Any, Callable, List
+import yaml
+
+SERVICES = ("embeddings", "llm", "renderer")
+
+# Exposed methods per service; nothing else is callable over the socket
+SERVICE_METHODS = {
+    "embeddings": ("embed", "embed_batch"),
+    "llm": ("generate", "generate_ui_component", "generate_styles", "generate_layout"),
+    "renderer": ("html_to_png",),
+}
+
+
+class SidecarError(Exception):
+    """Raised when a sidecar call fails or no instance is reachable"""
+
+
+def _load_sidecar_config(config_path: str = "config.yaml") -> Dict[str, Any]:
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    return config.get('sidecars', {})
+
+
+def sidecar_authkey(sidecar_config: Dict[str, Any]) -> bytes:
+    """Shared secret for the sockets from sidecars.authkey or DELM_SIDECAR_AUTHKEY
+
+    There is no default: a well-known key would let any local user who can
+    reach the socket directory call the model services.
+    """
+    authkey = sidecar_config.get('authkey') or os.environ.get('DELM_SIDECAR_AUTHKEY', '')
+    if not authkey:
+        raise SidecarError("Sidecars need sidecars.authkey or DELM_SIDECAR_AUTHKEY set to a secret")
+    return authkey.encode('utf-8')
+
+
+def socket_path(socket_dir: str, service: str, instance: int) -> str:
+    return os.path.join(socket_dir, f"{service}-{instance}.sock")
+
+
+class MethodStats:
+    __slots__ = ("calls", "errors", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 2) if self.calls else 0,
+            "max_ms": round(self.max_seconds * 1000, 2)
+        }
+
+
+class SidecarServer:
+    """Serves a fixed set of methods; one thread per client connection"""
+
+    def __init__(self, service: str, instance: int, handlers: Dict[str, Callable], address: str, authkey: bytes):
+        self.service = service
+        self.instance = instance
+        self.handlers = handlers
+        self.address = address
+        self.authkey = authkey
+        self.started_at = time.time()
+        self.stats: Dict[str, MethodStats] = {name: MethodStats() for name in handlers}
+        self.connections = 0
+        self._stats_lock = threading.Lock()
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            # Stale socket from a previous run of this instance
+            os.remove(self.address)
+        # Only this user should reach the sockets
+        os.makedirs(os.path.dirname(self.address), mode=0o700, exist_ok=True)
+
+        with Listener(self.address, family='AF_UNIX', authkey=self.authkey) as listener:
+            print(f"Sidecar {self.service}-{self.instance} listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"Sidecar accept error: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        with self._stats_lock:
+            self.connections += 1
+        try:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                conn.send(self._dispatch(method, args, kwargs))
+        finally:
+            with self._stats_lock:
+                self.connections -= 1
+            conn.close()
+
+    def _dispatch(self, method: str, args, kwargs):
+        if method == "__metrics__":
+            return ("ok", self.get_metrics())
+        if method == "__ping__":
+            return ("ok", True)
+
+        handler = self.handlers.get(method)
+        if handler is None:
+            return ("error", f"{self.service} has no method {method}")
+
+        start = time.perf_counter()
+        try:
+            result = handler(*args, **kwargs)
+            status = ("ok", result)
+        except Exception as e:
+            status = ("error", f"{type(e).__name__}: {e}")
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            stats = self.stats[method]
+            stats.calls += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            if status[0] == "error":
+                stats.errors += 1
+        return status
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            methods = {name: stats.as_dict() for name, stats in self.stats.items()}
+        return {
+            "service": self.service,
+            "instance": self.instance,
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "connections": self.connections,
+            "methods": methods
+        }
+
+
+class _InstancePool:
+    """Bounded pool of open connections to one sidecar instance"""
+
+    def __init__(self, address: str, authkey: bytes, size: int):
+        self.address = address
+        self.authkey = authkey
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def call(self, method: str, args, kwargs, timeout: Optional[float]):
+        if not self._slots.acquire(timeout=timeout):
+            raise SidecarError(f"Timed out waiting for a connection to {self.address}")
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+
+            conn.send((method, args, kwargs))
+            if timeout is not None and not conn.poll(timeout):
+                # The reply may still arrive later; never reuse this connection
+                conn.close()
+                conn = None
+                raise SidecarError(f"{method} timed out after {timeout}s")
+            status, result = conn.recv()
+            self._idle.put(conn)
+            conn = None
+        except (OSError, EOFError) as e:
+            # Instance restarted or gone; drop the connection so the next call reconnects
+            if conn is not None:
+                conn.close()
+            raise ConnectionError(str(e)) from e
+        finally:
+            self._slots.release()
+
+        if status == "error":
+            raise SidecarError(result)
+        return result
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SidecarClient:
+    """Round-robins calls over every running instance of one service"""
+
+    def __init__(self, service: str, socket_dir: str, authkey: bytes, pool_size: int = 4, timeout: Optional[float] = None):
+        self.service = service
+        self.socket_dir = socket_dir
+        self.authkey = authkey
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pools: Dict[str, _InstancePool] = {}
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def _instances(self) -> List[_InstancePool]:
+        """Pools for the instances currently present (re-scanned on every call)"""
+        addresses = sorted(glob.glob(os.path.join(self.socket_dir, f"{self.service}-*.sock")))
+        with self._lock:
+            for address in list(self._pools):
+                if address not in addresses:
+                    self._pools.pop(address).close()
+            for address in addresses:
+                if address not in self._pools:
+                    self._pools[address] = _InstancePool(address, self.authkey, self.pool_size)
+            return [self._pools[address] for address in addresses]
+
+    def call(self, method: str, *args, **kwargs):
+        instances = self._instances()
+        if not instances:
+            raise SidecarError(f"No {self.service} sidecar is running in {self.socket_dir}")
+
+        # Start at the next instance in rotation; fail over to the others
+        start = next(self._counter)
+        last_error = None
+        for offset in range(len(instances)):
+            pool = instances[(start + offset) % len(instances)]
+            try:
+                return pool.call(method, args, kwargs, self.timeout)
+            except ConnectionError as e:
+                last_error = e
+        raise SidecarError(f"All {self.service} sidecars unreachable: {last_error}")
+
+    async def acall(self, method: str, *args, **kwargs):
+        return await asyncio.to_thread(self.call, method, *args, **kwargs)
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        results = []
+        for pool in self._instances():
+            try:
+                results.append(pool.call("__metrics__", (), {}, 5))
+            except Exception as e:
+                results.append({"service": self.service, "address": pool.address, "error": str(e)})
+        return results
+
+
+class RemoteService:
+    """Drop-in proxy exposing a sidecar's methods as local calls"""
+
+    def __init__(self, client: SidecarClient):
+        self._client = client
+        self._methods = SERVICE_METHODS[client.service]
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in self._methods:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._client.call(name, *args, **kwargs)
+
+
+# Clients, one per service, when sidecars are enabled
+_clients: Dict[str, SidecarClient] = {}
+
+def get_sidecar_client(service: str, config_path: str = "config.yaml") -> Optional[SidecarClient]:
+    """Client for a service if config routes it to sidecars, else None"""
+    if service not in _clients:
+        sidecar_config = _load_sidecar_config(config_path)
+        if not sidecar_config.get('enabled') or service not in sidecar_config.get('services', SERVICES):
+            return None
+        _clients[service] = SidecarClient(
+            service,
+            sidecar_config.get('socket_dir', './data/sockets'),
+            sidecar_authkey(sidecar_config),
+            pool_size=sidecar_config.get('pool_size', 4),
+            timeout=sidecar_config.get('timeout_seconds')
+        )
+    return _clients[service]
+
+
+def _build_handlers(service: str, config_path: str) -> Dict[str, Callable]:
+    if service == "embeddings":
+        from .embeddings import EmbeddingService
+        target = EmbeddingService(config_path)
+    elif service == "llm":
+        from .model import DesignLLM
+        target = DesignLLM(config_path)
+    else:
+        from .image_generator import ImageGenerator
+
+        # Playwright is async; drive it from one event loop thread
+        generator = ImageGenerator(config_path, use_sidecar=False)
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name="renderer-loop", daemon=True).start()
+
+        def html_to_png(*args, **kwargs):
+            future = asyncio.run_coroutine_threadsafe(generator.html_to_png(*args, **kwargs), loop)
+            return future.result()
+        return {"html_to_png": html_to_png}
+
+    return {name: getattr(target, name) for name in SERVICE_METHODS[service]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a DELM model-serving sidecar")
+    parser.add_argument("service", choices=SERVICES)
+    parser.add_argument("--instance", type=int, default=0)
+    parser.add_argument("--config", default="config.yaml")
+    args = parser.parse_args()
+
+    sidecar_config = _load_sidecar_config(args.config)
+    try:
+        authkey = sidecar_authkey(sidecar_config)
+    except SidecarError as e:
+        parser.error(str(e))
+    server = SidecarServer(
+        args.service,
+        args.instance,
+        _build_handlers(args.service, args.config),
+        socket_path(sidecar_config.get('socket_dir', './data/sockets'), args.service, args.instance),
+        authkey
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,166 @@
 """
 SVG generation for icons, symbols, and simple graphics
 """
+import hashlib
+import io
+import json
+import math
 import re
-from typing import Dict, Any, List
+import zipfile
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from .icon_search import IconSearchIndex
+
+# Sizes included in the prebuilt icon pack
+ICON_PACK_SIZES = (16, 24, 32, 48)
+
+# Symbol geometry in a 100x100 viewBox, computed once at import as path data
+
+def _points_path(points: str) -> str:
+    """Convert polygon points ("x,y x,y ...") to closed path data"""
+    coords = points.split()
+    return "M" + " L".join(coords) + " Z"
+
+def _circle_path(cx: float, cy: float, r: float) -> str:
+    """Circle as two arcs"""
+    return f"M{cx - r:g},{cy:g} A{r:g},{r:g} 0 1,0 {cx + r:g},{cy:g} A{r:g},{r:g} 0 1,0 {cx - r:g},{cy:g} Z"
+
+def _rect_path(x: float, y: float, w: float, h: float, r: float = 0) -> str:
+    """Rectangle, optionally with rounded corners"""
+    if not r:
+        return f"M{x:g},{y:g} H{x + w:g} V{y + h:g} H{x:g} Z"
+    return (
+        f"M{x + r:g},{y:g} H{x + w - r:g} A{r:g},{r:g} 0 0,1 {x + w:g},{y + r:g} "
+        f"V{y + h - r:g} A{r:g},{r:g} 0 0,1 {x + w - r:g},{y + h:g} "
+        f"H{x + r:g} A{r:g},{r:g} 0 0,1 {x:g},{y + h - r:g} "
+        f"V{y + r:g} A{r:g},{r:g} 0 0,1 {x + r:g},{y:g} Z"
+    )
+
+GRADIENT_DIRECTIONS = {
+    "diagonal": ("0%", "0%", "100%", "100%"),
+    "horizontal": ("0%", "0%", "100%", "0%"),
+    "vertical": ("0%", "0%", "0%", "100%"),
+}
+
+_TWO_STOP = [(0, "primary", 1), (100, "secondary", 1)]
+
+def _gradient(direction: str, stops=None) -> Dict[str, Any]:
+    return {"direction": direction, "stops": stops or _TWO_STOP}
+
+# Each shape paints with "gradient", "primary", "secondary" or a literal value
+SYMBOL_REGISTRY: Dict[str, Dict[str, Any]] = {
+    "circle": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _circle_path(50, 50, 45), "fill": "gradient"}],
+    },
+    "hexagon": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _points_path("50,5 95,27.5 95,72.5 50,95 5,72.5 5,27.5"), "fill": "gradient"}],
+    },
+    "star": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _points_path("50,5 61,39 97,39 68,61 79,95 50,73 21,95 32,61 3,39 39,39"), "fill": "gradient"}],
+    },
+    "diamond": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _points_path("50,5 95,50 50,95 5,50"), "fill": "gradient"}],
+    },
+    "triangle": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _points_path("50,10 90,90 10,90"), "fill": "gradient"}],
+    },
+    "ring": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _circle_path(50, 50, 40), "fill": "none", "stroke": "gradient", "stroke_width": 8}],
+    },
+    "badge": {
+        "shapes": [
+            {"d": "M50 5 L61 39 L97 39 L68 61 L79 95 L50 73 L21 95 L32 61 L3 39 L39 39 Z", "fill": "primary"},
+            {"d": _circle_path(50, 50, 20), "fill": "secondary"},
+        ],
+    },
+    "arrow": {
+        "gradient": _gradient("horizontal"),
+        "shapes": [{"d": _points_path("10,40 60,40 60,20 90,50 60,80 60,60 10,60"), "fill": "gradient"}],
+    },
+    "chevron": {
+        "gradient": _gradient("horizontal"),
+        "shapes": [{"d": _points_path("20,10 50,50 20,90 40,90 70,50 40,10"), "fill": "gradient"}],
+    },
+    "divider": {
+        "gradient": _gradient("horizontal", [(0, "primary", 0), (50, "primary", 1), (100, "secondary", 0)]),
+        "shapes": [{"d": _rect_path(5, 45, 90, 10, 5), "fill": "gradient"}],
+    },
+    "dots": {
+        "shapes": [
+            {"d": _circle_path(25, 50, 8), "fill": "primary"},
+            {"d": _circle_path(50, 50, 8), "fill": "secondary"},
+            {"d": _circle_path(75, 50, 8), "fill": "primary"},
+        ],
+    },
+    "wave": {
+        "gradient": _gradient("horizontal"),
+        "shapes": [{"d": "M0,50 Q25,20 50,50 T100,50 V100 H0 Z", "fill": "gradient"}],
+    },
+    "shield": {
+        "gradient": _gradient("vertical"),
+        "shapes": [{"d": "M50,5 L90,20 L90,50 Q90,85 50,95 Q10,85 10,50 L10,20 Z", "fill": "gradient"}],
+    },
+    "heart": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": "M50,88 C20,60 5,40 5,25 C5,10 20,5 35,15 C45,22 50,30 50,30 C50,30 55,22 65,15 C80,5 95,10 95,25 C95,40 80,60 50,88 Z", "fill": "gradient"}],
+    },
+    "lightning": {
+        "gradient": _gradient("vertical"),
+        "shapes": [{"d": _points_path("60,5 25,50 45,50 40,95 75,45 55,45"), "fill": "gradient"}],
+    },
+    "cross": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": "M40,10 H60 V40 H90 V60 H60 V90 H40 V60 H10 V40 H40 Z", "fill": "gradient"}],
+    },
+    "octagon": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _points_path("30,5 70,5 95,30 95,70 70,95 30,95 5,70 5,30"), "fill": "gradient"}],
+    },
+    "pentagon": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _points_path("50,5 95,38 77,90 23,90 5,38"), "fill": "gradient"}],
+    },
+    "burst": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _points_path("50,0 58,35 90,15 65,42 100,50 65,58 90,85 58,65 50,100 42,65 10,85 35,58 0,50 35,42 10,15 42,35"), "fill": "gradient"}],
+    },
+    "ribbon": {
+        "gradient": _gradient("horizontal"),
+        "shapes": [
+            {"d": "M0,35 L15,50 L0,65 L25,65 L25,35 Z", "fill": "secondary"},
+            {"d": _rect_path(20, 35, 60, 30), "fill": "gradient"},
+            {"d": "M100,35 L85,50 L100,65 L75,65 L75,35 Z", "fill": "secondary"},
+        ],
+    },
+    "square": {
+        "gradient": _gradient("diagonal"),
+        "shapes": [{"d": _rect_path(10, 10, 80, 80, 8), "fill": "gradient"}],
+    },
+}
+
 
 class SVGGenerator:
     def __init__(self):
         self.icon_templates = self._load_icon_templates()
+        self.compiled_icons = self._compile_icon_templates()
+        self.icon_manifest_etag = self._compute_manifest_etag()
+        self.search_index = IconSearchIndex(list(self.icon_templates.keys()))
+
+        # Memoized renderer keyed on (name, size, color, stroke_width)
+        self._render_icon_cached = lru_cache(maxsize=4096)(self._render_icon)
+        self._render_sprite_cached = lru_cache(maxsize=128)(self._render_sprite)
+        self._render_atlas_cached = lru_cache(maxsize=64)(self._render_atlas)
+        self._render_symbol_cached = lru_cache(maxsize=1024)(self._render_symbol)
+
+        # Prebuilt icon pack, built lazily (or eagerly via prebuild_assets)
+        self._icon_pack: Optional[bytes] = None
 
     def _load_icon_templates(self) -> Dict[str, str]:
         """Load built-in icon templates"""
@@ -75,6 +229,33 @@ class SVGGenerator:
             "layers": '''<path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 2L2 7l10 5 10-5-10-5zM2 17l10 5 10-5M2 12l10 5 10-5"/>''',
         }
 
+    def _compile_icon_templates(self) -> Dict[str, Tuple[str, ...]]:
+        """Split each icon template around its stroke-width attributes.
+
+        The resulting tuple holds the static fragments of the template; joining
+        them with a stroke-width attribute reproduces the icon body without
+        running a regex per request.
+        """
+        return {
+            name: tuple(re.split(r'stroke-width="[^"]*"', template))
+            for name, template in self.icon_templates.items()
+        }
+
+    def _compute_manifest_etag(self) -> str:
+        """Stable ETag for the icon manifest, derived from the templates"""
+        digest = hashlib.sha1()
+        for name in sorted(self.icon_templates):
+            digest.update(name.encode('utf-8'))
+            digest.update(self.icon_templates[name].encode('utf-8'))
+        return f'"{digest.hexdigest()[:16]}"'
+
+    def _icon_body(self, name: str, stroke_width: float) -> Optional[str]:
+        """Render the inner path markup of a compiled icon"""
+        parts = self.compiled_icons.get(name)
+        if parts is None:
+            return None
+        return f'stroke-width="{stroke_width}"'.join(parts)
+
     def generate_icon(
         self,
         name: str,
@@ -82,14 +263,46 @@ class SVGGenerator:
         color: str = "currentColor",
         stroke_width: float = 2
     ) -> str:
-        """Generate an SVG icon by name"""
+        """Generate an SVG icon by name, resolving aliases"""
+        return self._render_icon_cached(self.resolve_icon_name(name), size, color, stroke_width)
+
+    def resolve_icon_name(self, name: str) -> str:
+        """Map a requested name onto a built-in icon ("gear" -> "settings")"""
+        key = name.lower()
+        if key in self.compiled_icons:
+            return key
+        return self.search_index.resolve(key) or key
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hits, misses and size of each render memo and the icon resolve memo"""
+        stats = {}
+        for name, cached in (
+            ("icon_render", self._render_icon_cached),
+            ("sprite_render", self._render_sprite_cached),
+            ("atlas_render", self._render_atlas_cached),
+            ("symbol_render", self._render_symbol_cached),
+        ):
+            info = cached.cache_info()
+            stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+        stats["icon_resolve"] = self.search_index.cache_stats()
+        return stats
+
+    def search_icons(self, query: str, limit: int = 10, semantic: bool = False) -> List[Dict[str, Any]]:
+        """Ranked icon matches for a free-text query"""
+        return self.search_index.search(query, limit=limit, semantic=semantic)
+
+    def _render_icon(
+        self,
+        name: str,
+        size: int,
+        color: str,
+        stroke_width: float
+    ) -> str:
+        """Render an icon from its compiled template (memoized via generate_icon)"""
 
-        icon_path = self.icon_templates.get(name.lower())
+        icon_path = self._icon_body(name, stroke_width)
 
         if icon_path:
-            # Update stroke width in the path
-            icon_path = re.sub(r'stroke-width="[^"]*"', f'stroke-width="{stroke_width}"', icon_path)
-
             return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 24 24" fill="none" stroke="{color}" stroke-width="{stroke_width}" stroke-linecap="round" stroke-linejoin="round">
 {icon_path}
 </svg>'''
@@ -105,246 +318,77 @@ class SVGGenerator:
         symbol_type: str,
         size: int = 64,
         primary_color: str = "#3b82f6",
-        secondary_color: str = "#60a5fa"
+        secondary_color: str = "#60a5fa",
+        id_suffix: Optional[str] = None
     ) -> str:
-        """Generate decorative symbols and shapes"""
-
-        if symbol_type == "circle":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="circleGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<circle cx="50" cy="50" r="45" fill="url(#circleGrad)"/>
-</svg>'''
-
-        elif symbol_type == "hexagon":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="hexGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="50,5 95,27.5 95,72.5 50,95 5,72.5 5,27.5" fill="url(#hexGrad)"/>
-</svg>'''
-
-        elif symbol_type == "star":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="starGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="50,5 61,39 97,39 68,61 79,95 50,73 21,95 32,61 3,39 39,39" fill="url(#starGrad)"/>
-</svg>'''
-
-        elif symbol_type == "diamond":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="diamondGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="50,5 95,50 50,95 5,50" fill="url(#diamondGrad)"/>
-</svg>'''
-
-        elif symbol_type == "triangle":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="triGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="50,10 90,90 10,90" fill="url(#triGrad)"/>
-</svg>'''
-
-        elif symbol_type == "ring":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="ringGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<circle cx="50" cy="50" r="40" fill="none" stroke="url(#ringGrad)" stroke-width="8"/>
-</svg>'''
-
-        elif symbol_type == "badge":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<path d="M50 5 L61 39 L97 39 L68 61 L79 95 L50 73 L21 95 L32 61 L3 39 L39 39 Z" fill="{primary_color}"/>
-<circle cx="50" cy="50" r="20" fill="{secondary_color}"/>
-</svg>'''
-
-        elif symbol_type == "arrow":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="arrowGrad" x1="0%" y1="0%" x2="100%" y2="0%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="10,40 60,40 60,20 90,50 60,80 60,60 10,60" fill="url(#arrowGrad)"/>
-</svg>'''
-
-        elif symbol_type == "chevron":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="chevGrad" x1="0%" y1="0%" x2="100%" y2="0%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="20,10 50,50 20,90 40,90 70,50 40,10" fill="url(#chevGrad)"/>
-</svg>'''
-
-        elif symbol_type == "divider":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="divGrad" x1="0%" y1="0%" x2="100%" y2="0%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:0" />
-        <stop offset="50%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:0" />
-    </linearGradient>
-</defs>
-<rect x="5" y="45" width="90" height="10" rx="5" fill="url(#divGrad)"/>
-</svg>'''
-
-        elif symbol_type == "dots":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<circle cx="25" cy="50" r="8" fill="{primary_color}"/>
-<circle cx="50" cy="50" r="8" fill="{secondary_color}"/>
-<circle cx="75" cy="50" r="8" fill="{primary_color}"/>
-</svg>'''
-
-        elif symbol_type == "wave":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="waveGrad" x1="0%" y1="0%" x2="100%" y2="0%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<path d="M0,50 Q25,20 50,50 T100,50 V100 H0 Z" fill="url(#waveGrad)"/>
-</svg>'''
-
-        elif symbol_type == "shield":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="shieldGrad" x1="0%" y1="0%" x2="0%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<path d="M50,5 L90,20 L90,50 Q90,85 50,95 Q10,85 10,50 L10,20 Z" fill="url(#shieldGrad)"/>
-</svg>'''
-
-        elif symbol_type == "heart":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="heartGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<path d="M50,88 C20,60 5,40 5,25 C5,10 20,5 35,15 C45,22 50,30 50,30 C50,30 55,22 65,15 C80,5 95,10 95,25 C95,40 80,60 50,88 Z" fill="url(#heartGrad)"/>
-</svg>'''
-
-        elif symbol_type == "lightning":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="lightGrad" x1="0%" y1="0%" x2="0%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="60,5 25,50 45,50 40,95 75,45 55,45" fill="url(#lightGrad)"/>
-</svg>'''
-
-        elif symbol_type == "cross":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="crossGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<path d="M40,10 H60 V40 H90 V60 H60 V90 H40 V60 H10 V40 H40 Z" fill="url(#crossGrad)"/>
-</svg>'''
-
-        elif symbol_type == "octagon":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="octGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="30,5 70,5 95,30 95,70 70,95 30,95 5,70 5,30" fill="url(#octGrad)"/>
-</svg>'''
+        """Generate decorative symbols and shapes
 
-        elif symbol_type == "pentagon":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="pentGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="50,5 95,38 77,90 23,90 5,38" fill="url(#pentGrad)"/>
-</svg>'''
+        Gradient ids are derived from the render parameters (or id_suffix, if
+        given), so several symbols can be inlined on one page without their
+        gradients colliding.
+        """
+        return self._render_symbol_cached(symbol_type, size, primary_color, secondary_color, id_suffix)
 
-        elif symbol_type == "burst":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="burstGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<polygon points="50,0 58,35 90,15 65,42 100,50 65,58 90,85 58,65 50,100 42,65 10,85 35,58 0,50 35,42 10,15 42,35" fill="url(#burstGrad)"/>
-</svg>'''
-
-        elif symbol_type == "ribbon":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="ribGrad" x1="0%" y1="0%" x2="100%" y2="0%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<path d="M0,35 L15,50 L0,65 L25,65 L25,35 Z" fill="{secondary_color}"/>
-<rect x="20" y="35" width="60" height="30" fill="url(#ribGrad)"/>
-<path d="M100,35 L85,50 L100,65 L75,65 L75,35 Z" fill="{secondary_color}"/>
-</svg>'''
-
-        elif symbol_type == "square":
-            return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
-<defs>
-    <linearGradient id="sqGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-        <stop offset="0%" style="stop-color:{primary_color};stop-opacity:1" />
-        <stop offset="100%" style="stop-color:{secondary_color};stop-opacity:1" />
-    </linearGradient>
-</defs>
-<rect x="10" y="10" width="80" height="80" rx="8" fill="url(#sqGrad)"/>
-</svg>'''
+    def _render_symbol(
+        self,
+        symbol_type: str,
+        size: int,
+        primary_color: str,
+        secondary_color: str,
+        id_suffix: Optional[str]
+    ) -> str:
+        """Render a symbol from the registry (memoized via generate_symbol)"""
+        spec = SYMBOL_REGISTRY.get(symbol_type)
 
-        else:
-            # List available types
-            available = ["circle", "hexagon", "star", "diamond", "triangle", "ring", "badge",
-                        "arrow", "chevron", "divider", "dots", "wave", "shield", "heart",
-                        "lightning", "cross", "octagon", "pentagon", "burst", "ribbon", "square"]
+        if spec is None:
             return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">
 <rect x="5" y="5" width="90" height="90" rx="8" fill="#f3f4f6" stroke="#d1d5db"/>
 <text x="50" y="45" text-anchor="middle" font-family="sans-serif" font-size="8" fill="#6b7280">Unknown type:</text>
 <text x="50" y="58" text-anchor="middle" font-family="sans-serif" font-size="7" fill="#9ca3af">{symbol_type}</text>
 </svg>'''
 
+        colors = {"primary": primary_color, "secondary": secondary_color}
+        if id_suffix is None:
+            id_suffix = hashlib.md5(
+                f"{symbol_type}|{primary_color}|{secondary_color}".encode('utf-8')
+            ).hexdigest()[:8]
+        gradient_id = f"{symbol_type}Grad-{id_suffix}"
+
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">']
+
+        gradient = spec.get("gradient")
+        if gradient:
+            x1, y1, x2, y2 = GRADIENT_DIRECTIONS[gradient["direction"]]
+            stops = "\n".join(
+                f'        <stop offset="{offset}%" style="stop-color:{colors[color]};stop-opacity:{opacity}" />'
+                for offset, color, opacity in gradient["stops"]
+            )
+            parts.append(f'''<defs>
+    <linearGradient id="{gradient_id}" x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}">
+{stops}
+    </linearGradient>
+</defs>''')
+
+        for shape in spec["shapes"]:
+            attrs = [f'd="{shape["d"]}"']
+            for attr in ("fill", "stroke"):
+                paint = shape.get(attr)
+                if paint is None:
+                    continue
+                if paint == "gradient":
+                    paint = f"url(#{gradient_id})"
+                attrs.append(f'{attr}="{colors.get(paint, paint)}"')
+            if "stroke_width" in shape:
+                attrs.append(f'stroke-width="{shape["stroke_width"]}"')
+            parts.append(f'<path {" ".join(attrs)}/>')
+
+        parts.append('</svg>')
+        return "\n".join(parts)
+
+    def list_symbol_types(self) -> List[str]:
+        """Return list of available symbol types"""
+        return list(SYMBOL_REGISTRY.keys())
+
     def generate_logo_placeholder(
         self,
         text: str,
@@ -381,6 +425,127 @@ class SVGGenerator:
         """Return list of available icon names"""
         return sorted(self.icon_templates.keys())
 
+    def get_icon_manifest(self) -> Dict[str, Any]:
+        """Return the icon manifest served by GET /icons"""
+        return {
+            "icons": self.list_available_icons(),
+            "count": len(self.icon_templates),
+            "pack_sizes": list(ICON_PACK_SIZES),
+            "version": self.icon_manifest_etag.strip('"')
+        }
+
+    def resolve_icon_names(self, names: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
+        """Split requested names into (available, missing); None means all icons"""
+        if not names:
+            return self.list_available_icons(), []
+        found, missing = [], []
+        for name in names:
+            key = name.strip().lower()
+            if not key:
+                continue
+            (found if key in self.compiled_icons else missing).append(key)
+        # Preserve request order but drop duplicates
+        return list(dict.fromkeys(found)), missing
+
+    def generate_sprite(
+        self,
+        names: Optional[List[str]] = None,
+        color: str = "currentColor",
+        stroke_width: float = 2
+    ) -> str:
+        """Generate an SVG sprite with each requested icon as a <symbol>"""
+        found, _ = self.resolve_icon_names(names)
+        return self._render_sprite_cached(tuple(found), color, stroke_width)
+
+    def _render_sprite(self, names: Tuple[str, ...], color: str, stroke_width: float) -> str:
+        """Render a sprite for already-resolved icon names (memoized)"""
+        symbols = []
+        for name in names:
+            symbols.append(
+                f'<symbol id="icon-{name}" viewBox="0 0 24 24" fill="none" stroke="{color}" '
+                f'stroke-width="{stroke_width}" stroke-linecap="round" stroke-linejoin="round">'
+                f'{self._icon_body(name, stroke_width)}</symbol>'
+            )
+        return (
+            '<svg xmlns="http://www.w3.org/2000/svg" style="display:none">\n'
+            + "\n".join(symbols)
+            + "\n</svg>"
+        )
+
+    def build_sprite_sheet(self) -> str:
+        """Prebuilt SVG sprite sheet with every icon, using currentColor"""
+        return self.generate_sprite()
+
+    def build_icon_atlas(
+        self,
+        names: Optional[List[str]] = None,
+        size: int = 24,
+        color: str = "#000000",
+        stroke_width: float = 2,
+        padding: int = 0
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Lay icons out on a grid and return (atlas SVG, coordinate map)"""
+        found, _ = self.resolve_icon_names(names)
+        return self._render_atlas_cached(tuple(found), size, color, stroke_width, padding)
+
+    def _render_atlas(
+        self,
+        names: Tuple[str, ...],
+        size: int,
+        color: str,
+        stroke_width: float,
+        padding: int
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Render an icon atlas for already-resolved icon names (memoized)"""
+        cell = size + padding * 2
+        columns = max(1, math.ceil(math.sqrt(len(names))))
+        rows = max(1, math.ceil(len(names) / columns))
+        width, height = columns * cell, rows * cell
+
+        frames = {}
+        icons = []
+        for index, name in enumerate(names):
+            x = (index % columns) * cell + padding
+            y = (index // columns) * cell + padding
+            frames[name] = {"x": x, "y": y, "width": size, "height": size}
+            icons.append(
+                f'<svg x="{x}" y="{y}" width="{size}" height="{size}" viewBox="0 0 24 24" fill="none" '
+                f'stroke="{color}" stroke-width="{stroke_width}" stroke-linecap="round" stroke-linejoin="round">'
+                f'{self._icon_body(name, stroke_width)}</svg>'
+            )
+
+        atlas_svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">\n' + "\n".join(icons) + "\n</svg>"
+        )
+        coordinate_map = {
+            "width": width,
+            "height": height,
+            "icon_size": size,
+            "frames": frames
+        }
+        return atlas_svg, coordinate_map
+
+    def build_icon_pack(self) -> bytes:
+        """Build (once) a ZIP archive of every icon at the common pack sizes"""
+        if self._icon_pack is None:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for size in ICON_PACK_SIZES:
+                    for name in self.list_available_icons():
+                        archive.writestr(f"{size}/{name}.svg", self.generate_icon(name, size))
+                archive.writestr("sprite.svg", self.build_sprite_sheet())
+                archive.writestr("manifest.json", json.dumps(self.get_icon_manifest(), indent=2))
+            self._icon_pack = buffer.getvalue()
+        return self._icon_pack
+
+    def prebuild_assets(self):
+        """Eagerly build the sprite sheet and icon pack (called at startup)"""
+        self.build_sprite_sheet()
+        self.build_icon_pack()
+        print(f"Prebuilt icon assets: {len(self.icon_templates)} icons, "
+              f"{len(self._icon_pack) // 1024}KB pack")
+
 
 # Singleton
 _svg_generator = None
@@ -0,0 +1,322 @@
+"""
+Lightweight request tracing: spans propagated through contextvars, exported
+as JSON lines or OTLP/HTTP JSON, summarized in a Server-Timing header
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Tuple
+import yaml
+
+
+class Trace:
+    def __init__(self, trace_id: str, request_id: str):
+        self.trace_id = trace_id
+        self.request_id = request_id
+        self.spans: List["Span"] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span"):
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any], start_ns: Optional[int] = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Returned outside a trace so instrumented code never has to check"""
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("delm_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Open a child span of the current span (no-op outside a trace)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.status = "error"
+        child.attributes["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        child.end_ns = time.time_ns()
+        _current_span.reset(token)
+        parent.trace.add(child)
+
+
+def record_span(name: str, parent: Optional[Span], start_ns: int, end_ns: int, **attributes):
+    """Add a span timed elsewhere, e.g. on a worker thread outside the request context"""
+    if parent is None:
+        return
+    recorded = Span(parent.trace, name, parent.span_id, attributes, start_ns)
+    recorded.end_ns = end_ns
+    parent.trace.add(recorded)
+
+
+def start_trace(name: str, request_id: Optional[str] = None, traceparent: Optional[str] = None, **attributes):
+    """Begin a trace with a root span; returns (root, token) for finish_trace"""
+    trace_id, parent_id = None, None
+    if traceparent:
+        # W3C traceparent: version-traceid-parentid-flags
+        parts = traceparent.split("-")
+        if len(parts) == 4 and len(parts[1]) == 32:
+            trace_id, parent_id = parts[1], parts[2]
+    trace = Trace(trace_id or uuid.uuid4().hex, request_id or uuid.uuid4().hex)
+    root = Span(trace, name, parent_id, attributes)
+    return root, _current_span.set(root)
+
+
+def finish_trace(root: Span, token):
+    root.end_ns = time.time_ns()
+    _current_span.reset(token)
+    root.trace.add(root)
+    if _enabled and _exporter is not None and (_sample_rate >= 1 or random.random() < _sample_rate):
+        _exporter.export(root.trace)
+
+
+def server_timing(trace: Trace) -> str:
+    """Server-Timing header value: wall-clock time covered by each span name
+
+    Overlapping spans of one name, such as the per-image diffusion spans of
+    a variants request, count once, so no stage exceeds the request total.
+    """
+    now = time.time_ns()
+    intervals: Dict[str, List[Tuple[int, int]]] = {}
+    with trace._lock:
+        spans = list(trace.spans)
+    for child in spans:
+        intervals.setdefault(child.name, []).append((child.start_ns, child.end_ns or now))
+
+    totals = []
+    for name, ranges in intervals.items():
+        covered, reach = 0, None
+        for start, end in sorted(ranges):
+            if reach is None or start > reach:
+                covered += end - start
+                reach = end
+            elif end > reach:
+                covered += end - reach
+                reach = end
+        totals.append(f"{name};dur={covered / 1e6:.1f}")
+    return ", ".join(totals)
+
+
+class _BackgroundExporter:
+    """Exports finished traces from a daemon thread so requests never wait on I/O"""
+
+    def __init__(self):
+        self._queue: Optional[queue.Queue] = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        if self._pid != os.getpid():
+            # Started lazily: threads do not survive the fork into preloaded workers
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=1000)
+                    threading.Thread(target=self._run, args=(self._queue,), name="trace-exporter", daemon=True).start()
+                    self._pid = os.getpid()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            pass
+
+    def _run(self, pending: queue.Queue):
+        while True:
+            batch = [pending.get()]
+            while len(batch) < 64:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as e:
+                print(f"Trace export error: {e}")
+
+    def write(self, traces: List[Trace]):
+        raise NotImplementedError
+
+
+class FileExporter(_BackgroundExporter):
+    """One JSON object per trace per line"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        super().__init__()
+
+    def write(self, traces: List[Trace]):
+        with open(self.path, "a") as f:
+            for trace in traces:
+                f.write(json.dumps({
+                    "trace_id": trace.trace_id,
+                    "request_id": trace.request_id,
+                    "spans": [s.to_dict() for s in trace.spans]
+                }, default=str) + "\n")
+
+
+class OTLPExporter(_BackgroundExporter):
+    """OTLP/HTTP JSON, accepted by the OpenTelemetry collector on :4318"""
+
+    def __init__(self, endpoint: str, service_name: str = "delm"):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        super().__init__()
+
+    @staticmethod
+    def _attribute(key: str, value) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        if isinstance(value, (list, tuple)):
+            return {"key": key, "value": {"stringValue": ",".join(map(str, value))}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def write(self, traces: List[Trace]):
+        spans = []
+        for trace in traces:
+            for s in trace.spans:
+                attributes = dict(s.attributes, **{"delm.request_id": trace.request_id})
+                spans.append({
+                    "traceId": trace.trace_id,
+                    "spanId": s.span_id,
+                    "parentSpanId": s.parent_id or "",
+                    "name": s.name,
+                    "kind": 2 if s.parent_id is None else 1,
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                    "attributes": [self._attribute(k, v) for k, v in attributes.items()],
+                    "status": {"code": 2 if s.status == "error" else 1}
+                })
+        body = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "delm"}, "spans": spans}]
+        }]}).encode("utf-8")
+        request = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"})
+        urllib.request.urlopen(request, timeout=5).close()
+
+
+_exporter: Optional[_BackgroundExporter] = None
+_sample_rate = 1.0
+_enabled = False
+
+
+def configure_tracing(config_path: str = "config.yaml") -> bool:
+    """Set up the exporter from the tracing section of config.yaml"""
+    global _exporter, _sample_rate, _enabled
+    with open(config_path, 'r') as f:
+        tracing_config = yaml.safe_load(f).get('tracing', {})
+
+    _enabled = tracing_config.get('enabled', True)
+    _sample_rate = tracing_config.get('sample_rate', 1.0)
+    exporter = tracing_config.get('exporter', 'none')
+    if exporter == "file":
+        _exporter = FileExporter(tracing_config.get('file_path', './data/traces.jsonl'))
+    elif exporter == "otlp":
+        _exporter = OTLPExporter(tracing_config.get('otlp_endpoint', 'http://127.0.0.1:4318/v1/traces'))
+    else:
+        _exporter = None
+    return _enabled
+
+
+class TracingMiddleware:
+    """Traces each HTTP request and adds X-Request-Id and Server-Timing headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        root, token = start_trace(
+            f"{scope.get('method')} {scope.get('path')}",
+            request_id=headers.get("x-request-id"),
+            traceparent=headers.get("traceparent"),
+            **{"http.method": scope.get("method"), "http.target": scope.get("path")}
+        )
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                root.set(**{"http.status_code": message["status"]})
+                timing = server_timing(root.trace)
+                total = f"total;dur={root.duration_ms:.1f}"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", root.trace.request_id.encode("latin-1")),
+                    (b"server-timing", (f"{timing}, {total}" if timing else total).encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope.get('method')} {route.path}"
+            finish_trace(root, token)
@@ -1,32 +1,177 @@
 """
 Vector database for storing and retrieving design patterns using LanceDB
 """
+import hashlib
 import lancedb
 import pyarrow as pa
 import yaml
-from typing import List, Dict, Any
+from collections import Counter
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
 import os
 import numpy as np
+from .quantization import QuantizedIndex, QUANTIZATION_MODES, CALIBRATION_ROWS
+from .lexical_index import BM25Index
+
+# Rows read per batch when rebuilding the in-memory indexes
+INDEX_BATCH_ROWS = 65536
+
+# Ids per `id IN (...)` filter when deleting or deduplicating
+ID_FILTER_CHUNK = 1000
+
+COLUMNS = ["id", "content", "category", "name", "tags", "vector", "content_hash", "embedding_model", "parent_id"]
+
+# Columns added after the first release, created on open when missing
+_ADDED_COLUMNS = ("content_hash", "embedding_model", "parent_id")
+
+
+def content_hash(content: str) -> str:
+    """Fingerprint of the embedded text; a pattern whose hash and model match needs no new embedding"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _empty_results() -> Dict[str, Any]:
+    return {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+
 
 class VectorStore:
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", collection_name: Optional[str] = None):
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
 
         persist_dir = self.config['vector_db']['persist_directory']
         os.makedirs(persist_dir, exist_ok=True)
 
-        self.db = lancedb.connect(persist_dir)
-        self.table_name = self.config['vector_db']['collection_name']
+        # Several server workers share this directory; re-check the table version
+        # periodically so each sees patterns written by the others
+        consistency = self.config['vector_db'].get('read_consistency_seconds')
+        try:
+            self.db = lancedb.connect(
+                persist_dir,
+                read_consistency_interval=timedelta(seconds=consistency) if consistency is not None else None
+            )
+        except TypeError:
+            # lancedb < 0.5 has no read_consistency_interval
+            self.db = lancedb.connect(persist_dir)
+        self.table_name = collection_name or self.config['vector_db']['collection_name']
         self.dimension = self.config['embeddings']['dimension']
+        self.embedding_model = self.config['embeddings']['model']
 
         # Create table if it doesn't exist
         if self.table_name not in self.db.table_names():
             self._create_table()
 
         self.table = self.db.open_table(self.table_name)
+        self._add_missing_columns()
+
+        # Optional compact index searched in memory; LanceDB keeps the float32
+        # vectors used to re-rank its candidates
+        self.quantization = self._table_setting('quantization', 'none')
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{self.quantization}', expected one of {QUANTIZATION_MODES}")
+        self.rerank_candidates = self._table_setting('rerank_candidates', 50)
+        # BM25 over content, name and tags for hybrid retrieval
+        self.lexical_enabled = self._table_setting('lexical_index', False)
+        self.index = None
+        self.lexical = None
+        self._indexed_version = None
+        # column -> ((table version, row count), distinct values)
+        self._distinct: Dict[str, Any] = {}
+        if self.quantization != 'none' or self.lexical_enabled:
+            self._build_indexes()
+        if self.index is not None:
+            print(f"Quantized index ({self.quantization}): {self.index.nbytes / 2**20:.1f} MB")
         print(f"Vector store initialized with {self.count()} patterns")
 
+    def _table_setting(self, key: str, default):
+        """vector_db.tables.<collection> override, else the vector_db value"""
+        db_config = self.config['vector_db']
+        table_config = (db_config.get('tables') or {}).get(self.table_name) or {}
+        return table_config.get(key, db_config.get(key, default))
+
+    def _build_indexes(self):
+        """Rebuild the in-memory indexes from the table, reading it in batches"""
+        index = QuantizedIndex(self.dimension, self.quantization) if self.quantization != 'none' else None
+        lexical = BM25Index() if self.lexical_enabled else None
+        columns = ["id", "category"]
+        if index is not None:
+            columns.append("vector")
+        if lexical is not None:
+            columns.extend(["content", "name", "tags"])
+        # Read first: a write landing during the scan makes the next search rebuild again
+        self._indexed_version = self._table_version()
+        batches = self.scan(columns)
+        # Each write is its own fragment and batch; the first rows added fix the
+        # calibration, so hold batches back until there are enough of them
+        buffered = []
+        for batch in batches:
+            buffered.append(batch)
+            if index is not None and index.calibration_rows == 0 and sum(len(b) for b in buffered) < CALIBRATION_ROWS:
+                continue
+            self._index_batches(index, lexical, buffered)
+            buffered = []
+        self._index_batches(index, lexical, buffered)
+        self.index = index
+        self.lexical = lexical
+
+    def scan(self, columns: List[str]):
+        """Record batches of the given columns, in row order"""
+        try:
+            return self.table.to_lance().to_batches(columns=columns, batch_size=INDEX_BATCH_ROWS)
+        except (AttributeError, ImportError):
+            return self.table.to_arrow().select(columns).to_batches(max_chunksize=INDEX_BATCH_ROWS)
+
+    def _table_version(self) -> Optional[int]:
+        return getattr(self.table, "version", None)
+
+    @staticmethod
+    def _index_batches(index: QuantizedIndex, lexical: BM25Index, batches):
+        if not batches:
+            return
+        rows = pa.Table.from_batches(batches)
+        ids = rows.column("id").to_pylist()
+        categories = rows.column("category").to_pylist()
+        if index is not None:
+            index.add(ids, rows.column("vector").combine_chunks().flatten().to_numpy(zero_copy_only=False), categories)
+        if lexical is not None:
+            lexical.add(
+                ids,
+                rows.column("content").to_pylist(),
+                rows.column("name").to_pylist(),
+                rows.column("tags").to_pylist(),
+                categories
+            )
+
+    def _index_rows(self, data: List[Dict[str, Any]]):
+        """Mirror rows just written to the table into the in-memory indexes"""
+        ids = [row["id"] for row in data]
+        categories = [row["category"] for row in data]
+        if self.index is not None:
+            self.index.add(ids, [row["vector"] for row in data], categories)
+        if self.lexical is not None:
+            self.lexical.add(
+                ids,
+                [row["content"] for row in data],
+                [row["name"] for row in data],
+                [row["tags"] for row in data],
+                categories
+            )
+        if self.index is not None and self.index.needs_calibration:
+            self._build_indexes()
+        else:
+            self._indexed_version = self._table_version()
+
+    def _refresh_indexes(self):
+        """Re-read the indexes after rows were replaced or deleted, which moves row offsets"""
+        if self.index is not None or self.lexical is not None:
+            self._build_indexes()
+
+    def _sync_indexes(self):
+        """Rebuild the in-memory indexes if another worker wrote to the table"""
+        indexed = len(self.index) if self.index is not None else len(self.lexical) if self.lexical is not None else None
+        if indexed is not None and (indexed != self.count() or self._indexed_version != self._table_version()):
+            self._build_indexes()
+
     def _create_table(self):
         """Create the patterns table with schema"""
         schema = pa.schema([
@@ -36,9 +181,28 @@ class VectorStore:
             pa.field("name", pa.string()),
             pa.field("tags", pa.string()),
             pa.field("vector", pa.list_(pa.float32(), self.dimension)),
+            pa.field("content_hash", pa.string()),
+            pa.field("embedding_model", pa.string()),
+            # Set on chunk rows to the pattern they were cut from
+            pa.field("parent_id", pa.string()),
         ])
         self.db.create_table(self.table_name, schema=schema)
 
+    def _add_missing_columns(self):
+        """Add columns to tables created before them
+
+        Existing rows get nulls; without a content_hash the next ingestion
+        embeds them once more.
+        """
+        missing = [name for name in _ADDED_COLUMNS if name not in self.table.schema.names]
+        if not missing:
+            return
+        try:
+            self.table.add_columns([pa.field(name, pa.string()) for name in missing])
+        except (TypeError, ValueError):
+            # Older lancedb only takes SQL expressions
+            self.table.add_columns({name: "CAST(NULL AS STRING)" for name in missing})
+
     def add_pattern(
         self,
         pattern_id: str,
@@ -47,15 +211,9 @@ class VectorStore:
         metadata: Dict[str, Any]
     ):
         """Add a design pattern to the vector store"""
-        data = [{
-            "id": pattern_id,
-            "content": content,
-            "category": metadata.get("category", ""),
-            "name": metadata.get("name", ""),
-            "tags": metadata.get("tags", ""),
-            "vector": embedding,
-        }]
+        data = self._rows([pattern_id], [content], [embedding], [metadata])
         self.table.add(data)
+        self._index_rows(data)
 
     def add_patterns_batch(
         self,
@@ -65,6 +223,17 @@ class VectorStore:
         metadatas: List[Dict[str, Any]]
     ):
         """Add multiple design patterns"""
+        data = self._rows(pattern_ids, contents, embeddings, metadatas)
+        self.table.add(data)
+        self._index_rows(data)
+
+    def _rows(
+        self,
+        pattern_ids: List[str],
+        contents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
         data = []
         for i in range(len(pattern_ids)):
             data.append({
@@ -74,8 +243,140 @@ class VectorStore:
                 "name": metadatas[i].get("name", ""),
                 "tags": metadatas[i].get("tags", ""),
                 "vector": embeddings[i],
+                "content_hash": content_hash(contents[i]),
+                "embedding_model": self.embedding_model,
+                "parent_id": metadatas[i].get("parent_id"),
             })
-        self.table.add(data)
+        return data
+
+    def upsert_pattern(
+        self,
+        pattern_id: str,
+        content: str,
+        embedding: List[float],
+        metadata: Dict[str, Any]
+    ) -> bool:
+        """Add a pattern or replace the stored one with the same ID; True if it replaced one"""
+        return self.upsert_patterns([pattern_id], [content], [embedding], [metadata])["updated"] > 0
+
+    def upsert_patterns(
+        self,
+        pattern_ids: List[str],
+        contents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """Add patterns, replacing stored ones with the same IDs (merge on id)"""
+        # The last occurrence of an id within the batch wins
+        data = list({row["id"]: row for row in self._rows(pattern_ids, contents, embeddings, metadatas)}.values())
+        existing = self._existing_ids([row["id"] for row in data])
+        if not existing:
+            # Plain appends keep the in-memory indexes incremental
+            self.table.add(data)
+            self._index_rows(data)
+        else:
+            self.table.merge_insert("id").when_matched_update_all().when_not_matched_insert_all().execute(data)
+            # Replaced rows move to the end of the table
+            self._refresh_indexes()
+        return {"inserted": len(data) - len(existing), "updated": len(existing)}
+
+    def delete(self, pattern_ids: List[str], column: str = "id") -> int:
+        """Delete every row whose column (id, or parent_id for chunks) is one of the IDs; returns the number removed"""
+        removed = 0
+        for start in range(0, len(pattern_ids), ID_FILTER_CHUNK):
+            where = self._id_filter(pattern_ids[start:start + ID_FILTER_CHUNK], column)
+            matches = self.table.count_rows(where)
+            if matches:
+                self.table.delete(where)
+                removed += matches
+        if removed:
+            self._refresh_indexes()
+        return removed
+
+    def dedupe(self) -> int:
+        """Keep only the newest row for each ID; returns the number of rows removed"""
+        counts = Counter(pattern_id for batch in self.scan(["id"]) for pattern_id in batch.column(0).to_pylist())
+        duplicated = [pattern_id for pattern_id, count in counts.items() if count > 1]
+        removed = 0
+        for start in range(0, len(duplicated), ID_FILTER_CHUNK):
+            where = self._id_filter(duplicated[start:start + ID_FILTER_CHUNK])
+            rows = self.table.search().where(where).limit(self.table.count_rows(where)).to_pandas()
+            # Rows come back in table order, so the last copy is the newest
+            newest = rows.drop_duplicates("id", keep="last")[COLUMNS]
+            # merge_insert cannot choose between several matching rows, so replace them all
+            self.table.delete(where)
+            self.table.add(newest)
+            removed += len(rows) - len(newest)
+        if removed:
+            self._refresh_indexes()
+        return removed
+
+    def compact(self, cleanup_older_than: timedelta = timedelta(hours=24)) -> Dict[str, Any]:
+        """Merge small fragments, materialize deletions and drop versions older than cleanup_older_than
+
+        Readers still on a dropped version fail, so keep cleanup_older_than
+        well above the longest request and read_consistency_seconds.
+        """
+        before = self.storage_stats()
+        try:
+            self.table.optimize(cleanup_older_than=cleanup_older_than)
+        except AttributeError:
+            # lancedb < 0.8 has no optimize(); the same two steps through pylance
+            self.table.compact_files()
+            self.table.cleanup_old_versions(cleanup_older_than)
+        self._refresh_indexes()
+        return {"before": before, "after": self.storage_stats()}
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """Rows, duplicate rows, fragments, versions and size on disk"""
+        ids = [pattern_id for batch in self.scan(["id"]) for pattern_id in batch.column(0).to_pylist()]
+        stats = {
+            "rows": len(ids),
+            "duplicate_rows": len(ids) - len(set(ids)),
+            "version": self._table_version(),
+        }
+        try:
+            stats["versions"] = len(self.table.list_versions())
+        except AttributeError:
+            pass
+        try:
+            stats["fragments"] = len(self.table.to_lance().get_fragments())
+        except (AttributeError, ImportError):
+            pass
+        table_dir = os.path.join(self.config['vector_db']['persist_directory'], f"{self.table_name}.lance")
+        stats["size_mb"] = round(sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(table_dir) for name in files
+        ) / 2**20, 2)
+        return stats
+
+    def get_stored(self, pattern_ids: List[str], columns: List[str], key: str = "id") -> Dict[str, Dict[str, Any]]:
+        """The given columns of the stored rows whose key column (id or parent_id) is one of the IDs, keyed by id"""
+        columns = ["id"] + [column for column in columns if column != "id"]
+        stored = {}
+        for start in range(0, len(pattern_ids), ID_FILTER_CHUNK):
+            where = self._id_filter(pattern_ids[start:start + ID_FILTER_CHUNK], key)
+            matches = self.table.count_rows(where)
+            if matches:
+                rows = self.table.search().where(where).select(columns).limit(matches).to_arrow()
+                # Later rows are newer, so they win for ids stored more than once
+                stored.update((row["id"], row) for row in rows.select(columns).to_pylist())
+        return stored
+
+    def distinct(self, column: str) -> set:
+        """Distinct values of a column, re-read only after the table changes"""
+        state = (self._table_version(), self.count())
+        cached = self._distinct.get(column)
+        if cached is None or cached[0] != state:
+            values = {value for batch in self.scan([column]) for value in batch.column(column).to_pylist()}
+            cached = self._distinct[column] = (state, values)
+        return cached[1]
+
+    def _existing_ids(self, pattern_ids: List[str]) -> set:
+        return set(self.get_stored(pattern_ids, ["id"]))
+
+    @staticmethod
+    def _id_filter(pattern_ids: List[str], column: str = "id") -> str:
+        return f"{column} IN (" + ", ".join("'" + pattern_id.replace("'", "''") + "'" for pattern_id in pattern_ids) + ")"
 
     def search(
         self,
@@ -84,28 +385,114 @@ class VectorStore:
         filter_metadata: Dict[str, Any] = None
     ) -> Dict[str, Any]:
         """Search for similar design patterns"""
+        if self.index is not None:
+            return self._search_quantized(query_embedding, top_k, filter_metadata)
+
         query = self.table.search(query_embedding).limit(top_k)
 
         if filter_metadata and "category" in filter_metadata:
             query = query.where(f"category = '{filter_metadata['category']}'")
 
-        results = query.to_pandas()
+        return self._format_results(query.to_pandas())
 
-        # Format results to match expected structure
+    def _search_quantized(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        filter_metadata: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Candidates from the quantized index, re-ranked by float32 L2 distance"""
+        category = filter_metadata.get("category") if filter_metadata else None
+        candidate_count = max(self.rerank_candidates, top_k)
+        results, _ = self._fetch_hits(lambda: [
+            (position, self.index.ids[position], None)
+            for position in self.index.candidates(query_embedding, candidate_count, category)
+        ])
+        if results is None:
+            return _empty_results()
+
+        vectors = np.stack(results["vector"].to_numpy()).astype(np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        # Squared L2, the metric LanceDB reports in _distance
+        results["_distance"] = np.square(vectors - query).sum(axis=1)
+        return self._format_results(results.sort_values("_distance", kind="stable").head(top_k))
+
+    def lexical_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter_metadata: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """BM25 search over content, name and tags; results as from search(), plus 'scores'"""
+        if self.lexical is None:
+            raise RuntimeError("Lexical index is disabled (vector_db.lexical_index)")
+
+        category = filter_metadata.get("category") if filter_metadata else None
+        results, hits = self._fetch_hits(lambda: [
+            (position, self.lexical.ids[position], score)
+            for position, score in self.lexical.search(query, top_k, category)
+        ])
+        if results is None:
+            return dict(_empty_results(), scores=[[]])
+
+        results["_score"] = results["id"].map({pattern_id: score for _, pattern_id, score in hits})
+        results = results.sort_values("_score", ascending=False, kind="stable")
+        formatted = self._format_results(results)
+        formatted['distances'] = [[None] * len(results)]
+        formatted['scores'] = [results['_score'].tolist()]
+        return formatted
+
+    def _fetch_hits(self, find):
+        """Rows for the (position, id, score) hits find() returns against the in-memory indexes
+
+        Returns (rows, hits), with rows None when nothing matched.
+        """
+        self._sync_indexes()
+        hits = find()
+        if not hits:
+            return None, hits
+        rows = self._fetch_rows([position for position, _, _ in hits], [pattern_id for _, pattern_id, _ in hits])
+        if sorted(rows["id"].tolist()) != sorted(pattern_id for _, pattern_id, _ in hits):
+            # Rows moved underneath the indexes; rebuild them and search again
+            self._build_indexes()
+            hits = find()
+            if not hits:
+                return None, hits
+            rows = self._fetch_rows([position for position, _, _ in hits], [pattern_id for _, pattern_id, _ in hits])
+        return rows, hits
+
+    def _fetch_rows(self, positions: List[int], ids: List[str]):
+        """Stored rows, including the float32 vectors, at the given row offsets"""
+        try:
+            return self.table.to_lance().take(positions, columns=COLUMNS).to_pandas()
+        except (AttributeError, ImportError):
+            # Without pylance, look the candidates up by id instead of row offset
+            return self.table.search().where(self._id_filter(ids)).limit(len(ids)).to_pandas()
+
+    def _format_results(self, results) -> Dict[str, Any]:
+        """Format results to match expected structure"""
         return {
             'ids': [results['id'].tolist()],
             'documents': [results['content'].tolist()],
-            'metadatas': [[{
-                'category': row['category'],
-                'name': row['name'],
-                'tags': row['tags']
-            } for _, row in results.iterrows()]],
+            'metadatas': [[self._metadata(row) for _, row in results.iterrows()]],
             'distances': [results['_distance'].tolist()] if '_distance' in results.columns else [[]]
         }
 
+    @staticmethod
+    def _metadata(row) -> Dict[str, Any]:
+        metadata = {
+            'category': row['category'],
+            'name': row['name'],
+            'tags': row['tags']
+        }
+        # Only chunk rows have a parent
+        if isinstance(row.get('parent_id'), str):
+            metadata['parent_id'] = row['parent_id']
+        return metadata
+
     def get_pattern(self, pattern_id: str) -> Dict[str, Any]:
         """Get a specific pattern by ID"""
-        result = self.table.search().where(f"id = '{pattern_id}'").limit(1).to_pandas()
+        result = self.table.search().where(self._id_filter([pattern_id])).limit(1).to_pandas()
         if len(result) == 0:
             return None
         row = result.iloc[0]
@@ -128,3 +515,5 @@ class VectorStore:
         self.db.drop_table(self.table_name)
         self._create_table()
         self.table = self.db.open_table(self.table_name)
+        if self.index is not None or self.lexical is not None:
+            self._build_indexes()
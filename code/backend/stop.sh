@@ -17,7 +17,7 @@ if [ -f .server.pid ]; then
     fi
     rm .server.pid
 else
-    pkill -f "uvicorn src.api:app" 2>/dev/null && echo "Stopped uvicorn process" || echo "No uvicorn process found"
+    pkill -f "src.api:app" 2>/dev/null && echo "Stopped server process" || echo "No server process found"
 fi
 
 # Clean up cache files
@@ -8,6 +8,7 @@ import requests
 import json
 import time
 import sys
+import yaml
 
 BASE_URL = "http://127.0.0.1:3005"
 
@@ -34,16 +35,16 @@ def print_error(text):
 def print_info(text):
     print(f"{Colors.YELLOW}→ {text}{Colors.RESET}")
 
-def test_endpoint(name, method, endpoint, data=None, expected_status=200):
+def test_endpoint(name, method, endpoint, data=None, expected_status=200, headers=None):
     """Test an API endpoint and return success status"""
     url = f"{BASE_URL}{endpoint}"
     print_info(f"Testing: {name}")
 
     try:
         if method == "GET":
-            response = requests.get(url, timeout=60)
+            response = requests.get(url, headers=headers, timeout=60)
         else:
-            response = requests.post(url, json=data, timeout=120)
+            response = requests.post(url, json=data, headers=headers, timeout=120)
 
         if response.status_code == expected_status:
             print_success(f"Status: {response.status_code}")
@@ -318,14 +319,15 @@ export const Badge: React.FC<BadgeProps> = ({
             "component_type": "button",
             "props": {"text": "Click Me", "color": "#3b82f6"},
             "width": 400,
-            "height": 200
+            "height": 200,
+            "format": "base64"
         }
     )
     results.append(("Generate mockup", success))
     if success:
         print(f"  Image size: {data.get('width')}x{data.get('height')}")
         print(f"  Base64 length: {len(data.get('image', ''))} chars")
-        print(f"  Has data URL: {'Yes' if data.get('data_url') else 'No'}")
+        print(f"  Media type: {data.get('media_type')}")
 
     # Test card mockup
     print()
@@ -335,7 +337,8 @@ export const Badge: React.FC<BadgeProps> = ({
         "/generate/mockup",
         {
             "component_type": "card",
-            "props": {"title": "Test Card", "content": "This is test content"}
+            "props": {"title": "Test Card", "content": "This is test content"},
+            "format": "base64"
         }
     )
 
@@ -347,7 +350,8 @@ export const Badge: React.FC<BadgeProps> = ({
         "/generate/mockup",
         {
             "component_type": "navbar",
-            "props": {"logo": "MyApp", "items": ["Home", "About", "Contact"]}
+            "props": {"logo": "MyApp", "items": ["Home", "About", "Contact"]},
+            "format": "base64"
         }
     )
 
@@ -367,7 +371,8 @@ export const Badge: React.FC<BadgeProps> = ({
                 <button class="mt-4 px-4 py-2 bg-blue-500 text-white rounded">Click</button>
             </div>""",
             "width": 600,
-            "height": 300
+            "height": 300,
+            "format": "base64"
         }
     )
     results.append(("Code to image", success))
@@ -375,6 +380,59 @@ export const Badge: React.FC<BadgeProps> = ({
         print(f"  Image size: {data.get('width')}x{data.get('height')}")
         print(f"  Base64 length: {len(data.get('image', ''))} chars")
 
+    # ========================================
+    # Test 12: Admin Token
+    # ========================================
+    print_header("12. Admin Token")
+
+    # A non-ASCII token must be rejected, not crash the token comparison
+    success, _ = test_endpoint(
+        "List profiles with a non-ASCII admin token",
+        "GET",
+        "/admin/profiles",
+        headers={"X-Admin-Token": "t\u00f6ken"},
+        expected_status=403
+    )
+    results.append(("Non-ASCII admin token", success))
+
+    # ========================================
+    # Test 13: Chunked retrieval with an imports-only pattern
+    # ========================================
+    print_header("13. Chunked Retrieval")
+
+    with open("config.yaml") as f:
+        chunking = (yaml.safe_load(f)['rag'].get('chunking') or {}).get('enabled')
+    if not chunking:
+        print_info("rag.chunking is disabled; skipping")
+    else:
+        # A pattern with nothing after its imports must still get a chunk,
+        # otherwise search falls back to whole patterns for the entire store
+        imports = "\n".join(f"import {{ Part{i} }} from './parts/part-{i}';" for i in range(30))
+        success, _ = test_endpoint(
+            "POST /patterns (imports only)",
+            "POST",
+            "/patterns",
+            {
+                "pattern_id": "test-imports-001",
+                "name": "Test Imports Only",
+                "category": "components",
+                "tags": ["imports"],
+                "content": imports
+            }
+        )
+        if success:
+            success, data = test_endpoint(
+                "POST /search uses the chunk store",
+                "POST",
+                "/search",
+                {"query": "Part3 parts imports", "top_k": 3}
+            )
+            success = success and bool(data['patterns']) and all('chunks' in p for p in data['patterns'])
+            if not success:
+                print_error("Search returned whole patterns instead of chunks")
+            requests.delete(f"{BASE_URL}/patterns/test-imports-001", timeout=60)
+        results.append(("Chunked retrieval", success))
+
     # ========================================
     # Test Summary
     # ========================================